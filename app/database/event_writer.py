@@ -0,0 +1,149 @@
+import os
+import time
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.telemetry.log import get_logger
+from app.telemetry.metrics import DB_FLUSH
+
+log = get_logger(__name__)
+
+_STOP = object()
+
+
+class EventWriter:
+    """Write-behind queue for ``session_events``.
+
+    Sockets hand events to ``record`` and move on; a single background task
+    flushes them as bulk inserts whenever ``batch_size`` rows are waiting or
+    ``flush_interval`` seconds have passed. When the queue is full ``record``
+    waits, which pushes back on the producers instead of growing memory.
+    ``flush`` is a barrier for readers of the table, e.g. session summaries.
+    """
+
+    def __init__(
+        self,
+        db,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_queue: Optional[int] = None,
+        table: str = "session_events",
+    ):
+        self.db = db
+        self.table = table
+        self.batch_size = batch_size or int(os.getenv("EVENT_BATCH_SIZE", "100"))
+        self.flush_interval = flush_interval or float(os.getenv("EVENT_FLUSH_INTERVAL_MS", "250")) / 1000
+        self.queue: asyncio.Queue = asyncio.Queue(
+            maxsize=max_queue or int(os.getenv("EVENT_QUEUE_MAX", "10000"))
+        )
+        self._task: Optional[asyncio.Task] = None
+
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def record(self, session_id: str, event_type: str, content: str, metadata: Optional[Dict[str, Any]] = None):
+        """Queue one event (waits only if the queue is full)"""
+        await self.queue.put({
+            "session_id": session_id,
+            "event_type": event_type,
+            "content": content,
+            "metadata": metadata or {},
+            "created_at": datetime.now(timezone.utc).isoformat()
+        })
+
+    async def flush(self):
+        """Wait until every event queued so far is written (or has failed)
+
+        A marker goes through the queue behind them; the writer flushes its
+        batch as soon as it reaches the marker instead of waiting for the
+        deadline.
+        """
+        if self._task is None or self._task.done():
+            return
+
+        barrier = asyncio.get_running_loop().create_future()
+        await self.queue.put(barrier)
+        await barrier
+
+    async def close(self):
+        """Flush everything still queued and stop the background task"""
+        if self._task is None:
+            return
+
+        await self.queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            # Block until there is something to write, then give the batch
+            # until the flush deadline to fill up
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size and not _ends_batch(batch[-1]):
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            barrier = None
+            if batch[-1] is _STOP:
+                batch.pop()
+                stopping = True
+            elif isinstance(batch[-1], asyncio.Future):
+                barrier = batch.pop()
+
+            await self._flush(batch)
+            if barrier is not None and not barrier.done():
+                barrier.set_result(None)
+
+    async def _flush(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+
+        try:
+            # Database clients are synchronous - keep the round trip off the loop
+            started = time.perf_counter()
+            await asyncio.to_thread(self._insert, rows)
+            DB_FLUSH.observe(time.perf_counter() - started)
+            self.written += len(rows)
+        except Exception as e:
+            self.failed += len(rows)
+            log.error("❌ Failed to write session events", rows=len(rows), error=str(e))
+        finally:
+            self.flushes += 1
+
+    def _insert(self, rows: List[Dict[str, Any]]):
+        self.db.table(self.table).insert(rows).execute()
+
+
+def _ends_batch(item) -> bool:
+    return item is _STOP or isinstance(item, asyncio.Future)
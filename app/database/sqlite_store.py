@@ -0,0 +1,364 @@
+import os
+import re
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.telemetry.log import get_logger
+
+log = get_logger(__name__)
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", "realtime_ai.db")
+SCHEMA_PATH = Path(__file__).resolve().parents[2] / "schema.sql"
+
+# SQLite versions of the tables in schema.sql (JSONB -> TEXT, BOOLEAN -> INTEGER)
+TABLES = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT UNIQUE NOT NULL,
+    user_id TEXT NOT NULL,
+    start_time TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    end_time TEXT,
+    is_active INTEGER DEFAULT 1,
+    summary TEXT,
+    metadata TEXT DEFAULT '{}',
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS session_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+    event_type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    metadata TEXT DEFAULT '{}',
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+"""
+
+JSON_COLUMNS = {"metadata"}
+BOOL_COLUMNS = {"is_active"}
+
+_INDEX = re.compile(r"CREATE INDEX IF NOT EXISTS \w+ ON \w+\([\w, ]+\);", re.IGNORECASE)
+
+
+class APIResponse:
+    """Same shape as the Supabase client's response (``.data`` list of rows)"""
+
+    __slots__ = ("data", "count")
+
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+        self.count = len(data)
+
+
+class Query:
+    """Supabase-style builder: table().select/insert/upsert/update/delete, filters, execute()"""
+
+    def __init__(self, db: "SQLiteDatabase", table: str):
+        self.db = db
+        self.table = db._check_table(table)
+        self._action = "select"
+        self._columns = "*"
+        self._rows: List[Dict[str, Any]] = []
+        self._values: Dict[str, Any] = {}
+        self._on_conflict: Optional[str] = None
+        self._ignore_duplicates = False
+        self._filters: List[Tuple[str, str, Any]] = []
+        self._order: List[Tuple[str, bool]] = []
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
+
+    def select(self, columns: str = "*"):
+        self._action = "select"
+        if columns.strip() != "*":
+            self._columns = ", ".join(self._col(c.strip()) for c in columns.split(","))
+        return self
+
+    def insert(self, data):
+        self._action = "insert"
+        self._rows = data if isinstance(data, list) else [data]
+        return self
+
+    def upsert(self, data, on_conflict: Optional[str] = None, ignore_duplicates: bool = False):
+        """``ignore_duplicates`` keeps existing rows as they are; only new rows come back"""
+        self.insert(data)
+        self._action = "upsert"
+        self._on_conflict = self._col(on_conflict) if on_conflict else None
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values: Dict[str, Any]):
+        self._action = "update"
+        self._values = values
+        return self
+
+    def delete(self):
+        self._action = "delete"
+        return self
+
+    def eq(self, column: str, value):
+        self._filters.append((self._col(column), "=", value))
+        return self
+
+    def neq(self, column: str, value):
+        self._filters.append((self._col(column), "!=", value))
+        return self
+
+    def gte(self, column: str, value):
+        self._filters.append((self._col(column), ">=", value))
+        return self
+
+    def lte(self, column: str, value):
+        self._filters.append((self._col(column), "<=", value))
+        return self
+
+    def in_(self, column: str, values: Sequence[Any]):
+        self._filters.append((self._col(column), "IN", list(values)))
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self._order.append((self._col(column), desc))
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def range(self, start: int, end: int):
+        """Inclusive, like PostgREST"""
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def execute(self) -> APIResponse:
+        return getattr(self.db, f"_{self._action}")(self)
+
+    def _col(self, column: str) -> str:
+        if column not in self.db.columns[self.table]:
+            raise ValueError(f"Unknown column {self.table}.{column}")
+        return column
+
+    def _where(self) -> Tuple[str, List[Any]]:
+        if not self._filters:
+            return "", []
+
+        clauses, params = [], []
+        for column, op, value in self._filters:
+            if op == "IN":
+                clauses.append(f"{column} IN ({', '.join('?' * len(value))})")
+                params.extend(_encode(column, v) for v in value)
+            else:
+                clauses.append(f"{column} {op} ?")
+                params.append(_encode(column, value))
+        return " WHERE " + " AND ".join(clauses), params
+
+
+class SQLiteDatabase:
+    """Embedded store with the Supabase builder surface, for dev/CI/single node
+
+    WAL mode lets readers run alongside the single writer: each thread gets
+    its own read connection, writes share one connection behind a lock and
+    every ``insert`` of a list is one transaction. SQL text is built the same
+    way for the same query shape, so sqlite3's statement cache serves the
+    prepared statements.
+
+    ``execute()`` blocks like the Supabase client's, so callers run it off
+    the event loop (``asyncio.to_thread``), as they already do.
+    """
+
+    def __init__(self, path: str = SQLITE_PATH, schema_path: Path = SCHEMA_PATH):
+        self.path = path
+        # ":memory:" databases are per connection - share one so every thread sees the data
+        self._shared = path == ":memory:"
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._writer = self._connect()
+
+        with self._write_lock:
+            self._writer.executescript(TABLES)
+            for statement in _schema_indexes(schema_path):
+                self._writer.execute(statement)
+
+        self.columns = {
+            table: {row[1] for row in self._writer.execute(f"PRAGMA table_info({table})")}
+            for table in ("sessions", "session_events")
+        }
+        log.info("🗄️ Database: SQLite", path=path)
+
+    def table(self, name: str) -> Query:
+        return Query(self, name)
+
+    def close(self):
+        for connection in self._connections:
+            try:
+                connection.close()
+            except sqlite3.ProgrammingError:
+                pass
+        self._connections.clear()
+
+    # ---- connections ----
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=256,
+            isolation_level=None,  # transactions are explicit (_Transaction)
+        )
+        connection.row_factory = sqlite3.Row
+        if not self._shared:
+            connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        # Off by default in SQLite; session_events relies on it like Postgres does
+        connection.execute("PRAGMA foreign_keys=ON")
+        self._connections.append(connection)
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        if self._shared:
+            return self._writer
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _check_table(self, name: str) -> str:
+        if name not in ("sessions", "session_events"):
+            raise ValueError(f"Unknown table {name}")
+        return name
+
+    # ---- actions ----
+
+    def _select(self, query: Query) -> APIResponse:
+        where, params = query._where()
+        sql = f"SELECT {query._columns} FROM {query.table}{where}"
+        if query._order:
+            sql += " ORDER BY " + ", ".join(f"{c} {'DESC' if desc else 'ASC'}" for c, desc in query._order)
+        if query._limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [query._limit, query._offset or 0]
+
+        if self._shared:
+            with self._write_lock:
+                rows = self._writer.execute(sql, params).fetchall()
+        else:
+            rows = self._reader().execute(sql, params).fetchall()
+        return APIResponse([_decode(row) for row in rows])
+
+    def _insert(self, query: Query, conflict: str = "") -> APIResponse:
+        if not query._rows:
+            return APIResponse([])
+
+        # One statement per column set, all rows in one transaction
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for row in query._rows:
+            groups.setdefault(tuple(query._col(c) for c in row), []).append(row)
+
+        with self._write_lock, self._transaction():
+            for columns, rows in groups.items():
+                sql = (
+                    f"INSERT INTO {query.table} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))}){conflict and _upsert_clause(conflict, columns)}"
+                )
+                self._writer.executemany(sql, [[_encode(c, row[c]) for c in columns] for row in rows])
+
+        return APIResponse(list(query._rows))
+
+    def _upsert(self, query: Query) -> APIResponse:
+        conflict = query._on_conflict or "id"
+        if not query._ignore_duplicates:
+            return self._insert(query, conflict=conflict)
+
+        # Row by row, so the response holds exactly the rows that were new
+        inserted = []
+        with self._write_lock, self._transaction():
+            for row in query._rows:
+                columns = [query._col(c) for c in row]
+                sql = (
+                    f"INSERT INTO {query.table} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))}) ON CONFLICT({conflict}) DO NOTHING RETURNING *"
+                )
+                inserted.extend(self._writer.execute(sql, [_encode(c, row[c]) for c in columns]).fetchall())
+        return APIResponse([_decode(row) for row in inserted])
+
+    def _update(self, query: Query) -> APIResponse:
+        values = {query._col(c): v for c, v in query._values.items()}
+        if "updated_at" in self.columns[query.table] and "updated_at" not in values:
+            values["updated_at"] = datetime.now(timezone.utc).isoformat()
+
+        where, where_params = query._where()
+        sql = f"UPDATE {query.table} SET {', '.join(f'{c} = ?' for c in values)}{where} RETURNING *"
+        params = [_encode(c, v) for c, v in values.items()] + where_params
+
+        with self._write_lock, self._transaction():
+            rows = self._writer.execute(sql, params).fetchall()
+        return APIResponse([_decode(row) for row in rows])
+
+    def _delete(self, query: Query) -> APIResponse:
+        where, params = query._where()
+        with self._write_lock, self._transaction():
+            rows = self._writer.execute(f"DELETE FROM {query.table}{where} RETURNING *", params).fetchall()
+        return APIResponse([_decode(row) for row in rows])
+
+    def _transaction(self):
+        return _Transaction(self._writer)
+
+
+class _Transaction:
+    """BEGIN ... COMMIT (ROLLBACK on error) on the writer connection"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self):
+        if not self.connection.in_transaction:
+            self.connection.execute("BEGIN")
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.connection.execute("COMMIT")
+        else:
+            self.connection.execute("ROLLBACK")
+        return False
+
+
+def _schema_indexes(schema_path: Path) -> List[str]:
+    """CREATE INDEX statements from schema.sql (they are valid SQLite as written)"""
+    try:
+        return _INDEX.findall(schema_path.read_text())
+    except OSError:
+        return []
+
+
+def _upsert_clause(conflict: str, columns: Tuple[str, ...]) -> str:
+    updates = [c for c in columns if c != conflict and c != "id"]
+    if not updates:
+        return f" ON CONFLICT({conflict}) DO NOTHING"
+    return f" ON CONFLICT({conflict}) DO UPDATE SET " + ", ".join(f"{c} = excluded.{c}" for c in updates)
+
+
+def _encode(column: str, value):
+    if column in JSON_COLUMNS and value is not None and not isinstance(value, str):
+        return json.dumps(value, default=str)
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+    data = dict(row)
+    for column in JSON_COLUMNS & data.keys():
+        if isinstance(data[column], str):
+            data[column] = json.loads(data[column])
+    for column in BOOL_COLUMNS & data.keys():
+        if data[column] is not None:
+            data[column] = bool(data[column])
+    return data
@@ -1,23 +1,84 @@
 import os
+import threading
 from dotenv import load_dotenv
 
+from app.telemetry.log import get_logger
+
 load_dotenv()
 
-def get_supabase():
-    """Simple Supabase client that won't crash"""
+log = get_logger(__name__)
+
+# One client per process, shared by the app and the post-session tasks
+_client = None
+_http_client = None
+_lock = threading.Lock()
+
+DEFAULT_POOL_SIZE = 20
+
+def supabase_configured() -> bool:
+    return bool(os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_KEY"))
+
+def _create_http_client(pool_size: int):
+    """Keep-alive HTTP/2 pool (falls back to HTTP/1.1 if h2 isn't installed)"""
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=float(os.getenv("SUPABASE_KEEPALIVE_SECONDS", "60"))
+    )
+    timeout = httpx.Timeout(float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "30")))
+
     try:
-        from supabase import create_client
-        
-        url = os.getenv("SUPABASE_URL")
-        key = os.getenv("SUPABASE_KEY")
-        
-        if not url or not key:
-            raise ValueError("Supabase credentials missing")
-        
-        client = create_client(url, key)
-        print(f"✅ Supabase connected to: {url[:30]}...")
-        return client
-        
-    except Exception as e:
-        print(f"⚠️ Supabase error: {e}")
-        raise
\ No newline at end of file
+        return httpx.Client(http2=True, limits=limits, timeout=timeout)
+    except ImportError:
+        log.warning("⚠️ h2 not installed - Supabase pool using HTTP/1.1 keep-alive")
+        return httpx.Client(limits=limits, timeout=timeout)
+
+def init_supabase(pool_size: int = None):
+    """Create the process-wide Supabase client (called once from lifespan)"""
+    global _client, _http_client
+
+    with _lock:
+        if _client is not None:
+            return _client
+
+        try:
+            from supabase import create_client, ClientOptions
+
+            url = os.getenv("SUPABASE_URL")
+            key = os.getenv("SUPABASE_KEY")
+
+            if not url or not key:
+                raise ValueError("Supabase credentials missing")
+
+            if pool_size is None:
+                pool_size = int(os.getenv("SUPABASE_POOL_SIZE", DEFAULT_POOL_SIZE))
+
+            _http_client = _create_http_client(pool_size)
+            _client = create_client(url, key, options=ClientOptions(httpx_client=_http_client))
+            log.info("✅ Supabase connected", url=url[:30], pool_size=pool_size)
+            return _client
+
+        except Exception as e:
+            log.warning("⚠️ Supabase error", error=str(e))
+            if _http_client is not None:
+                _http_client.close()
+                _http_client = None
+            raise
+
+def get_supabase():
+    """Shared Supabase client, created on first use"""
+    if _client is not None:
+        return _client
+    return init_supabase()
+
+def close_supabase():
+    """Close the shared client's connection pool (called on shutdown)"""
+    global _client, _http_client
+
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+        _client = None
+        _http_client = None
@@ -0,0 +1,254 @@
+import os
+import ast
+import math
+import operator
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+# Limits that keep one request from pinning the CPU or eating memory
+MAX_EXPRESSION_CHARS = int(os.getenv("CALC_MAX_CHARS", "256"))
+MAX_AST_NODES = int(os.getenv("CALC_MAX_NODES", "128"))
+MAX_EXPONENT = int(os.getenv("CALC_MAX_EXPONENT", "1000"))
+MAX_INT_BITS = int(os.getenv("CALC_MAX_INT_BITS", "4096"))
+CACHE_SIZE = int(os.getenv("CALC_CACHE_SIZE", "4096"))
+
+Number = (int, float)
+
+CONSTANTS = {
+    "pi": math.pi,
+    "e": math.e,
+    "tau": math.tau,
+}
+
+FUNCTIONS: Dict[str, Callable] = {
+    "abs": abs,
+    "round": round,
+    "min": min,
+    "max": max,
+    "sqrt": math.sqrt,
+    "exp": math.exp,
+    "log": math.log,
+    "log10": math.log10,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "floor": math.floor,
+    "ceil": math.ceil,
+}
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+
+UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+class CalculationError(ValueError):
+    """Expression is malformed, unsafe, or exceeds the limits"""
+
+
+class CompiledExpression:
+    """A parsed, validated expression turned into a chain of closures
+
+    Sub-expressions without variables are folded at compile time, so a
+    constant expression is evaluated exactly once per cache entry.
+    """
+
+    __slots__ = ("source", "variables", "_evaluate")
+
+    def __init__(self, source: str, variables: Tuple[str, ...], evaluate: Callable[[Dict[str, Any]], Any]):
+        self.source = source
+        self.variables = variables
+        self._evaluate = evaluate
+
+    def evaluate(self, values: Dict[str, Any] = None):
+        values = values or {}
+        missing = [name for name in self.variables if name not in values]
+        if missing:
+            raise CalculationError(f"Missing value for: {', '.join(missing)}")
+        return _run(self._evaluate, values)
+
+    def evaluate_many(self, columns: Dict[str, Iterable] = None) -> List[Any]:
+        """Evaluate once per row; scalar columns are broadcast to every row"""
+        columns = columns or {}
+        missing = [name for name in self.variables if name not in columns]
+        if missing:
+            raise CalculationError(f"Missing value for: {', '.join(missing)}")
+
+        arrays = {name: value for name, value in columns.items() if not isinstance(value, Number)}
+        scalars = {name: value for name, value in columns.items() if isinstance(value, Number)}
+        arrays = {name: list(value) for name, value in arrays.items()}
+
+        lengths = {len(value) for value in arrays.values()}
+        if len(lengths) > 1:
+            raise CalculationError("Input arrays must have the same length")
+        rows = lengths.pop() if lengths else 1
+
+        results = []
+        for index in range(rows):
+            values = dict(scalars)
+            for name, value in arrays.items():
+                values[name] = _number(value[index], name)
+            results.append(_run(self._evaluate, values))
+        return results
+
+    def __repr__(self):
+        return f"CompiledExpression({self.source!r}, variables={self.variables})"
+
+
+def normalize(expression: str) -> str:
+    """Canonical text for cache keys ('^' is accepted for powers)"""
+    return " ".join(expression.replace("^", "**").replace("×", "*").replace("÷", "/").split())
+
+
+def compile_expression(expression: str) -> CompiledExpression:
+    if not isinstance(expression, str):
+        raise CalculationError("Expression must be a string")
+    return _compile(normalize(expression))
+
+
+def evaluate(expression: str, values: Dict[str, Any] = None):
+    """Evaluate an arithmetic expression, e.g. ``evaluate("2 * (x + 1)", {"x": 3})``"""
+    return compile_expression(expression).evaluate(values)
+
+
+def evaluate_many(expression: str, columns: Dict[str, Iterable] = None) -> List[Any]:
+    """Vectorized form: ``evaluate_many("x ** 2", {"x": [1, 2, 3]})`` -> [1, 4, 9]"""
+    return compile_expression(expression).evaluate_many(columns)
+
+
+def format_number(value) -> str:
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e16:
+        return str(int(value))
+    if isinstance(value, float):
+        return repr(round(value, 12))
+    return str(value)
+
+
+def cache_info():
+    return _compile.cache_info()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _compile(source: str) -> CompiledExpression:
+    if not source:
+        raise CalculationError("Empty expression")
+    if len(source) > MAX_EXPRESSION_CHARS:
+        raise CalculationError(f"Expression longer than {MAX_EXPRESSION_CHARS} characters")
+
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError:
+        raise CalculationError(f"Invalid expression: {source}") from None
+
+    nodes = sum(1 for _ in ast.walk(tree))
+    if nodes > MAX_AST_NODES:
+        raise CalculationError(f"Expression has more than {MAX_AST_NODES} terms")
+
+    variables = set()
+    evaluate, _ = _build(tree.body, variables)
+    return CompiledExpression(source, tuple(sorted(variables)), evaluate)
+
+
+def _run(evaluate, values):
+    try:
+        return evaluate(values)
+    except CalculationError:
+        raise
+    except ZeroDivisionError:
+        raise CalculationError("Division by zero") from None
+    except OverflowError:
+        raise CalculationError("Result is too large") from None
+    except (ValueError, TypeError) as e:
+        raise CalculationError(str(e)) from None
+
+
+def _build(node, variables) -> Tuple[Callable[[Dict[str, Any]], Any], bool]:
+    """Closure for ``node`` and whether it is constant; rejects anything unsafe"""
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, Number):
+            raise CalculationError(f"Unsupported value: {node.value!r}")
+        value = node.value
+        return (lambda values: value), True
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name in CONSTANTS:
+            value = CONSTANTS[name]
+            return (lambda values: value), True
+        if name in FUNCTIONS:
+            raise CalculationError(f"{name} is a function")
+        variables.add(name)
+        return (lambda values: _number(values[name], name)), False
+
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        op = UNARY_OPERATORS[type(node.op)]
+        operand, constant = _build(node.operand, variables)
+        return _fold(lambda values: op(operand(values)), constant)
+
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        left, left_constant = _build(node.left, variables)
+        right, right_constant = _build(node.right, variables)
+        constant = left_constant and right_constant
+
+        if isinstance(node.op, ast.Pow):
+            return _fold(lambda values: _power(left(values), right(values)), constant)
+
+        op = BINARY_OPERATORS[type(node.op)]
+        return _fold(lambda values: _checked(op(left(values), right(values))), constant)
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS and not node.keywords:
+        function = FUNCTIONS[node.func.id]
+        built = [_build(arg, variables) for arg in node.args]
+        args = [evaluate for evaluate, _ in built]
+        constant = all(is_constant for _, is_constant in built)
+        return _fold(lambda values: _checked(function(*[arg(values) for arg in args])), constant)
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        raise CalculationError(f"Unknown function: {node.func.id}")
+    raise CalculationError(f"Unsupported syntax: {type(node).__name__}")
+
+
+def _fold(evaluate, constant: bool):
+    """Evaluate constant sub-expressions once, at compile time"""
+    if not constant:
+        return evaluate, False
+    try:
+        value = _run(evaluate, {})
+    except CalculationError:
+        # e.g. 1/0 - keep the closure so the error surfaces on evaluation
+        return evaluate, True
+    return (lambda values: value), True
+
+
+def _number(value, name):
+    if isinstance(value, bool) or not isinstance(value, Number):
+        raise CalculationError(f"{name} must be a number")
+    return _checked(value)
+
+
+def _checked(value):
+    if isinstance(value, int) and value.bit_length() > MAX_INT_BITS:
+        raise CalculationError("Result is too large")
+    return value
+
+
+def _power(base, exponent):
+    if abs(exponent) > MAX_EXPONENT:
+        raise CalculationError(f"Exponent larger than {MAX_EXPONENT}")
+    # Reject huge integer powers before computing them
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0:
+        if (abs(base).bit_length() - 1) * exponent > MAX_INT_BITS:
+            raise CalculationError("Result is too large")
+    if isinstance(base, Number) and base < 0 and isinstance(exponent, float) and not exponent.is_integer():
+        raise CalculationError("Negative base with fractional exponent")
+    return _checked(base ** exponent)
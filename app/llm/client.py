@@ -1,90 +1,245 @@
 import os
+import time
 import asyncio
-import google.generativeai as genai
 from dotenv import load_dotenv
+from fastapi import WebSocketDisconnect
+
+from app.llm.context import ConversationStore
+from app.llm.providers import GeminiProvider, ProviderRouter, create_providers
+from app.llm.response_cache import ResponseCache
+from app.llm.tools import ToolRegistry
+from app.telemetry.tracing import set_attributes, traced
+from app.telemetry.log import get_logger
+from app.websocket.tool_stream import send_tool_result
 
 load_dotenv()
 
+log = get_logger(__name__)
+
+# Model -> tools -> model round trips allowed in one turn
+MAX_TOOL_ROUNDS = int(os.getenv("LLM_MAX_TOOL_ROUNDS", "4"))
+
+GENERATION_CONFIG = {
+    'max_output_tokens': 200,
+    'temperature': 0.7,
+}
+
+# Used by the response cache's similarity tier (RESPONSE_CACHE_SIMILARITY > 0)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/text-embedding-004")
+
 class LLMClient:
-    """Working Gemini client with CORRECT model"""
+    """Streaming chat client over one or more LLM providers
+    
+    Requests go through a ProviderRouter (failover, circuit breakers, rate
+    limits, optional hedging). Without any API key the deterministic fake
+    provider is used. Construction is cheap: SDK imports and model objects
+    are created on first use (or by ``warm_up``), so worker startup never
+    waits on a provider.
+    """
     
-    def __init__(self):
-        api_key = os.getenv("GOOGLE_API_KEY")
+    def __init__(self, providers=None):
+        self.router = ProviderRouter(providers or create_providers())
+        self.model_name = ",".join(f"{slot.name}:{slot.provider.model_name}" for slot in self.router.slots)
+        
+        # Readiness: "cold" -> "warming" -> "ready" (or "failed")
+        self.state = "cold"
+        self.last_error = None
+        self.warmup_seconds = None
+        
+        # Per-session multi-turn history
+        self.context = ConversationStore()
         
-        if not api_key:
-            raise ValueError("❌ GOOGLE_API_KEY missing from .env")
+        # Functions the model can call
+        self.tools = ToolRegistry()
         
-        # Clean the key
-        api_key = api_key.strip().strip('"').strip("'")
+        # Answers to repeated prompts, replayed without calling a provider
+        gemini = next((s.provider for s in self.router.slots if isinstance(s.provider, GeminiProvider)), None)
+        self._embedder = gemini
+        self.responses = ResponseCache(embedder=self._embed if gemini else None)
         
-        print(f"🔑 Using Gemini key: {api_key[:15]}...")
+        # Optional EventWriter for ai_response / tool_call events (set by the app)
+        self.events = None
+        
+        log.info("🤖 LLM providers", providers=self.model_name)
+    
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+    
+    async def warm_up(self, ping: bool = False):
+        """Build the primary provider's client (optionally one tiny request) off the startup path"""
+        self.state = "warming"
+        started = time.perf_counter()
         
         try:
-            # Configure
-            genai.configure(api_key=api_key)
-            
-            # ✅ USE THE WORKING MODEL from your test:
-            # 'models/gemini-flash-latest' - THIS ONE WORKS!
-            model_name = 'models/gemini-flash-latest'
-            
-            print(f"📦 Loading model: {model_name}")
-            self.model = genai.GenerativeModel(model_name)
-            
-            # Quick test
-            test_response = self.model.generate_content("Say 'API test successful'")
-            print(f"✅ {model_name} ready! Test: '{test_response.text}'")
-            
+            await self.router.warm_up(ping)
         except Exception as e:
-            print(f"❌ Model error: {e}")
-            raise
+            log.warning("⚠️ LLM warm-up failed", error=str(e))
+            self.state = "failed"
+            self.last_error = str(e)
+            return False
+        
+        self.warmup_seconds = time.perf_counter() - started
+        self.state = "ready"
+        self.last_error = None
+        log.info("✅ LLM warm", model=self.router.primary.model_name, seconds=round(self.warmup_seconds, 2))
+        return True
+    
+    async def _embed(self, text: str):
+        return await self._embedder.embed(text, EMBEDDING_MODEL)
     
+    def build_contents(self, session_id: str, message: str, history=None):
+        """Multi-turn request: running summary, recent exchanges, then this message"""
+        summary, exchanges = history if history is not None else self.context.history(session_id)
+        contents = []
+        
+        if summary:
+            contents.append({"role": "user", "parts": [f"Summary of our earlier conversation:\n{summary}"]})
+            contents.append({"role": "model", "parts": ["Got it."]})
+        
+        for user_text, model_text in exchanges:
+            contents.append({"role": "user", "parts": [user_text]})
+            contents.append({"role": "model", "parts": [model_text]})
+        
+        contents.append({"role": "user", "parts": [
+            f"""You are a helpful AI assistant. Respond to this user message:
+                
+                "{message}"
+                
+                Keep your response concise and helpful."""
+        ]})
+        return contents
+    
+    def status(self):
+        """Readiness details for health probes"""
+        return {
+            "provider": self.router.primary.name,
+            "model": self.router.primary.model_name,
+            "providers": self.router.stats(),
+            "state": self.state,
+            "warmup_seconds": self.warmup_seconds,
+            "context_sessions": len(self.context),
+            "tool_cache": self.tools.cache.stats(),
+            "response_cache": self.responses.stats(),
+            "error": self.last_error
+        }
+    
+    @traced("process_message_stream")
     async def process_message_stream(self, session_id: str, message: str, websocket):
-        """Get REAL Gemini response"""
-        print(f"🤖 Gemini processing: '{message}'")
+        """Stream a response, one ai_message frame per chunk
+        
+        The model can call the registered tools. Each call is started as soon
+        as its part arrives, so independent calls run concurrently while the
+        rest of the response is still streaming; results are sent to the
+        client as they finish and fed back to the model for the next round.
+        """
+        log.debug("🤖 LLM processing", sample=True, session_id=session_id, message=message)
         
         # Send thinking indicator
         await websocket.send_json({
             "type": "system",
-            "message": "🤖 Gemini AI is thinking..."
+            "message": "🤖 AI is thinking..."
         })
         
+        response = None
+        pending = []
+        chunks = []
+        used_tools = False
+        ai_text = ""
+        
         try:
-            # Get REAL Gemini response
-            response = self.model.generate_content(
-                f"""You are a helpful AI assistant. Respond to this user message:
-                
-                "{message}"
-                
-                Keep your response concise and helpful.""",
-                generation_config={
-                    'max_output_tokens': 200,
-                    'temperature': 0.7,
-                }
-            )
+            history = self.context.history(session_id)
+            set_attributes(session_id=session_id, history_turns=len(history[1]))
             
-            ai_text = response.text
+            probe = None
+            if self.responses.enabled:
+                probe = await self.responses.lookup(
+                    message,
+                    history,
+                    {"model": self.model_name, **GENERATION_CONFIG}
+                )
+                if probe.hit is not None:
+                    set_attributes(cached=True)
+                    await self._replay(session_id, message, probe, websocket)
+                    return
             
-            # Send the complete response
-            await websocket.send_json({
-                "type": "ai_message",
-                "content": ai_text
-            })
+            contents = self.build_contents(session_id, message, history)
+            tools = self.tools.function_declarations()
+            
+            for round_number in range(MAX_TOOL_ROUNDS + 1):
+                # No tools on the last round - the model has to answer in text
+                allow_tools = round_number < MAX_TOOL_ROUNDS
+                
+                # Async streaming call - the event loop stays free for other sockets
+                response = self.router.stream(
+                    contents,
+                    tools=tools if allow_tools else None,
+                    config=GENERATION_CONFIG
+                )
+                
+                calls = []
+                async for part in response:
+                    if "function_call" in part:
+                        call = part["function_call"]
+                        calls.append((call["name"], call["args"]))
+                        pending.append(asyncio.create_task(
+                            self._run_tool(session_id, call["name"], call["args"], websocket)
+                        ))
+                    elif part.get("text"):
+                        # Forward each chunk as soon as it arrives
+                        ai_text += part["text"]
+                        chunks.append(part["text"])
+                        await websocket.send_json({
+                            "type": "ai_message",
+                            "content": part["text"]
+                        })
+                
+                response = None
+                
+                if not calls:
+                    break
+                
+                used_tools = True
+                # Answers go back in call order, however they finished
+                results = await asyncio.gather(*pending)
+                pending = []
+                
+                contents.append({"role": "model", "parts": [
+                    {"function_call": {"name": name, "args": args}} for name, args in calls
+                ]})
+                contents.append({"role": "user", "parts": [
+                    {"function_response": {"name": name, "response": result}}
+                    for (name, _), result in zip(calls, results)
+                ]})
             
             await websocket.send_json({
                 "type": "ai_message_end"
             })
             
-            print(f"✅ REAL Gemini response: '{ai_text[:50]}...'")
+            log.info("✅ LLM response", sample=True, session_id=session_id, response=ai_text, tools=used_tools)
+            self.state = "ready"
+            
+            # Remember the exchange for the next turn
+            self.context.append(session_id, message, ai_text)
+            
+            # Answers that depended on tool results may not hold next time
+            if probe is not None and not used_tools:
+                self.responses.store(probe, chunks)
             
-            # Return True if tool should be called
-            tool_keywords = ['calculate', 'math', 'compute', 'solve', '+', '-', '*', '/']
-            return any(keyword in message.lower() for keyword in tool_keywords)
+            if self.events:
+                await self.events.record(session_id, "ai_response", ai_text)
+        
+        except (WebSocketDisconnect, asyncio.CancelledError):
+            # Socket dropped mid-stream: stop pulling chunks from the provider
+            log.info("🛑 Stream cancelled", session_id=session_id)
+            raise
             
         except Exception as e:
-            print(f"❌ Gemini error: {e}")
+            log.error("❌ LLM error", session_id=session_id, error=str(e))
+            self.last_error = str(e)
             
             # Send fallback response
-            fallback = "I'm your AI assistant. (Temporary API limit reached)"
+            fallback = "I'm your AI assistant. (All AI providers are unavailable right now - please try again shortly)"
             await websocket.send_json({
                 "type": "ai_message",
                 "content": fallback
@@ -93,5 +248,47 @@ class LLMClient:
             await websocket.send_json({
                 "type": "ai_message_end"
             })
-            
-            return False
\ No newline at end of file
+        
+        finally:
+            for task in pending:
+                task.cancel()
+            if response is not None:
+                await response.aclose()
+    
+    async def _replay(self, session_id: str, message: str, probe, websocket):
+        """Stream a cached answer with the same frames as a live one"""
+        cached = probe.hit
+        log.info("♻️ Response cache hit", sample=True, session_id=session_id, similarity=round(probe.similarity, 3))
+        
+        for chunk in cached.chunks:
+            await websocket.send_json({
+                "type": "ai_message",
+                "content": chunk
+            })
+        
+        await websocket.send_json({
+            "type": "ai_message_end",
+            "cached": True
+        })
+        
+        self.context.append(session_id, message, cached.text)
+        
+        if self.events:
+            await self.events.record(session_id, "ai_response", cached.text, {
+                "cached": True,
+                "similarity": round(probe.similarity, 4)
+            })
+    
+    async def _run_tool(self, session_id: str, name: str, args: dict, websocket):
+        """Run one tool call and stream its result to the client"""
+        log.info("🔧 Tool call", sample=True, session_id=session_id, tool=name, args=args)
+        result = await self.tools.run(name, args)
+        
+        await send_tool_result(websocket, name, result)
+        
+        if self.events:
+            await self.events.record(session_id, "tool_call", name, {
+                "arguments": args,
+                "result": result
+            })
+        return result
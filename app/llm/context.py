@@ -0,0 +1,129 @@
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Tuple
+
+# Rough token estimate (~4 characters per token) - good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class SessionContext:
+    """History for one session: a ring buffer of (user, model, tokens) exchanges"""
+
+    __slots__ = ("exchanges", "tokens", "summary", "last_used")
+
+    def __init__(self, max_exchanges: int):
+        self.exchanges: Deque[Tuple[str, str, int]] = deque(maxlen=max_exchanges)
+        self.tokens = 0
+        self.summary = ""
+        self.last_used = time.monotonic()
+
+
+class ConversationStore:
+    """Bounded, in-memory multi-turn history keyed by session_id.
+
+    Each session keeps its most recent exchanges inside a token budget; the
+    oldest exchanges are folded into a short running summary when they fall
+    out. Sessions are evicted least-recently-used first, both when the store
+    is full and once they sit idle longer than the TTL.
+    """
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        max_exchanges: Optional[int] = None,
+        max_sessions: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        summary_chars: int = 1000,
+    ):
+        self.token_budget = token_budget or int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+        self.max_exchanges = max_exchanges or int(os.getenv("CONTEXT_MAX_EXCHANGES", "16"))
+        self.max_sessions = max_sessions or int(os.getenv("CONTEXT_MAX_SESSIONS", "10000"))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("CONTEXT_TTL_SECONDS", "1800"))
+        self.summary_chars = summary_chars
+
+        # A single exchange may not use more than the whole budget
+        self._max_chars = self.token_budget * CHARS_PER_TOKEN
+
+        self._sessions: "OrderedDict[str, SessionContext]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str):
+        return session_id in self._sessions
+
+    def history(self, session_id: str) -> Tuple[str, List[Tuple[str, str]]]:
+        """Return (summary, [(user, model), ...]) oldest first"""
+        self._expire()
+        context = self._sessions.get(session_id)
+        if context is None:
+            return "", []
+
+        self._touch(session_id, context)
+        return context.summary, [(user, model) for user, model, _ in context.exchanges]
+
+    def append(self, session_id: str, user_text: str, model_text: str):
+        """Record one completed exchange, trimming the session to its budget"""
+        self._expire()
+        context = self._sessions.get(session_id)
+        if context is None:
+            context = SessionContext(self.max_exchanges)
+            self._sessions[session_id] = context
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+        self._touch(session_id, context)
+
+        user_text = user_text[:self._max_chars]
+        model_text = model_text[:self._max_chars]
+        tokens = estimate_tokens(user_text) + estimate_tokens(model_text)
+
+        # Ring buffer is full - fold the oldest exchange into the summary first
+        if len(context.exchanges) == context.exchanges.maxlen:
+            self._drop_oldest(context)
+
+        context.exchanges.append((user_text, model_text, tokens))
+        context.tokens += tokens
+
+        # Always keep the newest exchange, even if it alone exceeds the budget
+        while context.tokens > self.token_budget and len(context.exchanges) > 1:
+            self._drop_oldest(context)
+
+    def discard(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def _drop_oldest(self, context: SessionContext):
+        user, model, tokens = context.exchanges.popleft()
+        context.tokens -= tokens
+
+        line = f"User: {_clip(user, 120)} / Assistant: {_clip(model, 120)}"
+        summary = f"{context.summary}\n{line}" if context.summary else line
+
+        # Keep the running summary bounded - oldest lines go first
+        if len(summary) > self.summary_chars:
+            summary = summary[-self.summary_chars:]
+            summary = summary[summary.find("\n") + 1:] if "\n" in summary else summary
+        context.summary = summary
+
+    def _touch(self, session_id: str, context: SessionContext):
+        context.last_used = time.monotonic()
+        self._sessions.move_to_end(session_id)
+
+    def _expire(self):
+        """Evict idle sessions; LRU order means they are all at the front"""
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            session_id, context = next(iter(self._sessions.items()))
+            if context.last_used >= cutoff:
+                break
+            del self._sessions[session_id]
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
@@ -0,0 +1,97 @@
+import os
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+DEFAULT_MAX_IN_FLIGHT = 8
+
+
+class LLMExecutor:
+    """Per-worker admission control for LLM generations.
+
+    At most ``max_in_flight`` generations run at once; everyone else waits in a
+    FIFO queue and is told their position, so a burst degrades into a queue
+    instead of slowing every session down together.
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None):
+        if max_in_flight is None:
+            max_in_flight = int(os.getenv("LLM_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT))
+
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        # Counters for the queue-depth metric
+        self.total_started = 0
+        self.total_queued = 0
+        self.peak_queue_depth = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of generations waiting for a slot"""
+        return len(self._waiters)
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of executor load"""
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "peak_queue_depth": self.peak_queue_depth,
+            "total_started": self.total_started,
+            "total_queued": self.total_queued,
+        }
+
+    async def acquire(self, on_queued: Optional[Callable[[int], Awaitable[None]]] = None):
+        """Wait for a generation slot, reporting the queue position if we have to wait"""
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.total_started += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.total_queued += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, len(self._waiters))
+
+        try:
+            if on_queued is not None:
+                await on_queued(len(self._waiters))
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed to us just as we gave up - pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+        self.total_started += 1
+
+    def release(self):
+        """Hand the slot to the next waiter, or free it"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, on_queued: Optional[Callable[[int], Awaitable[None]]] = None):
+        """``async with executor.slot(): ...`` around one generation"""
+        await self.acquire(on_queued)
+        try:
+            yield
+        finally:
+            self.release()
@@ -0,0 +1,628 @@
+import os
+import re
+import json
+import time
+import asyncio
+import importlib.util
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.llm.resilience import CircuitBreaker, TokenBucket
+from app.websocket.session_metrics import LatencyHistogram
+from app.telemetry.log import get_logger
+
+# Requests are written in Gemini's content shape, which every provider takes:
+#   [{"role": "user" | "model", "parts": [<part>, ...]}, ...]
+# where a part is a string, {"function_call": {"name", "args"}} or
+# {"function_response": {"name", "response"}}. Streams yield parts too:
+# {"text": "..."} or {"function_call": {...}}.
+Contents = List[Dict[str, Any]]
+Part = Dict[str, Any]
+
+log = get_logger(__name__)
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "models/gemini-flash-latest")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+# Seconds to back off a provider after a 429 without Retry-After
+RATE_LIMIT_COOLDOWN = float(os.getenv("LLM_RATE_LIMIT_COOLDOWN", "10"))
+
+
+class ProviderError(Exception):
+    """No provider could serve the request"""
+
+
+class Provider:
+    """One LLM backend
+
+    ``stream`` yields parts as they arrive; ``complete`` returns a whole
+    answer. Construction must be cheap - clients and SDK imports happen in
+    ``warm_up`` or on first use.
+    """
+
+    name = "provider"
+    model_name = ""
+
+    async def warm_up(self, ping: bool = False):
+        pass
+
+    def stream(self, contents: Contents, tools: Optional[List[Dict[str, Any]]] = None,
+               config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Part]:
+        raise NotImplementedError
+
+    async def complete(self, system: str, prompt: str, temperature: float = 0.3, max_tokens: int = 1000) -> str:
+        text = []
+        contents = [{"role": "user", "parts": [f"{system}\n\n{prompt}"]}]
+        config = {"temperature": temperature, "max_output_tokens": max_tokens}
+        async for part in self.stream(contents, config=config):
+            text.append(part.get("text", ""))
+        return "".join(text)
+
+
+class GeminiProvider(Provider):
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str = GEMINI_MODEL):
+        if importlib.util.find_spec("google.generativeai") is None:
+            raise ImportError("❌ google-generativeai is not installed")
+
+        # Clean the key
+        self._api_key = api_key.strip().strip('"').strip("'")
+        self.model_name = model_name
+        self._model = None
+
+    @property
+    def model(self):
+        """Gemini model, built on first access"""
+        if self._model is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=self._api_key)
+            log.info("📦 Loading model", model=self.model_name)
+            self._model = genai.GenerativeModel(self.model_name)
+
+        return self._model
+
+    async def _get_model(self):
+        # SDK import + model construction are blocking - keep them off the loop
+        return self._model or await asyncio.to_thread(lambda: self.model)
+
+    async def warm_up(self, ping: bool = False):
+        model = await self._get_model()
+        if ping:
+            await model.generate_content_async("ping", generation_config={'max_output_tokens': 1})
+
+    async def stream(self, contents, tools=None, config=None):
+        model = await self._get_model()
+
+        response = await model.generate_content_async(
+            contents,
+            generation_config=config,
+            tools=[{"function_declarations": tools}] if tools else None,
+            stream=True
+        )
+
+        try:
+            async for chunk in response:
+                for part in _chunk_parts(chunk):
+                    if "function_call" in part:
+                        call = type(part.function_call).to_dict(part.function_call)
+                        yield {"function_call": {"name": call["name"], "args": call.get("args") or {}}}
+                    elif "text" in part and part.text:
+                        yield {"text": part.text}
+        finally:
+            await _close_stream(response)
+
+    async def embed(self, text: str, model: str) -> List[float]:
+        await self._get_model()
+        import google.generativeai as genai
+
+        result = await genai.embed_content_async(model=model, content=text, task_type="semantic_similarity")
+        return result["embedding"]
+
+
+class OpenAIProvider(Provider):
+    name = "openai"
+
+    def __init__(self, api_key: str, model_name: str = OPENAI_MODEL):
+        if importlib.util.find_spec("openai") is None:
+            raise ImportError("❌ openai is not installed")
+
+        self._api_key = api_key
+        self.model_name = model_name
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=self._api_key)
+        return self._client
+
+    async def warm_up(self, ping: bool = False):
+        await asyncio.to_thread(lambda: self.client)
+        if ping:
+            await self.client.chat.completions.create(
+                model=self.model_name,
+                messages=[{"role": "user", "content": "ping"}],
+                max_tokens=1
+            )
+
+    async def stream(self, contents, tools=None, config=None):
+        config = config or {}
+        kwargs = {}
+        if tools:
+            kwargs["tools"] = [{"type": "function", "function": tool} for tool in tools]
+
+        response = await self.client.chat.completions.create(
+            model=self.model_name,
+            messages=_openai_messages(contents),
+            temperature=config.get("temperature"),
+            max_tokens=config.get("max_output_tokens"),
+            stream=True,
+            **kwargs
+        )
+
+        # Tool call names/arguments arrive in fragments; emit them once complete
+        calls: Dict[int, Dict[str, str]] = {}
+        try:
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    yield {"text": delta.content}
+
+                for call in delta.tool_calls or []:
+                    entry = calls.setdefault(call.index, {"name": "", "arguments": ""})
+                    if call.function and call.function.name:
+                        entry["name"] += call.function.name
+                    if call.function and call.function.arguments:
+                        entry["arguments"] += call.function.arguments
+        finally:
+            close = getattr(response, "close", None)
+            if callable(close):
+                try:
+                    await close()
+                except Exception:
+                    pass
+
+        for index in sorted(calls):
+            entry = calls[index]
+            yield {"function_call": {"name": entry["name"], "args": json.loads(entry["arguments"] or "{}")}}
+
+    async def complete(self, system, prompt, temperature=0.3, max_tokens=1000):
+        response = await self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content
+
+
+class FakeProvider(Provider):
+    """Deterministic local backend for development and tests (no API key)
+
+    Echoes the message back in a few chunks. Math messages produce a
+    ``calculate`` call when tools are offered, and the result is quoted in the
+    next round - so the whole tool loop runs offline.
+
+    For load tests, ``token_rate`` (FAKE_LLM_TOKENS_PER_SEC) switches to a
+    model-like stream instead: ``latency`` before the first token, then
+    ``tokens`` word tokens at that rate.
+    """
+
+    name = "fake"
+    model_name = "fake"
+
+    _math = re.compile(r"\d[\d\s.+\-*/%()^]*\d")
+    _filler = ("the", "quick", "brown", "fox", "jumps", "over", "a", "lazy", "dog.")
+
+    def __init__(
+        self,
+        delay: Optional[float] = None,
+        latency: Optional[float] = None,
+        token_rate: Optional[float] = None,
+        tokens: Optional[int] = None,
+    ):
+        self.delay = delay if delay is not None else float(os.getenv("FAKE_LLM_DELAY_MS", "200")) / 1000
+        self.latency = latency if latency is not None else float(os.getenv("FAKE_LLM_LATENCY_MS", "0")) / 1000
+        self.token_rate = token_rate if token_rate is not None else float(os.getenv("FAKE_LLM_TOKENS_PER_SEC", "0"))
+        self.tokens = tokens if tokens is not None else int(os.getenv("FAKE_LLM_TOKENS", "50"))
+
+    async def stream(self, contents, tools=None, config=None):
+        last = contents[-1]["parts"]
+        responses = [part["function_response"] for part in last if isinstance(part, dict) and "function_response" in part]
+
+        if responses:
+            for response in responses:
+                result = response["response"]
+                value = result.get("result", result.get("error"))
+                yield {"text": f"\n\n🔧 {response['name']} returned: {value}"}
+                await asyncio.sleep(self.delay)
+            return
+
+        message = _last_user_text(contents)
+        tool_names = {tool["name"] for tool in tools or []}
+        expression = self._math.search(message)
+        if "calculate" in tool_names and expression and re.search(r"calculate|math|compute|solve|[+\-*/]", message.lower()):
+            yield {"function_call": {"name": "calculate", "args": {"expression": expression.group().strip()}}}
+
+        if self.token_rate > 0:
+            async for part in self._token_stream(message):
+                yield part
+            return
+
+        for text in [
+            f"You said: '{message}'",
+            "\n\n(Simulated mode - add valid GOOGLE_API_KEY for real Gemini)",
+            "\n\nFeatures demonstrated:",
+            "\n✅ WebSocket communication",
+            "\n✅ Streaming responses",
+            "\n✅ Database persistence",
+            "\n✅ Tool calling",
+        ]:
+            yield {"text": text}
+            await asyncio.sleep(self.delay)
+
+    async def _token_stream(self, message: str):
+        words = f"You said: '{message}'".split()
+        while len(words) < self.tokens:
+            words.append(self._filler[len(words) % len(self._filler)])
+
+        await asyncio.sleep(self.latency)
+        interval = 1 / self.token_rate
+        started = time.monotonic()
+        for index, word in enumerate(words):
+            # Paced against the start time, so event-loop lag doesn't slow the stream down
+            delay = started + index * interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield {"text": word if index == 0 else " " + word}
+
+    async def complete(self, system, prompt, temperature=0.3, max_tokens=1000):
+        return f"Simulated analysis ({len(prompt)} characters of input)"
+
+
+class ProviderSlot:
+    """A provider plus its circuit breaker, rate limit and first-token latency"""
+
+    def __init__(self, provider: Provider, breaker: CircuitBreaker, bucket: TokenBucket):
+        self.provider = provider
+        self.breaker = breaker
+        self.bucket = bucket
+        self.time_to_first_token = LatencyHistogram()
+        self.requests = 0
+        self.failures = 0
+        self.hedged = 0
+
+    @property
+    def name(self) -> str:
+        return self.provider.name
+
+    def available(self) -> bool:
+        """Breaker closed (or trial allowed) and a rate-limit token taken"""
+        if self.breaker.state == "open" or self.bucket.wait_time() > 0:
+            return False
+        return self.breaker.allow() and self.bucket.try_acquire()
+
+    def failed(self, error: Exception):
+        self.failures += 1
+        self.breaker.record_failure()
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            self.bucket.penalize(retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "model": self.provider.model_name,
+            "requests": self.requests,
+            "failures": self.failures,
+            "hedged": self.hedged,
+            "breaker": self.breaker.stats(),
+            "rate_limit": self.bucket.stats(),
+            "ttft_p95_seconds": self.time_to_first_token.quantile(0.95),
+        }
+
+
+class ProviderRouter:
+    """Routes each request to the first healthy provider, with failover and hedging
+
+    Providers are tried in order, skipping those whose breaker is open or
+    whose token bucket is empty. A provider that fails before its first part
+    is recorded as a failure and the next one is tried; once a stream has
+    produced output it is committed to.
+
+    With ``hedge`` on, if the chosen provider hasn't produced its first part
+    within its p95 time-to-first-token, the next available provider is
+    started too and whichever answers first wins; the other is cancelled.
+    """
+
+    def __init__(
+        self,
+        providers: List[Provider],
+        hedge: Optional[bool] = None,
+        hedge_min_delay: Optional[float] = None,
+        hedge_default_delay: Optional[float] = None,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+    ):
+        if not providers:
+            raise ValueError("At least one provider is required")
+
+        self.hedge = hedge if hedge is not None else os.getenv("LLM_HEDGE", "0") == "1"
+        self.hedge_min_delay = hedge_min_delay if hedge_min_delay is not None else float(
+            os.getenv("LLM_HEDGE_MIN_MS", "250")
+        ) / 1000
+        # Used until a provider has enough samples for a meaningful p95
+        self.hedge_default_delay = hedge_default_delay if hedge_default_delay is not None else float(
+            os.getenv("LLM_HEDGE_DEFAULT_MS", "1500")
+        ) / 1000
+        failure_threshold = failure_threshold or int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+        reset_timeout = reset_timeout or float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+        self.slots = [
+            ProviderSlot(
+                provider,
+                CircuitBreaker(failure_threshold, reset_timeout),
+                TokenBucket(_provider_rate(provider.name))
+            )
+            for provider in providers
+        ]
+
+    @property
+    def primary(self) -> Provider:
+        return self.slots[0].provider
+
+    async def warm_up(self, ping: bool = False):
+        await self.primary.warm_up(ping)
+
+    def hedge_delay(self, slot: ProviderSlot) -> float:
+        histogram = slot.time_to_first_token
+        if histogram.count < 20:
+            return self.hedge_default_delay
+        return max(histogram.quantile(0.95), self.hedge_min_delay)
+
+    async def stream(self, contents: Contents, tools=None, config=None) -> AsyncIterator[Part]:
+        """Stream parts from the first provider that answers"""
+        errors = []
+
+        for index, slot in enumerate(self.slots):
+            if not slot.available():
+                continue
+
+            hedge_slot = None
+            if self.hedge:
+                hedge_slot = next((s for s in self.slots[index + 1:] if s.breaker.state != "open"), None)
+
+            try:
+                winner, stream, first = await self._first_part(slot, hedge_slot, contents, tools, config)
+            except Exception as e:
+                errors.append(f"{slot.name}: {e}")
+                log.warning("⚠️ LLM provider failed, trying the next one", provider=slot.name, error=str(e))
+                continue
+
+            try:
+                if first is not None:
+                    yield first
+                async for part in stream:
+                    yield part
+            except Exception as e:
+                winner.failed(e)
+                raise
+            finally:
+                await stream.aclose()
+            return
+
+        raise ProviderError("; ".join(errors) or "No LLM provider available (circuit open or rate limited)")
+
+    async def complete(self, system: str, prompt: str, temperature: float = 0.3, max_tokens: int = 1000) -> str:
+        """Whole answer from the first provider that succeeds (no hedging)"""
+        errors = []
+        for slot in self.slots:
+            if not slot.available():
+                continue
+
+            slot.requests += 1
+            try:
+                text = await slot.provider.complete(system, prompt, temperature, max_tokens)
+            except Exception as e:
+                slot.failed(e)
+                errors.append(f"{slot.name}: {e}")
+                continue
+
+            slot.breaker.record_success()
+            return text
+
+        raise ProviderError("; ".join(errors) or "No LLM provider available (circuit open or rate limited)")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [slot.stats() for slot in self.slots]
+
+    async def _first_part(self, slot, hedge_slot, contents, tools, config):
+        """Start ``slot`` (and maybe a hedge); return (winner, stream, first part)"""
+        started = time.perf_counter()
+        racers = {self._start(slot, contents, tools, config): slot}
+
+        if hedge_slot is not None:
+            done, _ = await asyncio.wait(set(racers), timeout=self.hedge_delay(slot))
+            # Hedge only if the primary is slow - not if it already failed
+            if not done and hedge_slot.available():
+                hedge_slot.hedged += 1
+                log.info("⏱️ Slow to first token, hedging", provider=slot.name, hedge=hedge_slot.name)
+                racers[self._start(hedge_slot, contents, tools, config)] = hedge_slot
+
+        pending = set(racers)
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    racer = racers[task]
+                    try:
+                        stream, first = task.result()
+                    except Exception as e:
+                        racer.failed(e)
+                        last_error = e
+                        continue
+
+                    racer.breaker.record_success()
+                    racer.time_to_first_token.observe(time.perf_counter() - started)
+                    return racer, stream, first
+        finally:
+            for task in pending:
+                task.cancel()
+                racers[task].breaker.release()
+            for task in pending:
+                await _discard(task)
+
+        raise last_error
+
+    def _start(self, slot: ProviderSlot, contents, tools, config) -> asyncio.Task:
+        slot.requests += 1
+
+        async def first_part():
+            stream = slot.provider.stream(contents, tools, config)
+            try:
+                return stream, await stream.__anext__()
+            except StopAsyncIteration:
+                return stream, None
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        return asyncio.create_task(first_part())
+
+
+def create_providers(
+    names: Optional[str] = None,
+    gemini_model: str = GEMINI_MODEL,
+    openai_model: str = OPENAI_MODEL,
+) -> List[Provider]:
+    """Providers named in ``names`` (LLM_PROVIDERS, default "gemini,openai") that are configured
+
+    Falls back to the fake provider when none are usable, so the app still
+    runs without keys.
+    """
+    names = names if names is not None else os.getenv("LLM_PROVIDERS", "gemini,openai")
+    providers: List[Provider] = []
+
+    for name in [n.strip().lower() for n in names.split(",") if n.strip()]:
+        try:
+            if name == "gemini" and os.getenv("GOOGLE_API_KEY"):
+                providers.append(GeminiProvider(os.getenv("GOOGLE_API_KEY"), gemini_model))
+            elif name == "openai" and os.getenv("OPENAI_API_KEY"):
+                providers.append(OpenAIProvider(os.getenv("OPENAI_API_KEY"), openai_model))
+            elif name == "fake":
+                providers.append(FakeProvider())
+        except ImportError as e:
+            log.warning("⚠️ Skipping LLM provider", provider=name, error=str(e))
+
+    if not providers:
+        log.info("🤖 No LLM provider configured - using the simulated provider")
+        providers.append(FakeProvider())
+
+    return providers
+
+
+def _provider_rate(name: str) -> float:
+    """Requests per second allowed for a provider (<NAME>_RPM, 0 = unlimited)"""
+    return float(os.getenv(f"{name.upper()}_RPM", "0")) / 60
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Back-off for rate-limit errors (429 / ResourceExhausted), else None"""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    kind = type(error).__name__
+    if status != 429 and "RateLimit" not in kind and "ResourceExhausted" not in kind:
+        return None
+
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return RATE_LIMIT_COOLDOWN
+
+
+def _last_user_text(contents: Contents) -> str:
+    for content in reversed(contents):
+        if content["role"] != "user":
+            continue
+        texts = [part for part in content["parts"] if isinstance(part, str)]
+        if texts:
+            # LLMClient wraps the message in an instruction; echo just the quoted message
+            quoted = re.search(r'"(.*)"', texts[-1], re.S)
+            return quoted.group(1) if quoted else texts[-1]
+    return ""
+
+
+def _openai_messages(contents: Contents) -> List[Dict[str, Any]]:
+    """Gemini-shaped contents as chat messages (function calls become tool calls)"""
+    messages = []
+    call_ids: List[str] = []
+
+    for index, content in enumerate(contents):
+        texts = [part if isinstance(part, str) else part["text"]
+                 for part in content["parts"] if isinstance(part, str) or "text" in part]
+        calls = [part["function_call"] for part in content["parts"] if isinstance(part, dict) and "function_call" in part]
+        responses = [part["function_response"] for part in content["parts"] if isinstance(part, dict) and "function_response" in part]
+
+        if calls:
+            call_ids = [f"call_{index}_{i}" for i in range(len(calls))]
+            messages.append({
+                "role": "assistant",
+                "content": "\n".join(texts) or None,
+                "tool_calls": [
+                    {
+                        "id": call_id,
+                        "type": "function",
+                        "function": {"name": call["name"], "arguments": json.dumps(call.get("args") or {})}
+                    }
+                    for call_id, call in zip(call_ids, calls)
+                ]
+            })
+        elif responses:
+            for call_id, response in zip(call_ids, responses):
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": call_id,
+                    "content": json.dumps(response["response"], default=str)
+                })
+        else:
+            role = "assistant" if content["role"] == "model" else "user"
+            messages.append({"role": role, "content": "\n".join(texts)})
+
+    return messages
+
+
+def _chunk_parts(chunk):
+    """Content parts of a streamed chunk (empty for e.g. safety stops)"""
+    if not chunk.candidates:
+        return []
+    return chunk.candidates[0].content.parts
+
+
+async def _close_stream(response):
+    """Close the underlying streaming RPC if it is still open"""
+    iterator = getattr(response, "_iterator", None)
+    aclose = getattr(iterator, "aclose", None)
+    if callable(aclose):
+        try:
+            await aclose()
+        except Exception:
+            pass
+
+
+async def _discard(task: asyncio.Task):
+    """Wait for a cancelled racer and close the stream it may have opened"""
+    try:
+        stream, _ = await task
+    except BaseException:
+        return
+    await stream.aclose()
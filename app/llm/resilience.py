@@ -0,0 +1,130 @@
+import time
+import asyncio
+from typing import Any, Dict, Optional
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, bursts up to ``capacity``
+
+    A rate of 0 means unlimited. ``penalize`` empties the bucket for a while
+    (e.g. after the upstream answered 429 with a Retry-After).
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return False
+        if self.unlimited:
+            return True
+
+        self._refill(now)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        """Seconds until ``amount`` tokens are available (0 if they are now)"""
+        now = time.monotonic()
+        blocked = max(self.blocked_until - now, 0.0)
+        if self.unlimited:
+            return blocked
+
+        self._refill(now)
+        missing = max(amount - self.tokens, 0.0)
+        return max(blocked, missing / self.rate)
+
+    async def acquire(self, amount: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Wait for tokens; False if that would take longer than ``timeout``"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.try_acquire(amount):
+            delay = self.wait_time(amount)
+            if deadline is not None and time.monotonic() + delay > deadline:
+                return False
+            await asyncio.sleep(delay)
+        return True
+
+    def penalize(self, seconds: float):
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        blocked = round(max(self.blocked_until - time.monotonic(), 0.0), 2)
+        if self.unlimited:
+            return {"rate": 0, "blocked_seconds": blocked}
+        self._refill(time.monotonic())
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "tokens": round(self.tokens, 2),
+            "blocked_seconds": blocked,
+        }
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency for a while
+
+    closed -> (``failure_threshold`` consecutive failures) -> open ->
+    (``reset_timeout`` later) -> half-open: one trial call; success closes
+    the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_running or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+
+    def release(self):
+        """Give back a half-open trial that ended without a verdict (e.g. cancelled)"""
+        self._trial_running = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures}
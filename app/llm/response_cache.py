@@ -0,0 +1,231 @@
+import os
+import re
+import json
+import math
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.telemetry.log import get_logger
+
+# numpy is optional - it vectorizes the similarity scan
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+log = get_logger(__name__)
+
+# embed(text) -> vector; any local or remote embedding model will do
+Embedder = Callable[[str], Awaitable[Sequence[float]]]
+
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case, whitespace and trailing punctuation don't change the answer"""
+    return _SPACE.sub(" ", prompt).strip().lower().rstrip("?!. ")
+
+
+class CachedResponse:
+    __slots__ = ("chunks", "expires_at", "vector", "hits")
+
+    def __init__(self, chunks: List[str], expires_at: float, vector: Optional[Sequence[float]] = None):
+        self.chunks = chunks
+        self.expires_at = expires_at
+        self.vector = vector
+        self.hits = 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+
+class CacheProbe:
+    """Result of a lookup; pass it back to ``store`` on a miss"""
+
+    __slots__ = ("key", "vector", "hit", "similarity")
+
+    def __init__(self, key: str, vector=None, hit: Optional[CachedResponse] = None, similarity: float = 1.0):
+        self.key = key
+        self.vector = vector
+        self.hit = hit
+        self.similarity = similarity
+
+
+class ResponseCache:
+    """Cache of model responses for repeated prompts
+
+    Opt-in (``RESPONSE_CACHE_TTL`` > 0): entries are shared by every
+    session and user, and a hit replays an earlier sampled answer - up to
+    TTL seconds old - instead of asking the model again. Only enable it
+    for deployments where that is acceptable.
+
+    Exact tier: key is a hash of the normalized prompt, the conversation
+    history it was asked in and the model/generation config.
+
+    Semantic tier (only with an ``embedder`` and ``similarity_threshold`` > 0):
+    prompts asked without history are also matched by cosine similarity
+    against a small in-memory index of unit vectors. Follow-ups are never
+    matched this way - their meaning depends on the history. The scan runs
+    in a worker thread (vectorized with numpy when installed) so it never
+    holds up the event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        similarity_threshold: Optional[float] = None,
+        embedder: Optional[Embedder] = None,
+        max_vectors: Optional[int] = None,
+    ):
+        self.max_entries = max_entries or int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("RESPONSE_CACHE_TTL", "0"))
+        self.similarity_threshold = similarity_threshold if similarity_threshold is not None else float(
+            os.getenv("RESPONSE_CACHE_SIMILARITY", "0")
+        )
+        self.max_vectors = max_vectors or int(os.getenv("RESPONSE_CACHE_MAX_VECTORS", "512"))
+        self.embedder = embedder
+
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        # Keys of history-free entries that carry a vector, oldest first
+        self._vectors: "OrderedDict[str, Sequence[float]]" = OrderedDict()
+
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.embed_errors = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def semantic(self) -> bool:
+        return self.embedder is not None and self.similarity_threshold > 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    @staticmethod
+    def key(prompt: str, history: Any, config: Dict[str, Any]) -> str:
+        material = json.dumps(
+            [normalize_prompt(prompt), history, config],
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    async def lookup(self, prompt: str, history: Any, config: Dict[str, Any]) -> CacheProbe:
+        probe = CacheProbe(self.key(prompt, history, config))
+        now = time.monotonic()
+
+        entry = self._get(probe.key, now)
+        if entry is not None:
+            self.hits += 1
+            entry.hits += 1
+            probe.hit = entry
+            return probe
+
+        if self.semantic and not _has_history(history):
+            probe.vector = await self._embed(normalize_prompt(prompt))
+            if probe.vector is not None:
+                # Snapshot on the loop; store() may change the index while the thread scans
+                candidates = list(self._vectors.items())
+                match_key, similarity = await asyncio.to_thread(_nearest, probe.vector, candidates)
+                if match_key is not None and similarity >= self.similarity_threshold:
+                    entry = self._get(match_key, now)
+                    if entry is not None:
+                        self.semantic_hits += 1
+                        entry.hits += 1
+                        probe.hit = entry
+                        probe.similarity = similarity
+                        return probe
+
+        self.misses += 1
+        return probe
+
+    def store(self, probe: CacheProbe, chunks: List[str]):
+        if not chunks:
+            return
+
+        entry = CachedResponse(list(chunks), time.monotonic() + self.ttl_seconds, probe.vector)
+        self._entries[probe.key] = entry
+        self._entries.move_to_end(probe.key)
+
+        if probe.vector is not None:
+            self._vectors[probe.key] = probe.vector
+            self._vectors.move_to_end(probe.key)
+            while len(self._vectors) > self.max_vectors:
+                self._vectors.popitem(last=False)
+
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            self._vectors.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "vectors": len(self._vectors),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "embed_errors": self.embed_errors,
+        }
+
+    def _get(self, key: str, now: float) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            del self._entries[key]
+            self._vectors.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def _embed(self, text: str) -> Optional[Sequence[float]]:
+        try:
+            vector = [float(x) for x in await self.embedder(text)]
+        except Exception as e:
+            self.embed_errors += 1
+            log.warning("⚠️ Response cache embedding failed", error=str(e))
+            return None
+
+        if numpy is not None:
+            array = numpy.asarray(vector)
+            norm = float(numpy.linalg.norm(array))
+            return array / norm if norm else None
+
+        norm = math.sqrt(sum(x * x for x in vector))
+        if not norm:
+            return None
+        return [x / norm for x in vector]
+
+
+def _nearest(vector: Sequence[float], candidates: List[Tuple[str, Sequence[float]]]) -> Tuple[Optional[str], float]:
+    """Most similar unit vector (dot product = cosine similarity)"""
+    if not candidates:
+        return None, -1.0
+
+    if numpy is not None:
+        similarities = numpy.stack([other for _, other in candidates]) @ vector
+        index = int(similarities.argmax())
+        return candidates[index][0], float(similarities[index])
+
+    best_key, best = None, -1.0
+    for key, other in candidates:
+        similarity = sum(a * b for a, b in zip(vector, other))
+        if similarity > best:
+            best_key, best = key, similarity
+    return best_key, best
+
+
+def _has_history(history) -> bool:
+    summary, exchanges = history
+    return bool(summary or exchanges)
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+Key = Tuple[str, str]
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class ToolResultCache:
+    """Shared cache for tool results, keyed on tool name + normalized arguments
+
+    - per-tool TTLs; tools without one are never cached
+    - size-bounded LRU across all tools
+    - single-flight: concurrent identical calls share one upstream call
+    - stale-while-revalidate: for ``stale_seconds`` after expiry the old
+      result is served at once while one background call refreshes it
+
+    Failed results (``success: False``) and exceptions are never stored.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        max_entries: Optional[int] = None,
+        stale_seconds: Optional[float] = None,
+    ):
+        self.ttls = dict(ttls or {})
+        self.max_entries = max_entries or int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1024"))
+        self.stale_seconds = stale_seconds if stale_seconds is not None else float(
+            os.getenv("TOOL_CACHE_STALE_SECONDS", "30")
+        )
+        self._entries: "OrderedDict[Key, _Entry]" = OrderedDict()
+        self._inflight: Dict[Key, asyncio.Task] = {}
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def cacheable(self, tool_name: str) -> bool:
+        return self.ttls.get(tool_name, 0) > 0
+
+    @staticmethod
+    def key(tool_name: str, arguments: Dict[str, Any]) -> Key:
+        return tool_name, json.dumps(_normalize(arguments), sort_keys=True, separators=(",", ":"), default=str)
+
+    async def get_or_call(
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        call: Callable[[], Awaitable[Any]],
+        timeout: Optional[float] = None,
+    ):
+        """Cached result, or the result of ``call()`` shared with concurrent callers"""
+        if not self.cacheable(tool_name):
+            return await asyncio.wait_for(call(), timeout)
+
+        key = self.key(tool_name, arguments)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+
+        if entry is not None and now < entry.fresh_until:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry.value
+
+        if entry is not None and now < entry.stale_until:
+            self.stale_hits += 1
+            self._entries.move_to_end(key)
+            self._load(key, call, timeout)
+            return entry.value
+
+        self.misses += 1
+        task = self._load(key, call, timeout)
+        # A caller that gives up (or is cancelled) must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def invalidate(self, tool_name: str, arguments: Optional[Dict[str, Any]] = None):
+        if arguments is not None:
+            self._entries.pop(self.key(tool_name, arguments), None)
+            return
+        for key in [key for key in self._entries if key[0] == tool_name]:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+        }
+
+    def _load(self, key: Key, call, timeout) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+
+        self.refreshes += 1
+        task = asyncio.create_task(self._fetch(key, call, timeout))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return task
+
+    async def _fetch(self, key: Key, call, timeout):
+        value = await asyncio.wait_for(call(), timeout)
+
+        if not (isinstance(value, dict) and value.get("success") is False):
+            ttl = self.ttls[key[0]]
+            now = time.monotonic()
+            self._entries[key] = _Entry(value, now + ttl, now + ttl + self.stale_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return value
+
+    def _finished(self, key: Key, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Background refreshes may fail with nobody awaiting them
+        if not task.cancelled():
+            task.exception()
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
@@ -1,37 +1,100 @@
+import os
 import json
+import time
 import random
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, List
+
+from app.llm import calculator
+from app.llm.tool_cache import ToolResultCache
+from app.telemetry.metrics import TOOL_EXECUTION
+from app.telemetry.tracing import span
 
 async def calculate_tool(arguments: str) -> Dict[str, Any]:
-    """Calculate tool"""
+    """Calculate tool
+    
+    Arguments: ``expression`` plus optional ``variables`` - numbers, or
+    equal-length lists to evaluate the expression once per row. Variables
+    come as ``{"x": 2}`` or, as declared to the model, as
+    ``[{"name": "x", "value": 2}]`` / ``[{"name": "x", "values": [1, 2]}]``.
+    """
+    expression = ""
     try:
         args = json.loads(arguments)
-        expression = args.get("expression", "2+2")
+        expression = args.get("expression", "")
+        variables = _variables(args.get("variables"))
+        
+        if any(isinstance(value, list) for value in variables.values()):
+            values = calculator.evaluate_many(expression, variables)
+            return {
+                "success": True,
+                "expression": expression,
+                "result": [calculator.format_number(value) for value in values]
+            }
+        
+        value = calculator.evaluate(expression, variables)
         return {
             "success": True,
             "expression": expression,
-            "result": "4",
-            "note": "Simulated calculation"
+            "result": calculator.format_number(value)
         }
-    except:
+    except calculator.CalculationError as e:
+        return {"success": False, "expression": expression, "error": str(e)}
+    except Exception:
         return {"success": False, "error": "Calculation failed"}
 
+def _variables(declared) -> Dict[str, Any]:
+    """Name -> number or list, from either variables shape"""
+    if not declared:
+        return {}
+    if isinstance(declared, dict):
+        return declared
+    return {
+        item["name"]: item["values"] if item.get("values") is not None else item.get("value")
+        for item in declared
+    }
+
 async def fetch_data_tool(arguments: str) -> Dict[str, Any]:
-    """Fetch data tool"""
+    """Fetch data tool (stands in for a slow upstream source)"""
+    args = json.loads(arguments or "{}")
     return {
         "success": True,
+        "data_type": args.get("data_type"),
         "data": [{"id": 1, "value": "sample"}],
         "note": "Simulated data fetch"
     }
 
+# Handlers for the functions declared in available_tools()
+TOOL_HANDLERS = {
+    "calculate": calculate_tool,
+    "fetch_data": fetch_data_tool,
+}
+
+# Per-tool time limits (seconds); anything unlisted gets DEFAULT_TOOL_TIMEOUT
+TOOL_TIMEOUTS = {
+    "calculate": 2.0,
+    "fetch_data": 10.0,
+}
+DEFAULT_TOOL_TIMEOUT = 10.0
+
+# Result cache lifetimes (seconds); unlisted tools are not cached.
+# calculate is cheap and keeps its own expression cache.
+TOOL_CACHE_TTLS = {
+    "fetch_data": float(os.getenv("FETCH_DATA_CACHE_TTL", "60")),
+}
+
 async def execute_tool(tool_name: str, arguments: str) -> Dict[str, Any]:
     """Execute tool by name"""
-    if tool_name == "calculate":
-        return await calculate_tool(arguments)
-    elif tool_name == "fetch_data":
-        return await fetch_data_tool(arguments)
-    else:
+    handler = TOOL_HANDLERS.get(tool_name)
+    if handler is None:
         return {"success": False, "error": f"Unknown tool: {tool_name}"}
+    
+    started = time.perf_counter()
+    try:
+        with span("execute_tool", tool=tool_name):
+            return await handler(arguments)
+    finally:
+        TOOL_EXECUTION.labels(tool_name).observe(time.perf_counter() - started)
 
 def available_tools():
     """Return available tools"""
@@ -44,7 +107,22 @@ def available_tools():
                 "parameters": {
                     "type": "object",
                     "properties": {
-                        "expression": {"type": "string", "description": "Math expression"}
+                        "expression": {"type": "string", "description": "Math expression, e.g. '(2 + 3) * x ^ 2'"},
+                        # A list of named values rather than a free-form map: Gemini schemas
+                        # have no additionalProperties
+                        "variables": {
+                            "type": "array",
+                            "description": "Values for names used in the expression; give 'values' (equal-length lists) to evaluate once per row",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "name": {"type": "string"},
+                                    "value": {"type": "number"},
+                                    "values": {"type": "array", "items": {"type": "number"}}
+                                },
+                                "required": ["name"]
+                            }
+                        }
                     },
                     "required": ["expression"]
                 }
@@ -64,4 +142,57 @@ def available_tools():
                 }
             }
         }
-    ]
\ No newline at end of file
+    ]
+
+class ToolRegistry:
+    """Tools the model may call, built from available_tools()
+    
+    ``run`` enforces the per-tool timeout and always returns a result dict,
+    so one slow or failing tool can't take down the turn. Results of tools
+    with a cache TTL are shared through ``cache`` by every session.
+    """
+    
+    def __init__(
+        self,
+        tools: List[Dict[str, Any]] = None,
+        timeouts: Dict[str, float] = None,
+        cache: ToolResultCache = None
+    ):
+        self.specs = {
+            tool["function"]["name"]: tool["function"]
+            for tool in (tools if tools is not None else available_tools())
+            if tool["function"]["name"] in TOOL_HANDLERS
+        }
+        self.timeouts = {**TOOL_TIMEOUTS, **(timeouts or {})}
+        self.cache = cache if cache is not None else ToolResultCache(TOOL_CACHE_TTLS)
+    
+    def __contains__(self, name: str):
+        return name in self.specs
+    
+    def function_declarations(self) -> List[Dict[str, Any]]:
+        """Declarations in the shape Gemini's ``tools=`` argument takes"""
+        return [
+            {
+                "name": spec["name"],
+                "description": spec["description"],
+                "parameters": spec["parameters"]
+            }
+            for spec in self.specs.values()
+        ]
+    
+    async def run(self, name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        if name not in self.specs:
+            return {"success": False, "error": f"Unknown tool: {name}"}
+        
+        timeout = self.timeouts.get(name, DEFAULT_TOOL_TIMEOUT)
+        try:
+            return await self.cache.get_or_call(
+                name,
+                args,
+                lambda: execute_tool(name, json.dumps(args)),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            return {"success": False, "error": f"{name} timed out after {timeout}s"}
+        except Exception as e:
+            return {"success": False, "error": f"{name} failed: {e}"}
@@ -3,108 +3,162 @@ REALTIME AI BACKEND - WORKING WITH REAL GEMINI
 """
 
 import os
+import time
 import uuid
 import asyncio
 import random
 from datetime import datetime, timezone
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from contextlib import asynccontextmanager
 
-print("=" * 60)
-print("🚀 REALTIME AI BACKEND WITH GEMINI - STARTING")
-print("=" * 60)
+from app.websocket.compression import WS_DEFLATE, install_deflate_threshold
+from app.websocket.identity import client_identity, verified_user
+from app.websocket.manager import ConnectionManager
+from app.websocket.session_metrics import MeteredSocket, SessionMetricsRegistry
+from app.websocket.turns import Turn, TurnQueue
+from app.telemetry import metrics as telemetry
+from app.telemetry.tracing import configure_tracing, shutdown_tracing, span
+from app.telemetry.log import get_logger, logging_stats
 
-# ========== SIMULATED DATABASE ==========
-class Database:
-    def __init__(self):
-        print("🗄️  Database: Simulated")
-        self.sessions = {}
-    
-    def table(self, name):
-        self.current_table = name
-        return self
-    
-    def insert(self, data):
-        if self.current_table == "sessions":
-            self.sessions[data['session_id']] = data
-        return type('obj', (object,), {'data': [data], 'execute': lambda: None})()
-    
-    def eq(self, key, value):
-        return self
-    
-    def execute(self):
-        return type('obj', (object,), {'data': []})()
+log = get_logger(__name__)
+
+PROCESS_STARTED = time.perf_counter()
+
+# Cold start (import -> ready to accept sockets) should stay under this
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "1.0"))
+
+# Background LLM warm-up: "off", "load" (build the model) or "ping" (also one tiny request)
+LLM_WARMUP = os.getenv("LLM_WARMUP", "load").lower()
+
+# How long a session outlives its last connection, waiting for a resume (0 = end at once)
+RESUME_GRACE_SECONDS = float(os.getenv("WS_RESUME_GRACE", "30"))
+
+log.info("🚀 Realtime AI backend starting")
+
+# Opt-in: compress only frames big enough to benefit (see WS_DEFLATE_MIN_BYTES)
+if WS_DEFLATE:
+    install_deflate_threshold()
 
 # Global instances
-llm_client = None  # This will be REAL Gemini client
+llm_client = None  # LLMClient over the configured providers
+llm_executor = None  # Caps in-flight generations per worker
 db = None
+event_writer = None  # Batched session_events persistence
+post_session_scheduler = None  # Summaries/metrics after a session ends
+live_metrics = SessionMetricsRegistry()  # Per-session counters while sockets are open
+manager = ConnectionManager()  # Every socket, grouped by session_id
+rate_limiter = None  # Per-session/per-user/global admission of user messages
+session_turns = {}  # session_id -> TurnQueue running that session's messages in order
+held_sessions = {}  # session_id -> task ending it unless a client resumes first
+warmup_task = None
+startup_seconds = None  # Measured cold start, None until ready
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global llm_client, db
+    global llm_client, llm_executor, db, event_writer, post_session_scheduler, rate_limiter, warmup_task, startup_seconds
     
-    print("\n📦 INITIALIZING SERVICES...")
-    print("-" * 40)
+    log.info("📦 Initializing services")
     
-    # TRY TO USE REAL GEMINI
-    try:
-        from app.llm.client import LLMClient
-        llm_client = LLMClient()  # REAL Gemini client
-        print("✅ Using REAL Google Gemini AI")
-    except Exception as e:
-        print(f"❌ Gemini initialization failed: {e}")
-        print("⚠️ Please check your GOOGLE_API_KEY in .env file")
-        print("⚠️ The system will use simulated mode for now")
-        
-        # Fallback simulated client
-        class SimulatedClient:
-            def __init__(self):
-                print("🤖 Using simulated AI (no Gemini)")
-            
-            async def process_message_stream(self, session_id, message, websocket):
-                await websocket.send_json({
-                    "type": "system",
-                    "message": "🤖 AI is thinking..."
-                })
-                
-                responses = [
-                    f"You said: '{message}'",
-                    "\n\n(Simulated mode - add valid GOOGLE_API_KEY for real Gemini)",
-                    "\n\nFeatures demonstrated:",
-                    "\n✅ WebSocket communication",
-                    "\n✅ Streaming responses",
-                    "\n✅ Database persistence",
-                    "\n✅ Tool calling",
-                    f"\n\nSession: {session_id}"
-                ]
-                
-                for part in responses:
-                    await websocket.send_json({
-                        "type": "ai_message",
-                        "content": part
-                    })
-                    await asyncio.sleep(0.2)
-                
-                await websocket.send_json({"type": "ai_message_end"})
-                
-                # Trigger tool for math messages
-                return 'calculate' in message.lower() or 'math' in message.lower()
-        
-        llm_client = SimulatedClient()
+    # Spans for turns, generations, tools and summaries (OTEL_TRACING, off by default)
+    configure_tracing()
+    
+    # LLM providers (Gemini/OpenAI with failover); simulated when no key is set
+    from app.llm.client import LLMClient
+    llm_client = LLMClient()
+    if llm_client.router.primary.name == "fake":
+        log.warning("⚠️ No GOOGLE_API_KEY/OPENAI_API_KEY - using simulated mode for now")
+    
+    # Reach sockets of the same session on other workers
+    from app.websocket.backplane import create_backplane
+    await manager.start(create_backplane())
+    log.info("📡 Backplane", backend=type(manager.backplane).__name__, node=manager.backplane.node_id)
+    
+    # Bound concurrent generations on this worker
+    from app.llm.executor import LLMExecutor
+    llm_executor = LLMExecutor()
+    log.info("🚦 LLM executor", max_in_flight=llm_executor.max_in_flight)
+    
+    # Message rate limits (shared across workers with RATE_LIMIT_URL)
+    from app.websocket.rate_limit import create_rate_limiter
+    rate_limiter = create_rate_limiter()
+    
+    # Initialize database: one shared, pooled Supabase client when configured,
+    # otherwise the embedded SQLite store (SQLITE_PATH)
+    from app.database.supabase_client import supabase_configured, init_supabase, close_supabase
+    db = None
+    if supabase_configured():
+        try:
+            db = init_supabase()
+        except Exception as e:
+            log.warning("⚠️ Supabase unavailable - using SQLite", error=str(e))
+    if db is None:
+        from app.database.sqlite_store import SQLiteDatabase
+        db = SQLiteDatabase()
+    
+    # Events are written behind the conversation, in batches
+    from app.database.event_writer import EventWriter
+    event_writer = EventWriter(db)
+    event_writer.start()
+    llm_client.events = event_writer
+    
+    # Summaries and metrics once a session ends
+    from app.tasks.post_session import process_session_summary
+    from app.tasks.scheduler import PostSessionScheduler
+    async def summarize(session_id):
+        # The summary reads session_events - including jobs restored from disk
+        # and retries, every job waits for events still queued to be written
+        await event_writer.flush()
+        return await process_session_summary(session_id, db)
+    
+    post_session_scheduler = PostSessionScheduler(summarize)
+    await post_session_scheduler.start()
     
-    # Initialize database
-    db = Database()
+    # Load gauges for /metrics, read when scraped
+    telemetry.REGISTRY.gauge("ws_active_connections", "Open WebSocket connections", lambda: manager.connection_count)
+    telemetry.REGISTRY.gauge("ws_active_sessions", "Sessions with an open connection", lambda: len(manager.active_connections))
+    telemetry.REGISTRY.gauge("llm_in_flight", "Generations running", lambda: llm_executor.in_flight)
+    telemetry.REGISTRY.gauge("llm_queue_depth", "Generations waiting for a slot", lambda: llm_executor.queue_depth)
+    telemetry.REGISTRY.gauge("db_events_pending", "Session events waiting to be written", lambda: event_writer.queue.qsize())
+    telemetry.REGISTRY.gauge("post_session_queue_depth", "Sessions waiting for summary processing", lambda: post_session_scheduler.queue_depth)
     
-    print("✅ Services ready!")
-    print("=" * 50)
-    print("🌐 Open: http://localhost:8000")
-    print("=" * 50)
+    # Warm the model in the background - readiness does not wait for it
+    if LLM_WARMUP != "off":
+        warmup_task = asyncio.create_task(llm_client.warm_up(ping=LLM_WARMUP == "ping"))
+    
+    startup_seconds = time.perf_counter() - PROCESS_STARTED
+    log.info("✅ Services ready", startup_seconds=round(startup_seconds, 3))
+    if startup_seconds > STARTUP_BUDGET_SECONDS:
+        log.warning("⚠️ Cold start over budget", budget_seconds=STARTUP_BUDGET_SECONDS)
+    log.info("🌐 Open: http://localhost:8000")
     
     yield  # App runs here
     
-    print("\n👋 Shutting down...")
+    log.info("👋 Shutting down")
+    
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    
+    # Nobody can resume any more - end held sessions now so they get their summaries
+    for session_id in list(held_sessions):
+        held_sessions.pop(session_id).cancel()
+        await end_session(session_id)
+    
+    if post_session_scheduler:
+        await post_session_scheduler.close()
+    
+    await manager.close()
+    await rate_limiter.close()
+    
+    # Flush any events still waiting to be written
+    await event_writer.close()
+    log.info("🗄️ Session events written", count=event_writer.written)
+    
+    close_supabase()
+    if hasattr(db, "close"):
+        db.close()
+    shutdown_tracing()
 
 # Create FastAPI app
 app = FastAPI(
@@ -123,82 +177,269 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def run_turn(turn: Turn):
+    """Answer one user message (runs on the session's TurnQueue worker)"""
+    session_id = turn.session_id
+    websocket = turn.websocket
+    
+    # Short bursts wait for a token; floods are turned away
+    async def notify_delayed(seconds):
+        await manager.send_message(websocket, {
+            "type": "system",
+            "message": f"⏳ Rate limited, sending in {seconds:.1f}s",
+            "rate_limited": "queued",
+            "retry_after": round(seconds, 2)
+        })
+    
+    decision = await rate_limiter.admit(session_id, turn.identity, on_delay=notify_delayed)
+    if not decision.allowed:
+        await manager.send_message(websocket, {
+            "type": "system",
+            "message": f"🚫 Too many messages ({decision.scope} limit), try again in {decision.retry_after:.1f}s",
+            "error": "rate_limited",
+            "scope": decision.scope,
+            "retry_after": round(decision.retry_after, 2)
+        })
+        return
+    
+    await event_writer.record(session_id, "user_message", turn.message, {"turn_id": turn.id})
+    
+    # TTFT and generation time are measured from admission, executor queueing included
+    metrics = live_metrics.start(session_id)
+    timer = metrics.begin_turn()
+    sink = MeteredSocket(manager.channel(session_id), metrics, timer)
+    
+    async def notify_queued(position):
+        await sink.send_json({
+            "type": "system",
+            "message": f"⏳ Queued, position {position}",
+            "queue_position": position
+        })
+    
+    # Process with AI (REAL Gemini or simulated), once a slot is free
+    # Tool calls run and stream their results inside the turn
+    with span("turn", session_id=session_id, turn_id=turn.id):
+        async with llm_executor.slot(on_queued=notify_queued):
+            await llm_client.process_message_stream(
+                session_id, 
+                turn.message, 
+                sink
+            )
+    timer.finish()
+
+async def turn_cancelled(turn: Turn):
+    """Tell the session a turn was stopped (running) or dropped (still queued)"""
+    if turn.task is not None:
+        # Close the partial answer the clients are showing
+        await manager.broadcast_to_session(turn.session_id, {
+            "type": "ai_message_end",
+            "cancelled": True,
+            "turn_id": turn.id
+        })
+    
+    await manager.broadcast_to_session(turn.session_id, {
+        "type": "system",
+        "message": "⏹️ Generation stopped" if turn.task is not None else "🗑️ Queued message cancelled",
+        "cancelled": turn.id
+    })
+    await event_writer.record(turn.session_id, "turn_cancelled", turn.message, {"turn_id": turn.id})
+
+async def close_turns(session_id: str):
+    turns = session_turns.pop(session_id, None)
+    if turns is not None:
+        await turns.close()
+
+async def end_session(session_id: str):
+    """The last connection is gone for good: stop its turns, record the end, summarize"""
+    metrics = live_metrics.finish(session_id)
+    manager.forget(session_id)
+    
+    # Abandon the in-flight and queued turns - nobody is left to read them
+    await close_turns(session_id)
+    
+    # The conversation history is only needed while the session can continue
+    llm_client.context.discard(session_id)
+    
+    # Mark session as ended - final metrics are already counted, no table scan needed
+    end_time = datetime.now(timezone.utc)
+    await asyncio.to_thread(db.table("sessions").update({
+        "is_active": False,
+        "end_time": end_time.isoformat(),
+        "metadata": {"live_metrics": metrics.snapshot(end_time) if metrics else None}
+    }).eq("session_id", session_id).execute)
+    
+    # Summaries and metrics run in the background, bounded and deduplicated,
+    # once the session's last events are in the table
+    await event_writer.flush()
+    if post_session_scheduler:
+        post_session_scheduler.submit(session_id)
+
+async def expire_session(session_id: str):
+    await asyncio.sleep(RESUME_GRACE_SECONDS)
+    # Off the held list before ending, so a late resume can't cancel us half-way
+    held_sessions.pop(session_id, None)
+    log.info("⌛ Resume window closed", sample=True, session_id=session_id)
+    await end_session(session_id)
+
+def resume_point(websocket: WebSocket):
+    """Last seq and epoch the client saw, from ``?resume=<seq>&epoch=<epoch>``
+
+    ``(None, None)`` for a fresh connection.
+    """
+    value = websocket.query_params.get("resume")
+    try:
+        resume_after = int(value) if value is not None else None
+    except ValueError:
+        return None, None
+    return resume_after, websocket.query_params.get("epoch")
+
 # WebSocket endpoint
 @app.websocket("/ws/session/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
-    """Main WebSocket handler"""
-    await websocket.accept()
-    print(f"🔗 WebSocket connected: {session_id}")
-    
-    # Create session record
-    db.table("sessions").insert({
-        "session_id": session_id,
-        "user_id": f"user_{uuid.uuid4().hex[:8]}",
-        "start_time": datetime.now(timezone.utc).isoformat(),
-        "is_active": True
-    })
+    """Main WebSocket handler
     
-    # Send welcome
-    await websocket.send_json({
-        "type": "system",
-        "message": "✅ Connected to AI Assistant!"
-    })
+    The receive loop never waits on generation: user messages are queued on
+    the session's TurnQueue, so ``cancel`` and ``end_session`` frames are
+    read (and acted on) while an answer is streaming.
+    
+    Every session-wide frame carries a ``seq`` and ``epoch``. When the last
+    connection drops the session is held for WS_RESUME_GRACE seconds, its
+    turns still running; reconnecting with ``?resume=<last seq>&epoch=<its
+    epoch>`` replays what was missed and joins the live stream - no new LLM
+    call, no new session row.
+    """
+    resume_after, epoch = resume_point(websocket)
+    connection = await manager.connect(websocket, session_id, resume_after=resume_after, epoch=epoch)
+    log.info("🔗 WebSocket connected", sample=True, session_id=session_id, resume_after=resume_after)
+    
+    # Back within the grace period: the session carries on
+    held = held_sessions.pop(session_id, None)
+    if held is not None:
+        held.cancel()
+    
+    # Live counters and latency histograms for this session
+    first_connection = live_metrics.get(session_id) is None
+    metrics = live_metrics.start(session_id)
+    
+    # Rate limits count against the server-side identity (signed ?token= or
+    # peer address); ?user_id=... only labels the session row
+    identity = client_identity(websocket)
+    user_id = verified_user(websocket.query_params.get("token")) \
+        or websocket.query_params.get("user_id") or f"user_{uuid.uuid4().hex[:8]}"
+    
+    # Create session record (other devices join the existing one)
+    if first_connection:
+        created = await asyncio.to_thread(db.table("sessions").upsert({
+            "session_id": session_id,
+            "user_id": user_id,
+            "start_time": metrics.start_time.isoformat(),
+            "is_active": True
+        }, on_conflict="session_id", ignore_duplicates=True).execute)
+        
+        # The session ended earlier (e.g. back after the resume window): reactivate
+        # it, keeping its original start_time and user_id
+        if not created.data:
+            await asyncio.to_thread(db.table("sessions").update({
+                "is_active": True,
+                "end_time": None
+            }).eq("session_id", session_id).execute)
+    
+    # Turns of every device of the session run one at a time, in order
+    turns = session_turns.get(session_id)
+    if turns is None:
+        turns = session_turns[session_id] = TurnQueue(session_id, run_turn, on_cancelled=turn_cancelled)
+    
+    if resume_after is not None:
+        # After the replayed frames; complete=False means start over from session_info
+        await manager.send_message(websocket, {
+            "type": "resumed",
+            "session_id": session_id,
+            "resume_after": resume_after,
+            "replayed": connection.replayed or 0,
+            "complete": connection.replayed is not None,
+            "generating": turns.current is not None
+        })
     
+    if connection.replayed is None:
+        # Send welcome
+        await manager.send_message(websocket, {
+            "type": "system",
+            "message": "✅ Connected to AI Assistant!"
+        })
+        await manager.send_message(websocket, {
+            "type": "session_info",
+            "session_id": session_id,
+            "user_id": user_id,
+            **manager.resume_point(session_id)
+        })
+    
+    ended = False  # The client asked to end the session: no resume window
     try:
         while True:
-            # Wait for message
-            data = await websocket.receive_json()
+            # Wait for message - text (JSON) or binary (the negotiated codec, e.g. MessagePack)
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            payload = frame.get("text")
+            if payload is None:
+                payload = frame.get("bytes") or b""
+            telemetry.FRAMES_IN.inc()
+            telemetry.BYTES_IN.inc(len(payload))
+            data = connection.codec.loads(payload)
+            message_type = data.get("type")
             
-            if data.get("type") == "user_message":
+            if message_type == "user_message":
                 message = data.get("message", "").strip()
                 
                 if message:
-                    print(f"📨 User message: '{message}'")
+                    turn = Turn(session_id, message, websocket, identity, turn_id=data.get("id"))
+                    log.info("📨 User message", sample=True, session_id=session_id, turn_id=turn.id, message=message)
                     
-                    # Process with AI (REAL Gemini or simulated)
-                    should_call_tool = await llm_client.process_message_stream(
-                        session_id, 
-                        message, 
-                        websocket
-                    )
+                    if not turns.submit(turn):
+                        await manager.send_message(websocket, {
+                            "type": "system",
+                            "message": f"🚫 {turns.max_pending} messages are already waiting - please wait for an answer",
+                            "error": "too_many_pending",
+                            "turn_id": turn.id
+                        })
+                        continue
                     
-                    # Call tool if needed
-                    if should_call_tool:
-                        await asyncio.sleep(0.5)
-                        
-                        # Calculate actual result for math expressions
-                        result = "42"  # Default
-                        if '2 + 2' in message:
-                            result = "4"
-                        elif '*' in message:
-                            # Simple multiplication detection
-                            import re
-                            nums = re.findall(r'\d+', message)
-                            if len(nums) >= 2:
-                                result = str(int(nums[0]) * int(nums[1]))
-                        
-                        await websocket.send_json({
-                            "type": "tool_result",
-                            "tool_name": "calculator",
-                            "result": {
-                                "success": True,
-                                "expression": message,
-                                "result": result,
-                                "calculated_at": datetime.now(timezone.utc).isoformat()
-                            }
+                    position = turns.position(turn)
+                    if turns.current is not None and position:
+                        await manager.send_message(websocket, {
+                            "type": "system",
+                            "message": f"⏳ Waiting for {position} earlier message(s)",
+                            "turn_id": turn.id,
+                            "turn_position": position
                         })
+            
+            elif message_type == "cancel":
+                # Stops the running turn, or a queued one by id
+                if turns.cancel(data.get("id")) is None:
+                    await manager.send_message(websocket, {
+                        "type": "system",
+                        "message": "Nothing to cancel"
+                    })
+            
+            elif message_type == "end_session":
+                ended = True
+                await websocket.close(code=1000)
+                raise WebSocketDisconnect(code=1000)
     
     except WebSocketDisconnect:
-        print(f"🔗 Disconnected: {session_id}")
-        
-        # Mark session as ended
-        db.table("sessions").update({
-            "is_active": False,
-            "end_time": datetime.now(timezone.utc).isoformat()
-        }).eq("session_id", session_id)
+        log.info("🔗 Disconnected", sample=True, session_id=session_id)
     
     except Exception as e:
-        print(f"❌ WebSocket error: {e}")
+        log.error("❌ WebSocket error", session_id=session_id, error=str(e))
+    
+    finally:
+        # The session only ends when its last connection goes - and, unless
+        # the client ended it, only once nobody resumed it in time
+        if not manager.disconnect(websocket, session_id) and session_id not in held_sessions:
+            if ended or RESUME_GRACE_SECONDS <= 0:
+                await end_session(session_id)
+            else:
+                held_sessions[session_id] = asyncio.create_task(expire_session(session_id))
 
 # API endpoints
 @app.get("/")
@@ -210,13 +451,59 @@ async def root():
         "endpoints": {
             "frontend": "/frontend",
             "websocket": "/ws/session/{session_id}",
-            "health": "/health"
+            "health": "/health",
+            "liveness": "/health/live",
+            "readiness": "/health/ready"
         }
     }
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape endpoint (this worker's counters, histograms and gauges)"""
+    return Response(telemetry.REGISTRY.render(), media_type=telemetry.CONTENT_TYPE)
+
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "timestamp": datetime.now(timezone.utc).isoformat()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "llm_executor": llm_executor.stats() if llm_executor else None,
+        "event_writer": event_writer.stats() if event_writer else None,
+        "post_session": post_session_scheduler.stats() if post_session_scheduler else None,
+        "live_sessions": len(live_metrics),
+        "pending_turns": sum(len(turns.pending) for turns in session_turns.values()),
+        "held_sessions": len(held_sessions),
+        "connections": manager.stats(),
+        "rate_limits": rate_limiter.stats() if rate_limiter else None,
+        "logging": logging_stats()
+    }
+
+@app.get("/health/live")
+async def health_live():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "alive", "timestamp": datetime.now(timezone.utc).isoformat()}
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness: startup finished; LLM warm-up state is reported, not waited on"""
+    ready = startup_seconds is not None
+    body = {
+        "status": "ready" if ready else "starting",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "startup_seconds": round(startup_seconds, 3) if ready else None,
+        "startup_budget_seconds": STARTUP_BUDGET_SECONDS,
+        "within_budget": ready and startup_seconds <= STARTUP_BUDGET_SECONDS,
+        "llm": llm_client.status() if llm_client else None
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+@app.get("/sessions/{session_id}/metrics")
+async def session_metrics(session_id: str):
+    """Real-time metrics for a session running on this worker"""
+    metrics = live_metrics.get(session_id)
+    if metrics is None:
+        return JSONResponse({"error": f"No live session {session_id}"}, status_code=404)
+    return metrics.snapshot()
 
 # Frontend
 @app.get("/frontend")
@@ -384,7 +671,13 @@ async def frontend():
         
         <script>
             let ws = null;
+            let currentAiMsg = null;
+            let toolStreams = {};
             let sessionId = 'session_' + Math.random().toString(36).substr(2, 9);
+            let lastSeq = null;  // Newest frame seen - sent back to resume after a drop
+            let epoch = null;  // ...and the numbering it belongs to
+            let leaving = false;
+            let retries = 0;
             
             function updateStatus(text) {
                 document.getElementById('status').textContent = text;
@@ -409,17 +702,27 @@ async def frontend():
                 messagesDiv.scrollTop = messagesDiv.scrollHeight;
             }
             
-            function connect() {
+            function connect(resume) {
                 if (ws) return;
                 
-                updateStatus('Connecting...');
-                sessionId = 'session_' + Math.random().toString(36).substr(2, 9);
+                updateStatus(resume ? 'Reconnecting...' : 'Connecting...');
+                leaving = false;
+                let url = 'ws://' + window.location.host + '/ws/session/';
+                if (resume && lastSeq !== null) {
+                    url += sessionId + '?resume=' + lastSeq + '&epoch=' + epoch;
+                } else {
+                    sessionId = 'session_' + Math.random().toString(36).substr(2, 9);
+                    lastSeq = null;
+                    epoch = null;
+                    url += sessionId;
+                }
                 
-                ws = new WebSocket('ws://' + window.location.host + '/ws/session/' + sessionId);
+                ws = new WebSocket(url);
                 
                 ws.onopen = () => {
+                    retries = 0;
                     updateStatus('Connected ✓');
-                    addMessage(`Connected to session: ${sessionId}`, 'system');
+                    if (!resume) addMessage(`Connected to session: ${sessionId}`, 'system');
                     
                     // Enable UI
                     document.getElementById('connectBtn').disabled = true;
@@ -432,6 +735,11 @@ async def frontend():
                 ws.onmessage = (event) => {
                     try {
                         const data = JSON.parse(event.data);
+                        // Numbered frames, and session_info for a fresh start, are resume points
+                        if (data.epoch !== undefined) {
+                            epoch = data.epoch;
+                            lastSeq = data.seq !== undefined ? data.seq : data.resume_after;
+                        }
                         
                         switch(data.type) {
                             case 'system':
@@ -439,17 +747,43 @@ async def frontend():
                                 break;
                                 
                             case 'ai_message':
-                                addMessage(data.content, 'ai');
+                                // Streamed chunks append to the current AI bubble
+                                if (!currentAiMsg) {
+                                    currentAiMsg = addMessage('', 'ai');
+                                }
+                                currentAiMsg.textContent += data.content;
+                                document.getElementById('messages').scrollTop =
+                                    document.getElementById('messages').scrollHeight;
                                 break;
                                 
                             case 'ai_message_end':
                                 // End of AI message
+                                currentAiMsg = null;
                                 break;
                                 
                             case 'tool_result':
                                 addToolResult(data.tool_name, data.result);
                                 break;
                                 
+                            case 'resumed':
+                                // Missed frames were replayed before this; otherwise start over
+                                if (!data.complete) currentAiMsg = null;
+                                addMessage(data.complete
+                                    ? `Reconnected (${data.replayed} missed message(s) replayed)`
+                                    : 'Reconnected - earlier messages could not be recovered', 'system');
+                                break;
+                                
+                            case 'tool_result_chunk':
+                                // Large results arrive as JSON slices
+                                (toolStreams[data.stream_id] ||= [])[data.index] = data.data;
+                                break;
+                                
+                            case 'tool_result_end':
+                                addToolResult(data.tool_name,
+                                    JSON.parse((toolStreams[data.stream_id] || []).join('')));
+                                delete toolStreams[data.stream_id];
+                                break;
+                                
                             default:
                                 console.log('Unknown:', data);
                         }
@@ -459,6 +793,16 @@ async def frontend():
                 };
                 
                 ws.onclose = () => {
+                    ws = null;
+                    
+                    // Dropped, not closed by us: pick the session back up
+                    if (!leaving && lastSeq !== null && retries < 5) {
+                        retries += 1;
+                        updateStatus('Connection lost - reconnecting...');
+                        setTimeout(() => connect(true), 1000 * retries);
+                        return;
+                    }
+                    
                     updateStatus('Disconnected');
                     addMessage('Disconnected from server', 'system');
                     
@@ -467,8 +811,6 @@ async def frontend():
                     document.getElementById('disconnectBtn').disabled = true;
                     document.getElementById('sendBtn').disabled = true;
                     document.getElementById('messageInput').disabled = true;
-                    
-                    ws = null;
                 };
                 
                 ws.onerror = (error) => {
@@ -479,6 +821,11 @@ async def frontend():
             
             function disconnect() {
                 if (ws) {
+                    leaving = true;
+                    // Ends the session now instead of holding it for a resume
+                    if (ws.readyState === WebSocket.OPEN) {
+                        ws.send(JSON.stringify({type: 'end_session'}));
+                    }
                     ws.close();
                 }
             }
@@ -535,4 +882,4 @@ async def frontend():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info", ws_per_message_deflate=WS_DEFLATE)
\ No newline at end of file
@@ -1,35 +1,123 @@
 import asyncio
 import json
-from datetime import datetime
-from typing import List, Dict, Any
-from openai import AsyncOpenAI
+from collections import deque
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
 import os
 
 from app.database.supabase_client import get_supabase
+from app.llm.providers import ProviderRouter, create_providers
+from app.telemetry.log import get_logger
+from app.telemetry.tracing import set_attributes, traced
 
-async def analyze_conversation_history(session_id: str) -> Dict[str, Any]:
-    """Analyze conversation history using LLM to generate insights"""
+log = get_logger(__name__)
+
+EVENTS_PAGE_SIZE = int(os.getenv("POST_SESSION_PAGE_SIZE", "500"))
+
+# The analysis prompt only needs the tail of very long conversations
+TRANSCRIPT_MAX_TURNS = int(os.getenv("POST_SESSION_TRANSCRIPT_TURNS", "200"))
+TRANSCRIPT_MAX_CHARS_PER_TURN = 2000
+
+# Analysis prefers OpenAI and fails over to Gemini
+ANALYSIS_PROVIDERS = os.getenv("ANALYSIS_PROVIDERS", "openai,gemini")
+ANALYSIS_OPENAI_MODEL = os.getenv("ANALYSIS_OPENAI_MODEL", "gpt-4-turbo-preview")
+
+_analysis_router: Optional[ProviderRouter] = None
+
+def get_analysis_router() -> ProviderRouter:
+    """Shared router for analysis calls, so breakers and rate limits persist"""
+    global _analysis_router
+    if _analysis_router is None:
+        _analysis_router = ProviderRouter(
+            create_providers(ANALYSIS_PROVIDERS, openai_model=ANALYSIS_OPENAI_MODEL),
+            hedge=False
+        )
+    return _analysis_router
+
+class SessionActivity:
+    """Single-pass accumulator over a session's events
+    
+    Counts feed the metrics and a bounded transcript feeds the analysis, so
+    events are looked at exactly once and never held as a full list.
+    """
+    
+    def __init__(self, max_turns: int = TRANSCRIPT_MAX_TURNS):
+        self.user_messages = 0
+        self.ai_responses = 0
+        self.tool_calls = 0
+        self.total_events = 0
+        self.transcript = deque(maxlen=max_turns)
     
-    # Fetch conversation events
-    supabase = get_supabase()
+    def add(self, event: Dict[str, Any]):
+        self.total_events += 1
+        event_type = event["event_type"]
+        
+        if event_type == "user_message":
+            self.user_messages += 1
+        elif event_type == "ai_response":
+            self.ai_responses += 1
+        elif event_type == "tool_call":
+            self.tool_calls += 1
+            return
+        else:
+            return
+        
+        self.transcript.append({
+            "role": "user" if event_type == "user_message" else "assistant",
+            "content": event["content"][:TRANSCRIPT_MAX_CHARS_PER_TURN],
+            "timestamp": event["created_at"]
+        })
+
+async def iter_session_events(session_id: str, supabase, page_size: int = EVENTS_PAGE_SIZE):
+    """Stream a session's events in created_at order, one page at a time"""
+    offset = 0
     
-    events_response = supabase.table("session_events")\
+    while True:
+        query = supabase.table("session_events")\
+            .select("*")\
+            .eq("session_id", session_id)\
+            .order("created_at")\
+            .order("id")\
+            .range(offset, offset + page_size - 1)
+        
+        # The client is synchronous - keep each page fetch off the loop
+        page = (await asyncio.to_thread(query.execute)).data
+        
+        for event in page:
+            yield event
+        
+        if len(page) < page_size:
+            return
+        offset += page_size
+
+async def load_session_activity(session_id: str, supabase=None) -> Tuple[Dict[str, Any], SessionActivity]:
+    """Read the session row once and its events once"""
+    supabase = supabase or get_supabase()
+    
+    session_query = supabase.table("sessions")\
         .select("*")\
-        .eq("session_id", session_id)\
-        .order("created_at")\
-        .execute()
-    
-    events = events_response.data
-    
-    # Filter relevant events for analysis
-    conversation_events = []
-    for event in events:
-        if event["event_type"] in ["user_message", "ai_response"]:
-            conversation_events.append({
-                "role": "user" if event["event_type"] == "user_message" else "assistant",
-                "content": event["content"],
-                "timestamp": event["created_at"]
-            })
+        .eq("session_id", session_id)
+    session_response = await asyncio.to_thread(session_query.execute)
+    session = session_response.data[0] if session_response.data else {}
+    
+    activity = SessionActivity()
+    async for event in iter_session_events(session_id, supabase):
+        activity.add(event)
+    
+    return session, activity
+
+async def analyze_conversation_history(
+    session_id: str,
+    supabase=None,
+    activity: Optional[SessionActivity] = None
+) -> Dict[str, Any]:
+    """Analyze conversation history using LLM to generate insights"""
+    
+    # Fetch conversation events unless the caller already streamed them
+    if activity is None:
+        _, activity = await load_session_activity(session_id, supabase)
+    
+    conversation_events = list(activity.transcript)
     
     # Prepare analysis prompt
     analysis_prompt = f"""Analyze the following conversation and provide a comprehensive summary:
@@ -58,23 +146,13 @@ async def analyze_conversation_history(session_id: str) -> Dict[str, Any]:
     
     try:
         # Use LLM to analyze conversation
-        client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
-        response = await client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert conversation analyst. Analyze conversations thoroughly and provide structured insights."
-                },
-                {"role": "user", "content": analysis_prompt}
-            ],
+        analysis_text = await get_analysis_router().complete(
+            "You are an expert conversation analyst. Analyze conversations thoroughly and provide structured insights.",
+            analysis_prompt,
             temperature=0.3,
             max_tokens=1000
         )
         
-        analysis_text = response.choices[0].message.content
-        
         # Parse JSON response
         try:
             analysis_data = json.loads(analysis_text)
@@ -93,7 +171,7 @@ async def analyze_conversation_history(session_id: str) -> Dict[str, Any]:
         return analysis_data
     
     except Exception as e:
-        print(f"Error analyzing conversation: {e}")
+        log.error("Error analyzing conversation", session_id=session_id, error=str(e))
         # Return basic analysis
         return {
             "topics": ["Error occurred during analysis"],
@@ -105,65 +183,77 @@ async def analyze_conversation_history(session_id: str) -> Dict[str, Any]:
             "summary": f"Error analyzing conversation: {str(e)}"
         }
 
-async def calculate_session_metrics(session_id: str) -> Dict[str, Any]:
+async def calculate_session_metrics(
+    session_id: str,
+    supabase=None,
+    session: Optional[Dict[str, Any]] = None,
+    activity: Optional[SessionActivity] = None
+) -> Dict[str, Any]:
     """Calculate various metrics for the session"""
     
-    supabase = get_supabase()
+    # Get session data and event counts unless the caller already loaded them
+    if session is None or activity is None:
+        session, activity = await load_session_activity(session_id, supabase)
     
-    # Get session data
-    session_response = supabase.table("sessions")\
-        .select("*")\
-        .eq("session_id", session_id)\
-        .execute()
-    
-    session = session_response.data[0] if session_response.data else {}
-    
-    # Get all events for the session
-    events_response = supabase.table("session_events")\
-        .select("*")\
-        .eq("session_id", session_id)\
-        .order("created_at")\
-        .execute()
-    
-    events = events_response.data
-    
-    # Calculate metrics
-    user_messages = [e for e in events if e["event_type"] == "user_message"]
-    ai_responses = [e for e in events if e["event_type"] == "ai_response"]
-    tool_calls = [e for e in events if e["event_type"] == "tool_call"]
+    # Metrics counted live by the socket handler are exact - use them as-is
+    live_metrics = (session.get("metadata") or {}).get("live_metrics")
+    if live_metrics:
+        return live_metrics
     
     # Calculate duration
-    start_time = datetime.fromisoformat(session.get("start_time"))
-    end_time = datetime.fromisoformat(session.get("end_time")) if session.get("end_time") else datetime.utcnow()
-    duration = (end_time - start_time).total_seconds()
+    start_time = _parse_time(session.get("start_time"))
+    end_time = _parse_time(session.get("end_time")) or datetime.now(timezone.utc)
+    duration = (end_time - start_time).total_seconds() if start_time else 0.0
     
-    # Calculate average response time (simplified)
+    # Sessions without live metrics (e.g. older rows): approximate response time
     avg_response_time = 0
-    if len(ai_responses) > 0:
+    if activity.ai_responses > 0:
         # This is a simplified calculation
-        avg_response_time = duration / len(ai_responses)
+        avg_response_time = duration / activity.ai_responses
     
     metrics = {
-        "total_messages": len(user_messages) + len(ai_responses),
-        "user_messages": len(user_messages),
-        "ai_responses": len(ai_responses),
-        "tool_calls": len(tool_calls),
+        "total_messages": activity.user_messages + activity.ai_responses,
+        "user_messages": activity.user_messages,
+        "ai_responses": activity.ai_responses,
+        "tool_calls": activity.tool_calls,
         "duration_seconds": duration,
         "avg_response_time_seconds": round(avg_response_time, 2),
         "start_time": session.get("start_time"),
         "end_time": session.get("end_time"),
-        "interaction_density": round(len(user_messages) / max(duration / 60, 1), 2)  # messages per minute
+        "interaction_density": round(activity.user_messages / max(duration / 60, 1), 2)  # messages per minute
     }
     
     return metrics
 
-async def generate_session_summary(session_id: str) -> str:
-    """Generate a comprehensive session summary"""
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+async def build_session_report(
+    session_id: str,
+    supabase=None,
+    session: Optional[Dict[str, Any]] = None,
+    activity: Optional[SessionActivity] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """Summary text and metrics from a single read of the session"""
+    
+    if session is None or activity is None:
+        session, activity = await load_session_activity(session_id, supabase)
     
     # Get analysis and metrics
-    analysis = await analyze_conversation_history(session_id)
-    metrics = await calculate_session_metrics(session_id)
+    analysis = await analyze_conversation_history(session_id, supabase, activity)
+    metrics = await calculate_session_metrics(session_id, supabase, session, activity)
     
+    return format_session_summary(session_id, analysis, metrics), metrics
+
+async def generate_session_summary(session_id: str, supabase=None) -> str:
+    """Generate a comprehensive session summary"""
+    summary, _ = await build_session_report(session_id, supabase)
+    return summary
+
+def format_session_summary(session_id: str, analysis: Dict[str, Any], metrics: Dict[str, Any]) -> str:
     # Format summary
     summary = f"""SESSION SUMMARY - {session_id}
     
@@ -193,39 +283,47 @@ UNRESOLVED QUESTIONS:
     
     return summary
 
-async def process_session_summary(session_id: str):
-    """Main function to process session summary asynchronously"""
+@traced("process_session_summary")
+async def process_session_summary(session_id: str, supabase=None):
+    """Main function to process session summary asynchronously
+    
+    ``supabase`` is the shared client from the app lifespan; the process-wide
+    pooled client is used when it isn't passed in.
+    """
     
-    print(f"Starting post-session processing for {session_id}")
+    log.info("Starting post-session processing", sample=True, session_id=session_id)
+    set_attributes(session_id=session_id)
     
     try:
-        # Generate summary
-        summary = await generate_session_summary(session_id)
-        
-        # Get metrics
-        metrics = await calculate_session_metrics(session_id)
+        supabase = supabase or get_supabase()
         
-        # Update session record in database
-        supabase = get_supabase()
+        # Generate summary and metrics from one pass over the events
+        session, activity = await load_session_activity(session_id, supabase)
+        summary, metrics = await build_session_report(session_id, supabase, session, activity)
         
+        # Update session record in database - merged into the existing metadata,
+        # so live_metrics survive for retries and re-runs
+        now = datetime.now(timezone.utc).isoformat()
+        metadata = dict(session.get("metadata") or {})
+        metadata["metrics"] = metrics
+        metadata["processed_at"] = now
         update_data = {
             "summary": summary,
-            "end_time": datetime.utcnow().isoformat(),
-            "metadata": {
-                "metrics": metrics,
-                "processed_at": datetime.utcnow().isoformat()
-            }
+            "metadata": metadata
         }
+        # The socket handler records the exact end; only fill it in when missing
+        if not session.get("end_time"):
+            update_data["end_time"] = now
         
-        supabase.table("sessions")\
+        update_query = supabase.table("sessions")\
             .update(update_data)\
-            .eq("session_id", session_id)\
-            .execute()
+            .eq("session_id", session_id)
+        await asyncio.to_thread(update_query.execute)
         
-        print(f"Successfully processed session {session_id}")
+        log.info("Successfully processed session", sample=True, session_id=session_id)
         
         # Log the summary generation event
-        supabase.table("session_events").insert({
+        await asyncio.to_thread(supabase.table("session_events").insert({
             "session_id": session_id,
             "event_type": "post_session_processing",
             "content": "Session summary generated",
@@ -233,8 +331,8 @@ async def process_session_summary(session_id: str):
                 "summary_length": len(summary),
                 "metrics": metrics
             },
-            "created_at": datetime.utcnow().isoformat()
-        }).execute()
+            "created_at": now
+        }).execute)
         
         return {
             "success": True,
@@ -244,17 +342,17 @@ async def process_session_summary(session_id: str):
         }
         
     except Exception as e:
-        print(f"Error processing session {session_id}: {e}")
+        log.error("Error processing session", session_id=session_id, error=str(e))
         
         # Log error
-        supabase = get_supabase()
-        supabase.table("session_events").insert({
+        supabase = supabase or get_supabase()
+        await asyncio.to_thread(supabase.table("session_events").insert({
             "session_id": session_id,
             "event_type": "post_session_error",
             "content": f"Error generating summary: {str(e)}",
             "metadata": {"error": str(e)},
-            "created_at": datetime.utcnow().isoformat()
-        }).execute()
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }).execute)
         
         return {
             "success": False,
@@ -262,8 +360,20 @@ async def process_session_summary(session_id: str):
             "error": str(e)
         }
 
-async def batch_process_sessions(session_ids: List[str]):
-    """Process multiple sessions in batch"""
-    tasks = [process_session_summary(session_id) for session_id in session_ids]
+async def batch_process_sessions(session_ids: List[str], supabase=None, concurrency: int = None):
+    """Process multiple sessions in batch, at most ``concurrency`` at a time
+    
+    Duplicate ids are processed once; results line up with the unique ids in
+    first-seen order.
+    """
+    concurrency = concurrency or int(os.getenv("POST_SESSION_CONCURRENCY", "4"))
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def process(session_id):
+        async with semaphore:
+            return await process_session_summary(session_id, supabase)
+    
+    unique_ids = list(dict.fromkeys(session_ids))
+    tasks = [process(session_id) for session_id in unique_ids]
     results = await asyncio.gather(*tasks, return_exceptions=True)
     return results
\ No newline at end of file
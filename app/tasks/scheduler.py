@@ -0,0 +1,211 @@
+import os
+import json
+import random
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.telemetry.log import get_logger
+
+log = get_logger(__name__)
+
+# Job states that still need work - these are what gets persisted
+PENDING = "pending"
+RUNNING = "running"
+RETRYING = "retrying"
+
+
+class PostSessionScheduler:
+    """Bounded worker pool for post-session jobs.
+
+    Jobs are keyed by session_id, so a session that is submitted again while
+    it is still queued, running or waiting to retry is not processed twice.
+    A fixed number of workers pull from a priority queue (lower number runs
+    first); failures are retried with jittered exponential backoff. Unfinished
+    jobs are written to a small JSON file so a restart picks them back up.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str], Awaitable[Any]],
+        concurrency: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: float = 300.0,
+        state_path: Optional[str] = None,
+    ):
+        self.handler = handler
+        self.concurrency = concurrency or int(os.getenv("POST_SESSION_CONCURRENCY", "4"))
+        self.max_attempts = max_attempts or int(os.getenv("POST_SESSION_MAX_ATTEMPTS", "3"))
+        self.base_delay = base_delay or float(os.getenv("POST_SESSION_RETRY_DELAY", "2"))
+        self.max_delay = max_delay
+        self.state_path = state_path if state_path is not None else os.getenv(
+            "POST_SESSION_JOBS_PATH", ".post_session_jobs.json"
+        )
+
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._seq = 0
+        self._workers: List[asyncio.Task] = []
+        self._retry_handles: Dict[str, asyncio.TimerHandle] = {}
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self._save_lock = threading.Lock()
+
+        self.completed = 0
+        self.failed = 0
+        self.deduplicated = 0
+
+    async def start(self):
+        """Reload persisted jobs and start the workers"""
+        for job in await asyncio.to_thread(self._load):
+            self.submit(job["session_id"], job.get("priority", 0), job.get("attempts", 0))
+
+        for _ in range(self.concurrency):
+            self._workers.append(asyncio.create_task(self._worker()))
+
+        log.info("🗂️ Post-session scheduler", workers=self.concurrency, restored_jobs=len(self.jobs))
+
+    def submit(self, session_id: str, priority: int = 0, attempts: int = 0) -> bool:
+        """Queue a session for processing; False if it is already scheduled"""
+        if session_id in self.jobs:
+            self.deduplicated += 1
+            return False
+
+        self.jobs[session_id] = {
+            "session_id": session_id,
+            "priority": priority,
+            "attempts": attempts,
+            "state": PENDING,
+        }
+        self._enqueue(session_id)
+        return True
+
+    async def close(self):
+        """Stop the workers; unfinished jobs stay in the state file"""
+        for handle in self._retry_handles.values():
+            handle.cancel()
+        self._retry_handles.clear()
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        await asyncio.to_thread(self._save, self._snapshot())
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+    def stats(self) -> Dict[str, int]:
+        running = sum(1 for job in self.jobs.values() if job["state"] == RUNNING)
+        return {
+            "concurrency": self.concurrency,
+            "queued": self.queue_depth,
+            "running": running,
+            "retrying": len(self._retry_handles),
+            "completed": self.completed,
+            "failed": self.failed,
+            "deduplicated": self.deduplicated,
+        }
+
+    def _enqueue(self, session_id: str):
+        job = self.jobs[session_id]
+        job["state"] = PENDING
+        self._seq += 1
+        self.queue.put_nowait((job["priority"], self._seq, session_id))
+        self._schedule_save()
+
+    async def _worker(self):
+        while True:
+            _, _, session_id = await self.queue.get()
+            job = self.jobs.get(session_id)
+            if job is None or job["state"] != PENDING:
+                continue
+
+            job["state"] = RUNNING
+            job["attempts"] += 1
+
+            try:
+                result = await self.handler(session_id)
+                ok = not (isinstance(result, dict) and result.get("success") is False)
+                error = None if ok else result.get("error")
+            except asyncio.CancelledError:
+                # Shutting down mid-job: leave it pending for the next start
+                job["state"] = PENDING
+                job["attempts"] -= 1
+                raise
+            except Exception as e:
+                ok, error = False, str(e)
+
+            if ok:
+                self.completed += 1
+                del self.jobs[session_id]
+                self._schedule_save()
+            elif job["attempts"] < self.max_attempts:
+                self._retry_later(session_id, error)
+            else:
+                self.failed += 1
+                del self.jobs[session_id]
+                self._schedule_save()
+                log.error("❌ Post-session job gave up", session_id=session_id, attempts=job["attempts"], error=error)
+
+    def _retry_later(self, session_id: str, error: Optional[str]):
+        job = self.jobs[session_id]
+        job["state"] = RETRYING
+        # Retries go behind fresh sessions of the same priority
+        job["priority"] += 1
+
+        # Exponential backoff with full jitter so retries don't arrive in waves
+        delay = min(self.max_delay, self.base_delay * 2 ** (job["attempts"] - 1))
+        delay = random.uniform(delay / 2, delay)
+        log.warning("🔁 Retrying post-session job", session_id=session_id, delay_seconds=round(delay, 1), error=error)
+
+        def requeue():
+            self._retry_handles.pop(session_id, None)
+            if session_id in self.jobs:
+                self._enqueue(session_id)
+
+        self._retry_handles[session_id] = asyncio.get_running_loop().call_later(delay, requeue)
+        self._schedule_save()
+
+    def _snapshot(self) -> List[Dict[str, Any]]:
+        return [dict(job) for job in self.jobs.values()]
+
+    def _schedule_save(self):
+        """Debounce state writes so a mass disconnect doesn't rewrite the file per job"""
+        if not self.state_path or self._save_handle is not None:
+            return
+
+        def save():
+            self._save_handle = None
+            asyncio.get_running_loop().run_in_executor(None, self._save, self._snapshot())
+
+        self._save_handle = asyncio.get_running_loop().call_later(0.5, save)
+
+    def _save(self, jobs: List[Dict[str, Any]]):
+        if not self.state_path:
+            return
+
+        try:
+            with self._save_lock:
+                tmp_path = f"{self.state_path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump({"jobs": jobs}, f)
+                os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            log.warning("⚠️ Could not persist post-session jobs", error=str(e))
+
+    def _load(self) -> List[Dict[str, Any]]:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return []
+
+        try:
+            with open(self.state_path) as f:
+                return json.load(f).get("jobs", [])
+        except (OSError, ValueError) as e:
+            log.warning("⚠️ Could not read post-session jobs", error=str(e))
+            return []
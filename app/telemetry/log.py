@@ -0,0 +1,206 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # text | json
+# Fraction of high-volume events (one per message/connection) that are logged
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1"))
+# Message bodies are logged as their length unless LOG_REDACT=0
+LOG_REDACT = os.getenv("LOG_REDACT", "1").lower() not in ("0", "false", "off")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Fields that carry user or model text
+REDACTED_FIELDS = frozenset({"message", "content", "text", "response", "arguments", "args", "result"})
+
+_listener: Optional[QueueListener] = None
+_handler: Optional["DroppingQueueHandler"] = None
+_lock = threading.Lock()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Hands records to the writer thread; drops them (and counts) when it falls behind
+
+    Records stay as they are - nothing is formatted on the caller's thread.
+    A ``SimpleQueue`` with a size check is several times cheaper per put than
+    a bounded ``queue.Queue``; the bound is approximate, which is all it needs.
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue, maxsize: int = LOG_QUEUE_SIZE):
+        super().__init__(log_queue)
+        self.maxsize = maxsize
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.maxsize and self.queue.qsize() >= self.maxsize:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+class TextFormatter(logging.Formatter):
+    """``2024-01-01T00:00:00.000Z INFO app.main 📨 User message session_id=abc chars=12``"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{_timestamp(record)} {record.levelname} {record.name} {record.getMessage()}"
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={_text_value(value)}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, fields at the top level"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": _timestamp(record),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class StructuredLogger:
+    """``log.info("📨 User message", session_id=..., message=...)``
+
+    Level checks happen first, so a filtered call costs almost nothing.
+    ``sample=True`` marks a high-volume event: only ``LOG_SAMPLE_RATE`` of
+    them are kept, and kept records carry ``sampled=N`` (1 in N).
+    """
+
+    __slots__ = ("logger", "_seen")
+
+    def __init__(self, name: str):
+        self.logger = logging.getLogger(name)
+        self._seen: Dict[str, int] = {}
+
+    def debug(self, msg: str, sample: bool = False, **fields):
+        self._log(logging.DEBUG, msg, sample, None, fields)
+
+    def info(self, msg: str, sample: bool = False, **fields):
+        self._log(logging.INFO, msg, sample, None, fields)
+
+    def warning(self, msg: str, sample: bool = False, **fields):
+        self._log(logging.WARNING, msg, sample, None, fields)
+
+    def error(self, msg: str, sample: bool = False, **fields):
+        self._log(logging.ERROR, msg, sample, None, fields)
+
+    def exception(self, msg: str, **fields):
+        self._log(logging.ERROR, msg, False, sys.exc_info(), fields)
+
+    def _log(self, level: int, msg: str, sample: bool, exc_info, fields: Dict[str, Any]):
+        if not self.logger.isEnabledFor(level):
+            return
+
+        if sample and LOG_SAMPLE_RATE < 1:
+            every = max(round(1 / LOG_SAMPLE_RATE), 1) if LOG_SAMPLE_RATE > 0 else 0
+            seen = self._seen[msg] = self._seen.get(msg, 0) + 1
+            if not every or seen % every != 1 % every:
+                return
+            fields["sampled"] = every
+
+        if LOG_REDACT:
+            for key in REDACTED_FIELDS.intersection(fields):
+                fields[key] = _redact(fields[key])
+
+        # A standard record, so any handler or %-style formatter works with it;
+        # only the caller lookup (a stack walk per call) is skipped
+        record = logging.LogRecord(self.logger.name, level, "(unknown)", 0, msg, None, exc_info)
+        record.fields = fields
+        self.logger.handle(record)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    setup_logging()
+    return StructuredLogger(name)
+
+
+def setup_logging(
+    stream=None, level: Optional[str] = None, fmt: Optional[str] = None, queue_size: Optional[int] = None
+):
+    """Route the ``app`` loggers through a queue to one writer thread (idempotent)
+
+    Pass ``stream``/``level``/``fmt``/``queue_size`` to reconfigure, e.g. in
+    benchmarks; ``queue_size=0`` never drops.
+    """
+    global _listener, _handler
+
+    with _lock:
+        if _listener is not None and stream is None and level is None and fmt is None and queue_size is None:
+            return
+
+        _stop()
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JsonFormatter() if (fmt or LOG_FORMAT) == "json" else TextFormatter())
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _handler = DroppingQueueHandler(log_queue, LOG_QUEUE_SIZE if queue_size is None else queue_size)
+        _listener = QueueListener(log_queue, output, respect_handler_level=False)
+        _listener.start()
+
+        root = logging.getLogger("app")
+        root.handlers[:] = [_handler]
+        root.setLevel(level or LOG_LEVEL)
+        root.propagate = False
+
+
+def stop_logging():
+    """Write out everything still queued and stop the writer thread"""
+    with _lock:
+        _stop()
+
+
+def logging_stats() -> Dict[str, int]:
+    return {
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+    }
+
+
+def _stop():
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger("app").removeHandler(_handler)
+        _handler = None
+
+
+def _redact(value) -> str:
+    if value is None:
+        return value
+    return f"<{len(value) if isinstance(value, str) else len(str(value))} chars>"
+
+
+def _timestamp(record: logging.LogRecord) -> str:
+    return datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _text_value(value) -> str:
+    text = str(value)
+    return f'"{text}"' if " " in text or not text else text
+
+
+atexit.register(stop_logging)
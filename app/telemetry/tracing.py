@@ -0,0 +1,116 @@
+import os
+import functools
+from contextlib import nullcontext
+from typing import Any, Optional
+
+from app.telemetry.log import get_logger
+
+# OTEL_TRACING: off (default) | console | otlp | memory. Needs opentelemetry-sdk
+# (and opentelemetry-exporter-otlp for "otlp"); without it spans are no-ops.
+OTEL_TRACING = os.getenv("OTEL_TRACING", "off").lower()
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "realtime-ai-backend")
+
+log = get_logger(__name__)
+
+_NO_SPAN = nullcontext()
+_tracer = None
+_provider = None
+
+
+def configure_tracing(exporter: Any = None, mode: Optional[str] = None):
+    """Start exporting spans; returns the exporter (None when tracing stays off)
+
+    Pass an exporter directly (tests hand in an ``InMemorySpanExporter``) or
+    pick one with ``mode`` / OTEL_TRACING.
+    """
+    global _tracer, _provider
+
+    mode = (mode or OTEL_TRACING) if exporter is None else "custom"
+    if mode in ("", "off", "none"):
+        return None
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+    except ImportError:
+        log.warning("⚠️ opentelemetry-sdk not installed - tracing disabled")
+        return None
+
+    if exporter is None:
+        exporter = _create_exporter(mode)
+        if exporter is None:
+            return None
+
+    shutdown_tracing()
+    _provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    # Spans go out in the background, except in tests where they must be readable at once
+    processor = SimpleSpanProcessor if mode in ("custom", "memory") else BatchSpanProcessor
+    _provider.add_span_processor(processor(exporter))
+    _tracer = _provider.get_tracer("app")
+    log.info("🔭 Tracing", mode=mode, exporter=type(exporter).__name__)
+    return exporter
+
+
+def memory_exporter():
+    """Trace into memory and return the exporter (``get_finished_spans()``) - for tests"""
+    return configure_tracing(mode="memory")
+
+
+def shutdown_tracing():
+    """Flush and stop the exporter (called on shutdown)"""
+    global _tracer, _provider
+    if _provider is not None:
+        _provider.shutdown()
+    _tracer = None
+    _provider = None
+
+
+def tracing_enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, **attributes):
+    """Context manager for a span; a shared no-op when tracing is off"""
+    if _tracer is None:
+        return _NO_SPAN
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+def traced(name: str):
+    """Decorator: run an async function inside a span"""
+    def decorate(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return await func(*args, **kwargs)
+            with _tracer.start_as_current_span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def set_attributes(**attributes):
+    """Annotate the current span (no-op when tracing is off)"""
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+    trace.get_current_span().set_attributes(attributes)
+
+
+def _create_exporter(mode: str):
+    if mode == "memory":
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+        return InMemorySpanExporter()
+    if mode == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+        return ConsoleSpanExporter()
+    if mode == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            log.warning("⚠️ opentelemetry-exporter-otlp not installed - tracing disabled")
+            return None
+        return OTLPSpanExporter()
+    log.warning("⚠️ Unknown OTEL_TRACING - tracing disabled", mode=mode)
+    return None
@@ -0,0 +1,249 @@
+import os
+import json
+import uuid
+import asyncio
+from collections import defaultdict
+from typing import Callable, DefaultDict, Dict, List, Optional, Set
+
+from app.telemetry.log import get_logger
+
+log = get_logger(__name__)
+
+# deliver(session_id, message) hands a frame to this node's local connections
+Deliver = Callable[[str, dict], None]
+
+CHANNEL_PREFIX = "session:"
+
+
+class Backplane:
+    """Pub/sub fabric that carries session frames between workers
+
+    Each node publishes the frames it produces for a session and subscribes
+    only to the sessions it has local connections for (its subscription
+    index). ``publish``, ``subscribe`` and ``unsubscribe`` never wait on the
+    network - implementations batch the work in the background.
+    """
+
+    def __init__(self, node_id: Optional[str] = None):
+        self.node_id = node_id or uuid.uuid4().hex[:12]
+        self.subscriptions: Set[str] = set()
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def close(self):
+        pass
+
+    def subscribe(self, session_id: str):
+        self.subscriptions.add(session_id)
+
+    def unsubscribe(self, session_id: str):
+        self.subscriptions.discard(session_id)
+
+    def publish(self, session_id: str, message: dict):
+        raise NotImplementedError
+
+    def remote_listeners(self, session_id: str) -> int:
+        """Other nodes known to be listening to the session"""
+        return 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"subscriptions": len(self.subscriptions)}
+
+
+class InProcessHub:
+    """Shared bus for InProcessBackplane nodes living in one process"""
+
+    def __init__(self):
+        self.nodes: List["InProcessBackplane"] = []
+
+
+class InProcessBackplane(Backplane):
+    """Single-process backplane; nodes sharing a hub behave like separate workers"""
+
+    def __init__(self, hub: Optional[InProcessHub] = None, node_id: Optional[str] = None):
+        super().__init__(node_id)
+        self.hub = hub or InProcessHub()
+        self.hub.nodes.append(self)
+
+    async def close(self):
+        if self in self.hub.nodes:
+            self.hub.nodes.remove(self)
+
+    def publish(self, session_id: str, message: dict):
+        for node in self.hub.nodes:
+            if node is not self and session_id in node.subscriptions and node._deliver:
+                node._deliver(session_id, message)
+
+    def remote_listeners(self, session_id: str) -> int:
+        return sum(1 for node in self.hub.nodes if node is not self and session_id in node.subscriptions)
+
+
+class RedisBackplane(Backplane):
+    """Backplane over Redis pub/sub (one channel per session)
+
+    Works with any client exposing the ``redis.asyncio`` surface used here -
+    ``pubsub()``, ``pipeline()`` and ``aclose()`` - so a local fake can stand
+    in for Redis. Frames for the same session are sent as one payload per
+    flush, and all sessions' payloads go out in one pipelined round trip.
+    """
+
+    def __init__(
+        self,
+        client,
+        node_id: Optional[str] = None,
+        flush_interval: Optional[float] = None,
+        max_batch: int = 256,
+    ):
+        super().__init__(node_id)
+        self.client = client
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.getenv("BACKPLANE_FLUSH_MS", "2")
+        ) / 1000
+        self.max_batch = max_batch
+
+        self._pubsub = None
+        self._outbox: DefaultDict[str, List[dict]] = defaultdict(list)
+        self._outbox_size = 0
+        self._pending_subscribe: Set[str] = set()
+        self._pending_unsubscribe: Set[str] = set()
+        self._remote: Dict[str, int] = {}
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+        self.published_batches = 0
+        self.received_frames = 0
+
+    async def start(self, deliver: Deliver):
+        await super().start(deliver)
+        self._pubsub = self.client.pubsub()
+        self._tasks = [
+            asyncio.create_task(self._flush_loop()),
+            asyncio.create_task(self._receive_loop()),
+        ]
+
+    async def close(self):
+        await self._flush()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        await self.client.aclose()
+
+    def subscribe(self, session_id: str):
+        if session_id not in self.subscriptions:
+            super().subscribe(session_id)
+            self._pending_unsubscribe.discard(session_id)
+            self._pending_subscribe.add(session_id)
+            self._wakeup.set()
+
+    def unsubscribe(self, session_id: str):
+        if session_id in self.subscriptions:
+            super().unsubscribe(session_id)
+            self._pending_subscribe.discard(session_id)
+            self._pending_unsubscribe.add(session_id)
+            self._wakeup.set()
+
+    def publish(self, session_id: str, message: dict):
+        self._outbox[session_id].append(message)
+        self._outbox_size += 1
+        self._wakeup.set()
+
+    def remote_listeners(self, session_id: str) -> int:
+        return self._remote.get(session_id, 0)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscriptions": len(self.subscriptions),
+            "outbox": self._outbox_size,
+            "published_batches": self.published_batches,
+            "received_frames": self.received_frames,
+        }
+
+    async def _flush_loop(self):
+        while True:
+            await self._wakeup.wait()
+            # Give the batch a moment to fill unless it is already big
+            if self._outbox_size < self.max_batch:
+                await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+
+            try:
+                await self._flush()
+            except Exception as e:
+                log.warning("⚠️ Backplane flush failed", error=str(e))
+
+    async def _flush(self):
+        if self._pending_subscribe:
+            channels = [CHANNEL_PREFIX + s for s in self._pending_subscribe]
+            self._pending_subscribe.clear()
+            await self._pubsub.subscribe(*channels)
+
+        if self._pending_unsubscribe:
+            channels = [CHANNEL_PREFIX + s for s in self._pending_unsubscribe]
+            for session_id in self._pending_unsubscribe:
+                self._remote.pop(session_id, None)
+            self._pending_unsubscribe.clear()
+            await self._pubsub.unsubscribe(*channels)
+
+        if not self._outbox:
+            return
+
+        outbox, self._outbox, self._outbox_size = self._outbox, defaultdict(list), 0
+        session_ids = list(outbox)
+
+        pipe = self.client.pipeline(transaction=False)
+        for session_id in session_ids:
+            payload = json.dumps({"origin": self.node_id, "messages": outbox[session_id]})
+            pipe.publish(CHANNEL_PREFIX + session_id, payload)
+        counts = await pipe.execute()
+        self.published_batches += 1
+
+        # PUBLISH returns the number of subscribers; ours doesn't count
+        for session_id, count in zip(session_ids, counts):
+            own = 1 if session_id in self.subscriptions else 0
+            self._remote[session_id] = max(int(count) - own, 0)
+
+    async def _receive_loop(self):
+        while True:
+            if not self._pubsub.subscribed:
+                await asyncio.sleep(0.05)
+                continue
+
+            try:
+                event = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except Exception as e:
+                log.warning("⚠️ Backplane receive failed", error=str(e))
+                await asyncio.sleep(1.0)
+                continue
+
+            if not event or event.get("type") != "message":
+                continue
+
+            channel = event["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            session_id = channel[len(CHANNEL_PREFIX):]
+
+            payload = json.loads(event["data"])
+            if payload.get("origin") == self.node_id or session_id not in self.subscriptions:
+                continue
+
+            for message in payload.get("messages", []):
+                self.received_frames += 1
+                self._deliver(session_id, message)
+
+
+def create_backplane(url: Optional[str] = None) -> Backplane:
+    """Backplane from BACKPLANE_URL: ``redis://...`` or in-process (default)"""
+    url = url if url is not None else os.getenv("BACKPLANE_URL", "")
+
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis.asyncio as redis
+        return RedisBackplane(redis.from_url(url))
+
+    return InProcessBackplane()
@@ -0,0 +1,75 @@
+import json
+from typing import Any, Dict, Optional
+
+# Fast encoders are optional - fall back to the stdlib when they're missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_SUBPROTOCOL = "json"
+MSGPACK_SUBPROTOCOL = "msgpack"
+
+
+def dumps(message: Dict[str, Any]) -> str:
+    """Compact JSON text for one frame"""
+    if orjson is not None:
+        return orjson.dumps(message).decode()
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class JsonCodec:
+    subprotocol = JSON_SUBPROTOCOL
+
+    def loads(self, data) -> Dict[str, Any]:
+        return loads(data)
+
+    async def send(self, websocket, message: Dict[str, Any]) -> int:
+        data = dumps(message)
+        await websocket.send_text(data)
+        return len(data)
+
+
+class MsgpackCodec:
+    subprotocol = MSGPACK_SUBPROTOCOL
+
+    def loads(self, data) -> Dict[str, Any]:
+        # Binary frames are MessagePack; text frames stay JSON
+        if isinstance(data, bytes):
+            return msgpack.unpackb(data, raw=False)
+        return loads(data)
+
+    async def send(self, websocket, message: Dict[str, Any]) -> int:
+        data = msgpack.packb(message, use_bin_type=True)
+        await websocket.send_bytes(data)
+        return len(data)
+
+
+def negotiate(websocket) -> Optional[str]:
+    """Pick the subprotocol to accept from what the client offered
+
+    MessagePack is opt-in: the client has to offer ``msgpack`` and the server
+    needs the msgpack package. Clients that offer nothing get plain JSON.
+    """
+    offered = websocket.scope.get("subprotocols") or []
+
+    if MSGPACK_SUBPROTOCOL in offered and msgpack is not None:
+        return MSGPACK_SUBPROTOCOL
+    if JSON_SUBPROTOCOL in offered:
+        return JSON_SUBPROTOCOL
+    return None
+
+
+def codec_for(subprotocol: Optional[str]):
+    return MsgpackCodec() if subprotocol == MSGPACK_SUBPROTOCOL else JsonCodec()
@@ -0,0 +1,116 @@
+import os
+import importlib
+from importlib import metadata
+from typing import Optional, Tuple
+
+from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
+from websockets.frames import OP_BINARY, OP_TEXT
+
+from app.telemetry.log import get_logger
+
+log = get_logger(__name__)
+
+# permessage-deflate is negotiated per connection; frames below the threshold
+# go out uncompressed (RSV1 clear), which RFC 7692 allows at any time
+WS_DEFLATE = os.getenv("WS_DEFLATE", "1") != "0"
+# Opt-in (0 = compress every message): patches uvicorn's protocol modules, see
+# install_deflate_threshold
+DEFLATE_MIN_BYTES = int(os.getenv("WS_DEFLATE_MIN_BYTES", "0"))
+
+# uvicorn protocol modules that build a ServerPerMessageDeflateFactory per connection
+_UVICORN_WS_MODULES = (
+    "uvicorn.protocols.websockets.websockets_impl",
+    "uvicorn.protocols.websockets.websockets_sansio_impl",
+)
+
+# Versions the patch was checked against: [first, last) release
+_SUPPORTED = {
+    "uvicorn": ((0, 30), (0, 55)),
+    "websockets": ((13,), (16,)),
+}
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """permessage-deflate that leaves small, unfragmented messages alone
+
+    Token frames are a few dozen bytes - compressing them costs CPU and
+    saves nothing. Skipped messages never touch the compressor, so the
+    shared context stays in sync with the peer's decompressor.
+    """
+
+    min_size = DEFLATE_MIN_BYTES
+
+    def encode(self, frame):
+        if frame.opcode in (OP_TEXT, OP_BINARY) and frame.fin and len(frame.data) < self.min_size:
+            return frame
+        return super().encode(frame)
+
+
+def threshold_factory(min_size: int):
+    class ThresholdPerMessageDeflateFactory(ServerPerMessageDeflateFactory):
+        def process_request_params(self, params, accepted_extensions):
+            response_params, extension = super().process_request_params(params, accepted_extensions)
+            # Only a plain PerMessageDeflate has the state our subclass expects
+            if type(extension) is PerMessageDeflate:
+                extension.__class__ = ThresholdPerMessageDeflate
+                extension.min_size = min_size
+            return response_params, extension
+
+    return ThresholdPerMessageDeflateFactory
+
+
+def _version(package: str) -> Optional[Tuple[int, ...]]:
+    try:
+        release = metadata.version(package).split("+")[0]
+    except metadata.PackageNotFoundError:
+        return None
+    parts = []
+    for part in release.split("."):
+        if not part.isdigit():
+            break
+        parts.append(int(part))
+    return tuple(parts)
+
+
+def unsupported_versions() -> Optional[str]:
+    """Why the patch can't be trusted with what is installed; None if it can"""
+    for package, (first, last) in _SUPPORTED.items():
+        version = _version(package)
+        if version is None or not first <= version < last:
+            found = ".".join(map(str, version)) if version else "not installed"
+            return f"{package} {found} is outside the checked range"
+    return None
+
+
+def install_deflate_threshold(min_size: int = DEFLATE_MIN_BYTES) -> bool:
+    """Make uvicorn's websockets protocols negotiate the thresholded extension
+
+    Opt-in with WS_DEFLATE_MIN_BYTES > 0. uvicorn doesn't expose extension
+    options, so the factory it looks up at connection time is swapped - only
+    for uvicorn/websockets releases it was checked against. Anything that
+    stops it from applying is logged; messages are then compressed as usual.
+    The wsproto implementation is left as is (it compresses every message).
+    """
+    if min_size <= 0:
+        return False
+
+    reason = unsupported_versions()
+    if reason is not None:
+        log.warning("⚠️ Deflate threshold not applied, compressing every message", reason=reason)
+        return False
+
+    installed = False
+    for module_name in _UVICORN_WS_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+
+        if hasattr(module, "ServerPerMessageDeflateFactory"):
+            module.ServerPerMessageDeflateFactory = threshold_factory(min_size)
+            installed = True
+
+    if not installed:
+        log.warning("⚠️ Deflate threshold not applied, compressing every message",
+                    reason="no uvicorn websockets protocol module to patch")
+    return installed
@@ -0,0 +1,40 @@
+import os
+import hmac
+import hashlib
+from typing import Optional
+
+# Secret shared with whatever authenticates users; it signs ``?token=`` values
+AUTH_SECRET = os.getenv("AUTH_SECRET", "")
+
+
+def sign_user(user_id: str, secret: Optional[str] = None) -> str:
+    """Token proving ``user_id`` (``<user_id>.<hmac>``), issued by the auth service"""
+    secret = secret if secret is not None else AUTH_SECRET
+    mac = hmac.new(secret.encode(), user_id.encode(), hashlib.sha256).hexdigest()
+    return f"{user_id}.{mac}"
+
+
+def verified_user(token: Optional[str], secret: Optional[str] = None) -> Optional[str]:
+    """The user a token was signed for; None if it is missing, malformed or forged"""
+    secret = secret if secret is not None else AUTH_SECRET
+    if not secret or not token or "." not in token:
+        return None
+
+    user_id, _, mac = token.rpartition(".")
+    expected = hmac.new(secret.encode(), user_id.encode(), hashlib.sha256).hexdigest()
+    return user_id if user_id and hmac.compare_digest(mac, expected) else None
+
+
+def client_identity(websocket, secret: Optional[str] = None) -> str:
+    """Who rate limits count against - never a value the client simply claims
+
+    A user proven by a signed ``?token=``, otherwise the peer address (run
+    uvicorn with ``--proxy-headers`` behind a proxy so this is the client,
+    not the proxy). ``?user_id=`` is only a label.
+    """
+    user_id = verified_user(websocket.query_params.get("token"), secret)
+    if user_id is not None:
+        return f"user:{user_id}"
+
+    client = websocket.client
+    return f"ip:{client.host if client else 'unknown'}"
@@ -1,49 +1,371 @@
-from typing import Dict, List, Set
-from fastapi import WebSocket
+import os
+import asyncio
+from typing import Callable, Dict, List, Optional
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.websocket.backplane import Backplane, InProcessBackplane
+from app.websocket.codec import JsonCodec, codec_for, negotiate
+from app.websocket.replay import WS_REPLAY_FRAMES, ReplayBuffer
+from app.telemetry.log import get_logger
+from app.telemetry.metrics import BYTES_OUT, FRAMES_OUT
+
+log = get_logger(__name__)
+
+# Close code for evicted slow consumers ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+class Connection:
+    """One socket with its own bounded outbound queue and sender task
+
+    Producers only ever enqueue, so a slow client never delays anyone else;
+    if its queue fills up or a single send takes longer than ``send_timeout``
+    the connection is evicted.
+
+    The sender coalesces: token chunks (``ai_message``) that arrive within
+    ``coalesce_interval`` of each other go out as one frame, encoded with the
+    codec negotiated for this socket.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        session_id: str,
+        max_queue: int,
+        send_timeout: float,
+        on_evict: Callable[["Connection"], None],
+        codec=None,
+        coalesce_interval: float = 0.0
+    ):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.send_timeout = send_timeout
+        self.codec = codec or JsonCodec()
+        self.coalesce_interval = coalesce_interval
+        self.frames_sent = 0
+        self.frames_coalesced = 0
+        self.replayed: Optional[int] = None  # Frames resent on a resume; None if it couldn't be served
+        self._room = asyncio.Event()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+        self._on_evict = on_evict
+        self._closer: Optional[asyncio.Task] = None
+        self._sender = asyncio.create_task(self._run())
+
+    def enqueue(self, message: dict) -> bool:
+        """Queue a frame without waiting; False if the connection is gone"""
+        if self.closed:
+            return False
+
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self._evict(f"outbound queue full ({self.queue.maxsize} frames)")
+            return False
+
+    async def wait_for_room(self, limit: int):
+        """Wait until at most ``limit`` frames are queued (for bulk producers)"""
+        while not self.closed and self.queue.qsize() > limit:
+            self._room.clear()
+            await self._room.wait()
+
+    def close(self):
+        """Stop sending (normal disconnect)"""
+        self.closed = True
+        self._room.set()
+        if self._sender is not asyncio.current_task():
+            self._sender.cancel()
+
+    async def _run(self):
+        while True:
+            frames = await self._next_frames()
+            try:
+                for frame in frames:
+                    size = await asyncio.wait_for(self.codec.send(self.websocket, frame), self.send_timeout)
+                    self.frames_sent += 1
+                    FRAMES_OUT.inc()
+                    BYTES_OUT.inc(size)
+                self._room.set()
+            except asyncio.TimeoutError:
+                self._evict(f"send took longer than {self.send_timeout}s")
+                return
+            except Exception as e:
+                self._evict(f"send failed: {e}")
+                return
+
+    async def _next_frames(self) -> List[dict]:
+        """Wait for a frame; merge any token chunks that follow it closely"""
+        message = await self.queue.get()
+        if message.get("type") != "ai_message" or self.coalesce_interval <= 0:
+            return [message]
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.coalesce_interval
+        parts = [message["content"]]
+        newest = message
+        frames = []
+
+        while True:
+            try:
+                following = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    following = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            if following.get("type") == "ai_message" and following.keys() == message.keys():
+                parts.append(following["content"])
+                newest = following
+                self.frames_coalesced += 1
+                continue
+
+            # Anything else (e.g. ai_message_end) ends the run and keeps its order
+            frames.append(following)
+            break
+
+        # Carries the newest seq, so acknowledging it covers every merged chunk
+        merged = dict(newest)
+        merged["content"] = "".join(parts)
+        return [merged] + frames
+
+    def _evict(self, reason: str):
+        if self.closed:
+            return
+
+        log.warning("🐢 Evicting connection", session_id=self.session_id, reason=reason)
+        self._on_evict(self)
+        self.close()
+
+        # Closing unblocks the handler's receive loop, which then cleans up
+        self._closer = asyncio.create_task(self._close_socket())
+
+    async def _close_socket(self):
+        try:
+            await self.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass
+
+class SessionChannel:
+    """``send_json`` target that reaches every connection of a session
+
+    Drop-in for a single WebSocket wherever frames are produced (the LLM
+    clients, tool results). Raises WebSocketDisconnect once nobody is left
+    listening on any worker and the session can no longer be resumed, so
+    in-flight generations stop.
+    """
+
+    def __init__(self, manager: "ConnectionManager", session_id: str):
+        self.manager = manager
+        self.session_id = session_id
+
+    async def send_json(self, message: dict):
+        delivered = await self.manager.broadcast_to_session(self.session_id, message)
+        if not delivered and not self.manager.resumable(self.session_id):
+            raise WebSocketDisconnect(code=1001)
+
+    async def drain(self):
+        """Backpressure for bulk sends: wait for local queues to be half empty"""
+        connections = self.manager.active_connections.get(self.session_id, {})
+        for connection in list(connections.values()):
+            await connection.wait_for_room(self.manager.max_queue // 2)
 
 class ConnectionManager:
-    """Manager for WebSocket connections"""
-    
-    def __init__(self):
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
-    
-    async def connect(self, websocket: WebSocket, session_id: str):
-        """Accept WebSocket connection and add to session"""
-        await websocket.accept()
-        
+    """Manager for WebSocket connections
+
+    Local sockets live in ``active_connections``; frames for a session also
+    go out over the backplane so connections on other workers get them too.
+
+    Each session on this worker numbers its session-wide frames and keeps
+    recent ones in a ``ReplayBuffer`` from its first connection until
+    ``forget``, so a client can reconnect with ``resume_after`` and pick up
+    where it left off. Sequence numbers are per worker, under the buffer's
+    epoch: a resume is only served by the worker whose epoch the client
+    presents, and only if no other worker's frames reached the session
+    since - anything else is refused rather than replayed with holes.
+    Frames for one socket (``send_message``) are not numbered.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = None,
+        send_timeout: float = None,
+        backplane: Backplane = None,
+        coalesce_interval: float = None,
+        replay_frames: int = None
+    ):
+        self.active_connections: Dict[str, Dict[WebSocket, Connection]] = {}
+        self.replay: Dict[str, ReplayBuffer] = {}
+        self._by_socket: Dict[WebSocket, Connection] = {}
+        self.max_queue = max_queue or int(os.getenv("WS_OUTBOUND_QUEUE", "256"))
+        self.send_timeout = send_timeout or float(os.getenv("WS_SEND_TIMEOUT", "5"))
+        if coalesce_interval is None:
+            coalesce_interval = float(os.getenv("WS_COALESCE_MS", "5")) / 1000
+        self.coalesce_interval = coalesce_interval
+        # A replay is queued in one go, so it must leave room in the outbound queue
+        self.replay_frames = min(replay_frames or WS_REPLAY_FRAMES, self.max_queue // 2)
+        self.backplane = backplane or InProcessBackplane()
+        self.evicted = 0
+
+    async def start(self, backplane: Backplane = None):
+        """Attach (optionally replace) the backplane and start receiving from it"""
+        if backplane is not None:
+            self.backplane = backplane
+        await self.backplane.start(self._deliver_remote)
+
+    async def close(self):
+        await self.backplane.close()
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        session_id: str,
+        resume_after: Optional[int] = None,
+        epoch: Optional[str] = None
+    ) -> Connection:
+        """Accept WebSocket connection and add to session
+
+        With ``resume_after`` and ``epoch`` (the last seq the client saw and
+        its epoch) the frames it missed are queued first; ``connection.replayed`` says how many, or is
+        None when they are no longer available. Registering and replaying
+        happen without yielding, so no live frame can slip in between.
+        """
+        subprotocol = negotiate(websocket)
+        await websocket.accept(subprotocol=subprotocol)
+
+        connection = Connection(
+            websocket,
+            session_id,
+            self.max_queue,
+            self.send_timeout,
+            self._evicted,
+            codec=codec_for(subprotocol),
+            coalesce_interval=self.coalesce_interval
+        )
+
         if session_id not in self.active_connections:
-            self.active_connections[session_id] = set()
-        
-        self.active_connections[session_id].add(websocket)
-        print(f"Client connected to session {session_id}. Total connections: {len(self.active_connections[session_id])}")
-    
-    def disconnect(self, websocket: WebSocket, session_id: str):
-        """Remove WebSocket connection from session"""
-        if session_id in self.active_connections:
-            self.active_connections[session_id].discard(websocket)
-            
-            if not self.active_connections[session_id]:
-                del self.active_connections[session_id]
-    
+            self.active_connections[session_id] = {}
+            self.backplane.subscribe(session_id)
+
+        self.active_connections[session_id][websocket] = connection
+        self._by_socket[websocket] = connection
+
+        replay = self.replay.get(session_id)
+        if replay is None:
+            replay = self.replay[session_id] = ReplayBuffer(self.replay_frames)
+        if resume_after is not None:
+            frames = replay.since(resume_after, epoch)
+            if frames is not None:
+                for frame in frames:
+                    connection.enqueue(frame)
+                connection.replayed = len(frames)
+        log.debug("Client connected", sample=True, session_id=session_id, connections=len(self.active_connections[session_id]))
+        return connection
+
+    def disconnect(self, websocket: WebSocket, session_id: str) -> int:
+        """Remove WebSocket connection from session; returns connections left"""
+        connections = self.active_connections.get(session_id)
+        if connections is None:
+            return 0
+
+        connection = connections.pop(websocket, None)
+        if connection is not None:
+            self._by_socket.pop(websocket, None)
+            connection.close()
+
+        if not connections:
+            del self.active_connections[session_id]
+            self.backplane.unsubscribe(session_id)
+            return 0
+        return len(connections)
+
+    def channel(self, session_id: str) -> SessionChannel:
+        return SessionChannel(self, session_id)
+
+    def resumable(self, session_id: str) -> bool:
+        """The session is still kept here (connected, or waiting for a resume)"""
+        return session_id in self.replay
+
+    def forget(self, session_id: str):
+        """The session is over: stop numbering and drop its replay buffer"""
+        self.replay.pop(session_id, None)
+
+    def resume_point(self, session_id: str) -> Dict[str, object]:
+        """Where a client that has seen everything so far would resume from"""
+        replay = self.replay.get(session_id)
+        if replay is None:
+            return {}
+        return {"epoch": replay.epoch, "resume_after": replay.seq}
+
     async def send_message(self, websocket: WebSocket, message: dict):
-        """Send message to specific WebSocket"""
-        try:
-            await websocket.send_json(message)
-        except Exception as e:
-            print(f"Error sending message: {e}")
-    
-    async def broadcast_to_session(self, session_id: str, message: dict):
-        """Broadcast message to all connections in a session"""
-        if session_id in self.active_connections:
-            for connection in self.active_connections[session_id].copy():
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    print(f"Error broadcasting to connection: {e}")
-                    self.disconnect(connection, session_id)
-    
+        """Send message to specific WebSocket (not numbered, never replayed)"""
+        connection = self._by_socket.get(websocket)
+        if connection is None:
+            log.warning("Error sending message: connection is not registered")
+            return
+
+        connection.enqueue(message)
+
+    async def broadcast_to_session(self, session_id: str, message: dict) -> int:
+        """Broadcast message to all connections in a session, on every worker
+
+        Every connection has its own sender, so this only enqueues and the
+        fan-out happens concurrently. Returns how many local connections took
+        it plus the number of other workers known to be listening.
+
+        The frame is numbered and kept for replay before it goes out, so
+        other workers forward the same seq.
+        """
+        replay = self.replay.get(session_id)
+        if replay is not None:
+            message = replay.stamp(message)
+        self.backplane.publish(session_id, message)
+        return self._deliver_local(session_id, message) + self.backplane.remote_listeners(session_id)
+
+    def _deliver_remote(self, session_id: str, message: dict) -> int:
+        """A frame from another worker: ours can no longer resume past it"""
+        replay = self.replay.get(session_id)
+        if replay is not None:
+            replay.gap()
+        return self._deliver_local(session_id, message)
+
+    def _deliver_local(self, session_id: str, message: dict) -> int:
+        connections = self.active_connections.get(session_id)
+        if not connections:
+            return 0
+
+        delivered = 0
+        for connection in list(connections.values()):
+            if connection.enqueue(message):
+                delivered += 1
+        return delivered
+
     async def get_session_connections(self, session_id: str) -> List[WebSocket]:
         """Get all connections for a session"""
         if session_id in self.active_connections:
             return list(self.active_connections[session_id])
-        return []
\ No newline at end of file
+        return []
+
+    @property
+    def connection_count(self) -> int:
+        return len(self._by_socket)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self.active_connections),
+            "connections": sum(len(c) for c in self.active_connections.values()),
+            "evicted": self.evicted,
+            "frames_sent": sum(c.frames_sent for c in self._by_socket.values()),
+            "frames_coalesced": sum(c.frames_coalesced for c in self._by_socket.values()),
+            "replay_sessions": len(self.replay),
+            "replay_frames": sum(len(r) for r in self.replay.values()),
+            "replay_bytes": sum(r.bytes for r in self.replay.values()),
+            "backplane": self.backplane.stats()
+        }
+
+    def _evicted(self, connection: Connection):
+        self.evicted += 1
+        self.disconnect(connection.websocket, connection.session_id)
@@ -0,0 +1,232 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.llm.resilience import TokenBucket
+
+# (key, tokens per second, burst capacity)
+Limit = Tuple[str, float, float]
+
+
+def _per_minute(name: str, default: str) -> float:
+    return float(os.getenv(name, default)) / 60
+
+
+class Decision:
+    __slots__ = ("allowed", "scope", "retry_after", "waited")
+
+    def __init__(self, allowed: bool, scope: Optional[str] = None, retry_after: float = 0.0, waited: float = 0.0):
+        self.allowed = allowed
+        self.scope = scope
+        self.retry_after = retry_after
+        self.waited = waited
+
+
+class LocalLimiterBackend:
+    """Token buckets in this process, LRU-bounded
+
+    A bucket that has been idle long enough to refill is indistinguishable
+    from a new one, so evicting the least recently used keys loses nothing
+    that matters.
+    """
+
+    def __init__(self, max_keys: Optional[int] = None):
+        self.max_keys = max_keys or int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    async def take(self, limits: List[Limit]) -> Tuple[float, Optional[str]]:
+        """Take one token from every bucket, or none; returns (wait seconds, limiting key)"""
+        buckets = [(key, self._bucket(key, rate, burst)) for key, rate, burst in limits]
+
+        wait, limiting = 0.0, None
+        for key, bucket in buckets:
+            bucket_wait = bucket.wait_time()
+            if bucket_wait > wait:
+                wait, limiting = bucket_wait, key
+        if wait > 0:
+            return wait, limiting
+
+        for _, bucket in buckets:
+            bucket.try_acquire()
+        return 0.0, None
+
+    async def close(self):
+        pass
+
+    def _bucket(self, key: str, rate: float, burst: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate, burst)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+
+# Atomic multi-bucket take: KEYS are buckets, ARGV = now_ms, then rate/ms and burst per key.
+# Returns {0, ""} when every bucket had a token, else {wait_ms, limiting key}.
+_TAKE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local state = {}
+local wait, limiting = 0, ""
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    local current = redis.call("HMGET", key, "tokens", "ts")
+    local tokens = tonumber(current[1]) or burst
+    local ts = tonumber(current[2]) or now
+    tokens = math.min(burst, tokens + math.max(now - ts, 0) * rate)
+    state[i] = tokens
+    if tokens < 1 then
+        local key_wait = math.ceil((1 - tokens) / rate)
+        if key_wait > wait then
+            wait, limiting = key_wait, key
+        end
+    end
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    local tokens = state[i]
+    if wait == 0 then
+        tokens = tokens - 1
+    end
+    redis.call("HSET", key, "tokens", tostring(tokens), "ts", now)
+    redis.call("PEXPIRE", key, math.ceil(burst / rate) + 1000)
+end
+return {wait, limiting}
+"""
+
+
+class RedisLimiterBackend:
+    """Token buckets shared by every worker, updated atomically by one Lua script"""
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_TAKE_SCRIPT)
+
+    async def take(self, limits: List[Limit]) -> Tuple[float, Optional[str]]:
+        keys = [self.prefix + key for key, _, _ in limits]
+        args = [int(time.time() * 1000)]
+        for _, rate, burst in limits:
+            args += [rate / 1000, burst]
+
+        wait_ms, limiting = await self._script(keys=keys, args=args)
+        if isinstance(limiting, bytes):
+            limiting = limiting.decode()
+        if not wait_ms:
+            return 0.0, None
+        return float(wait_ms) / 1000, limiting[len(self.prefix):]
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class RateLimiter:
+    """Admission control for user messages
+
+    Every message takes one token from its session's bucket, its user's
+    bucket and the global provider-quota bucket (each optional: a rate of 0
+    disables it). Users are the server-side ``identity`` of the socket
+    (see ``app.websocket.identity``), never a client-chosen id, and session
+    buckets are scoped by it - nobody can spend another user's budget by
+    naming their user or session. If a token is a short wait away (``max_wait``) the message
+    is held back and then admitted; otherwise it is rejected with the scope
+    that limited it and when to retry.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        session_rate: Optional[float] = None,
+        session_burst: Optional[float] = None,
+        user_rate: Optional[float] = None,
+        user_burst: Optional[float] = None,
+        global_rate: Optional[float] = None,
+        global_burst: Optional[float] = None,
+        max_wait: Optional[float] = None,
+    ):
+        self.backend = backend or LocalLimiterBackend()
+        self.session_rate = session_rate if session_rate is not None else _per_minute("RATE_SESSION_PER_MIN", "20")
+        self.session_burst = session_burst or float(os.getenv("RATE_SESSION_BURST", "5"))
+        self.user_rate = user_rate if user_rate is not None else _per_minute("RATE_USER_PER_MIN", "60")
+        self.user_burst = user_burst or float(os.getenv("RATE_USER_BURST", "10"))
+        # Provider quota for the whole deployment (per worker without a shared backend)
+        self.global_rate = global_rate if global_rate is not None else _per_minute("RATE_GLOBAL_PER_MIN", "600")
+        self.global_burst = global_burst or float(os.getenv("RATE_GLOBAL_BURST", "20"))
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("RATE_LIMIT_MAX_WAIT_MS", "2000")) / 1000
+
+        self.admitted = 0
+        self.delayed = 0
+        self.rejected: Dict[str, int] = {"session": 0, "user": 0, "global": 0}
+
+    def limits(self, session_id: str, identity: Optional[str]) -> List[Limit]:
+        limits = []
+        if self.session_rate > 0:
+            limits.append((f"session:{identity}/{session_id}", self.session_rate, self.session_burst))
+        if identity and self.user_rate > 0:
+            limits.append((f"user:{identity}", self.user_rate, self.user_burst))
+        if self.global_rate > 0:
+            limits.append(("global", self.global_rate, self.global_burst))
+        return limits
+
+    async def admit(self, session_id: str, identity: Optional[str] = None, on_delay=None) -> Decision:
+        """Wait (at most ``max_wait`` in total) for a token; ``on_delay(seconds)`` is told once"""
+        limits = self.limits(session_id, identity)
+        if not limits:
+            self.admitted += 1
+            return Decision(True)
+
+        waited = 0.0
+        notified = False
+        while True:
+            wait, key = await self.backend.take(limits)
+            if wait <= 0:
+                self.admitted += 1
+                if waited:
+                    self.delayed += 1
+                return Decision(True, waited=waited)
+
+            scope = key.split(":", 1)[0]
+            if waited + wait > self.max_wait:
+                self.rejected[scope] += 1
+                return Decision(False, scope, retry_after=wait, waited=waited)
+
+            if on_delay is not None and not notified:
+                notified = True
+                await on_delay(wait)
+
+            await asyncio.sleep(wait)
+            waited += wait
+
+    async def close(self):
+        await self.backend.close()
+
+    def stats(self) -> Dict[str, object]:
+        stats = {
+            "admitted": self.admitted,
+            "delayed": self.delayed,
+            "rejected": dict(self.rejected),
+            "backend": type(self.backend).__name__,
+        }
+        if isinstance(self.backend, LocalLimiterBackend):
+            stats["buckets"] = len(self.backend)
+        return stats
+
+
+def create_rate_limiter(url: Optional[str] = None) -> RateLimiter:
+    """Limiter from RATE_LIMIT_URL: ``redis://...`` shares buckets across workers"""
+    url = url if url is not None else os.getenv("RATE_LIMIT_URL", "")
+
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis.asyncio as redis
+        return RateLimiter(RedisLimiterBackend(redis.from_url(url)))
+
+    return RateLimiter()
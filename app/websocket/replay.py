@@ -0,0 +1,108 @@
+import os
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.websocket.codec import dumps
+
+# Session frames kept for resuming clients; one streamed answer takes one slot
+WS_REPLAY_FRAMES = int(os.getenv("WS_REPLAY_FRAMES", "128"))
+# ...and at most this many encoded bytes of them (large tool results fill this first)
+WS_REPLAY_BYTES = int(os.getenv("WS_REPLAY_BYTES", str(256 * 1024)))
+
+
+class ReplayBuffer:
+    """Numbers a session's outbound frames and keeps the recent ones for resumes
+
+    Every frame sent to the whole session gets the next ``seq`` and the
+    buffer's ``epoch`` and is kept (the newest ``max_frames``, at most
+    ``max_bytes`` encoded), so a client that drops can reconnect with the
+    last seq and epoch it saw and get exactly what it missed. Seqs only mean
+    something within their epoch: another worker, or a later incarnation of
+    the session, numbers its frames under a different one.
+
+    Token chunks of one answer share an entry, each chunk keeping its own
+    seq: a long answer costs one slot, and a client that saw half of it gets
+    only the other half back.
+    """
+
+    __slots__ = ("seq", "epoch", "max_frames", "max_bytes", "bytes", "_entries", "_floor")
+
+    def __init__(self, max_frames: int = WS_REPLAY_FRAMES, max_bytes: int = WS_REPLAY_BYTES,
+                 epoch: Optional[str] = None):
+        self.seq = 0
+        self.epoch = epoch or uuid.uuid4().hex[:8]
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.bytes = 0  # Encoded size of what is kept
+        # [frame, [(seq, content), ...] for ai_message else None, newest seq, bytes]
+        self._entries: Deque[list] = deque()
+        self._floor = 0  # Oldest seq a resume can start after (older frames are gone)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stamp(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of ``message`` with the next seq and our epoch, kept for replay"""
+        self.seq += 1
+        frame = dict(message)
+        frame["seq"] = self.seq
+        frame["epoch"] = self.epoch
+        self._keep(frame)
+        return frame
+
+    def gap(self):
+        """Frames we don't hold (relayed from another worker) went out just now
+
+        A client that saw nothing newer can't be brought up to date here.
+        """
+        self._floor = self.seq + 1
+
+    def since(self, last_seq: int, epoch: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """Kept frames after ``last_seq`` of ``epoch``; None if some of them are gone
+
+        Another epoch means the client's seqs were numbered elsewhere
+        (another worker, or the session expired and started over) - also None.
+        """
+        if epoch != self.epoch or last_seq < self._floor or last_seq > self.seq:
+            return None
+
+        frames = []
+        for frame, chunks, newest, _ in self._entries:
+            if newest <= last_seq:
+                continue
+            if chunks is None:
+                frames.append(frame)
+                continue
+            merged = dict(frame)
+            merged["content"] = "".join(content for seq, content in chunks if seq > last_seq)
+            merged["seq"] = newest
+            frames.append(merged)
+        return frames
+
+    def _keep(self, frame: Dict[str, Any]):
+        entries = self._entries
+        seq = frame["seq"]
+
+        if frame.get("type") == "ai_message":
+            content = frame["content"]
+            size = len(content.encode())
+            last = entries[-1] if entries else None
+            # The next chunk of the answer being kept
+            if last is not None and last[1] is not None and last[0].keys() == frame.keys():
+                last[1].append((seq, content))
+                last[2] = seq
+                last[3] += size
+            else:
+                entries.append([frame, [(seq, content)], seq, size])
+        else:
+            size = len(dumps(frame).encode())
+            entries.append([frame, None, seq, size])
+        self.bytes += size
+
+        # Oldest first - even the answer being streamed, if it alone is too big
+        # (its later chunks then start a new entry)
+        while entries and (len(entries) > self.max_frames or self.bytes > self.max_bytes):
+            dropped = entries.popleft()
+            self._floor = max(self._floor, dropped[2])
+            self.bytes -= dropped[3]
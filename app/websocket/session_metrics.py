@@ -0,0 +1,160 @@
+import time
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.telemetry.metrics import GENERATION_TIME, TIME_TO_FIRST_TOKEN
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram - O(1) memory per session, O(log buckets) per sample"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th sample, capped at the observed max"""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(LATENCY_BUCKETS[i], self.max) if i < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_seconds": round(self.mean, 3),
+            "p50_seconds": self.quantile(0.5),
+            "p95_seconds": self.quantile(0.95),
+            "max_seconds": round(self.max, 3),
+            "buckets": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], self.counts)),
+        }
+
+
+class TurnTimer:
+    """Times one user turn: message received -> first token -> generation done"""
+
+    __slots__ = ("metrics", "started", "first_token_at")
+
+    def __init__(self, metrics: "SessionMetrics"):
+        self.metrics = metrics
+        self.started = time.perf_counter()
+        self.first_token_at = None
+
+    def first_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            self.metrics.time_to_first_token.observe(self.first_token_at - self.started)
+            TIME_TO_FIRST_TOKEN.observe(self.first_token_at - self.started)
+
+    def finish(self):
+        elapsed = time.perf_counter() - self.started
+        self.metrics.generation_time.observe(elapsed)
+        GENERATION_TIME.observe(elapsed)
+
+
+class SessionMetrics:
+    """Counters for one live session, updated as frames flow"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.start_time = datetime.now(timezone.utc)
+        self.user_messages = 0
+        self.ai_responses = 0
+        self.tool_calls = 0
+        self.frames_out = 0
+        self.time_to_first_token = LatencyHistogram()
+        self.generation_time = LatencyHistogram()
+
+    def begin_turn(self) -> TurnTimer:
+        self.user_messages += 1
+        return TurnTimer(self)
+
+    def snapshot(self, end_time: Optional[datetime] = None) -> Dict[str, Any]:
+        """Same keys as calculate_session_metrics, plus the latency histograms"""
+        end = end_time or datetime.now(timezone.utc)
+        duration = (end - self.start_time).total_seconds()
+
+        return {
+            "total_messages": self.user_messages + self.ai_responses,
+            "user_messages": self.user_messages,
+            "ai_responses": self.ai_responses,
+            "tool_calls": self.tool_calls,
+            "duration_seconds": duration,
+            "avg_response_time_seconds": round(self.generation_time.mean, 2),
+            "start_time": self.start_time.isoformat(),
+            "end_time": end_time.isoformat() if end_time else None,
+            "interaction_density": round(self.user_messages / max(duration / 60, 1), 2),
+            "frames_out": self.frames_out,
+            "time_to_first_token": self.time_to_first_token.to_dict(),
+            "generation_time": self.generation_time.to_dict(),
+        }
+
+
+class MeteredSocket:
+    """Wraps a socket for one turn, feeding outgoing frames into the metrics"""
+
+    def __init__(self, websocket, metrics: SessionMetrics, turn: TurnTimer):
+        self._websocket = websocket
+        self._metrics = metrics
+        self._turn = turn
+
+    async def send_json(self, message: Dict[str, Any]):
+        frame_type = message.get("type")
+        if frame_type == "ai_message":
+            self._turn.first_token()
+        elif frame_type == "ai_message_end":
+            self._metrics.ai_responses += 1
+        elif frame_type in ("tool_result", "tool_result_end"):
+            self._metrics.tool_calls += 1
+
+        self._metrics.frames_out += 1
+        await self._websocket.send_json(message)
+
+    def __getattr__(self, name):
+        return getattr(self._websocket, name)
+
+
+class SessionMetricsRegistry:
+    """Live metrics for every session on this worker"""
+
+    def __init__(self):
+        self._sessions: Dict[str, SessionMetrics] = {}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Optional[SessionMetrics]:
+        return self._sessions.get(session_id)
+
+    def start(self, session_id: str) -> SessionMetrics:
+        metrics = self._sessions.get(session_id)
+        if metrics is None:
+            metrics = self._sessions[session_id] = SessionMetrics(session_id)
+        return metrics
+
+    def finish(self, session_id: str) -> Optional[SessionMetrics]:
+        return self._sessions.pop(session_id, None)
@@ -0,0 +1,94 @@
+import os
+import json
+import uuid
+from typing import Any, Iterator
+
+# Results whose JSON is larger than this are streamed as a sequence of chunks
+TOOL_RESULT_CHUNK_BYTES = int(os.getenv("TOOL_RESULT_CHUNK_BYTES", "16384"))
+
+_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _json_chunks(value: Any, chunk_size: int) -> Iterator[str]:
+    """Encode incrementally, yielding pieces of JSON text of at most chunk_size UTF-8 bytes"""
+    # Room for the longest UTF-8 character, so every cut makes progress
+    chunk_size = max(chunk_size, 4)
+    buffer = []
+    size = 0
+
+    for piece in _encoder.iterencode(value):
+        buffer.append(piece)
+        size += len(piece.encode())
+        if size >= chunk_size:
+            data = "".join(buffer).encode()
+            start = 0
+            while len(data) - start >= chunk_size:
+                end = _char_boundary(data, start + chunk_size)
+                yield data[start:end].decode()
+                start = end
+            rest = data[start:].decode()
+            buffer = [rest] if rest else []
+            size = len(data) - start
+
+    if buffer:
+        yield "".join(buffer)
+
+
+def _char_boundary(data: bytes, end: int) -> int:
+    """Move a cut back so it doesn't split a multi-byte character"""
+    while end < len(data) and data[end] & 0xC0 == 0x80:
+        end -= 1
+    return end
+
+
+async def send_tool_result(websocket, tool_name: str, result: Any, chunk_size: int = TOOL_RESULT_CHUNK_BYTES, **extra):
+    """Send a tool result, streaming it in chunks when it is large
+
+    Small results keep the single ``tool_result`` frame. Large ones become
+    ``tool_result_chunk`` frames (``stream_id``, ``index``, ``data`` holding a
+    slice of the JSON text) closed by ``tool_result_end``; the client joins
+    the slices and parses them. The encoded result is never held whole, and
+    between chunks the sender waits for the socket to drain if it can.
+    """
+    chunks = _json_chunks(result, chunk_size)
+    first = next(chunks, "null")
+    second = next(chunks, None)
+
+    if second is None:
+        await websocket.send_json({
+            "type": "tool_result",
+            "tool_name": tool_name,
+            "result": json.loads(first),
+            **extra
+        })
+        return
+
+    stream_id = uuid.uuid4().hex[:12]
+    drain = getattr(websocket, "drain", None)
+    count = 0
+
+    for index, data in enumerate(_chain(first, second, chunks)):
+        await websocket.send_json({
+            "type": "tool_result_chunk",
+            "tool_name": tool_name,
+            "stream_id": stream_id,
+            "index": index,
+            "data": data
+        })
+        count += 1
+        if drain is not None:
+            await drain()
+
+    await websocket.send_json({
+        "type": "tool_result_end",
+        "tool_name": tool_name,
+        "stream_id": stream_id,
+        "chunks": count,
+        **extra
+    })
+
+
+def _chain(first: str, second: str, rest: Iterator[str]) -> Iterator[str]:
+    yield first
+    yield second
+    yield from rest
@@ -0,0 +1,133 @@
+import os
+import uuid
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from app.telemetry.log import get_logger
+
+log = get_logger(__name__)
+
+
+class Turn:
+    """One user message waiting for (or getting) its answer"""
+
+    __slots__ = ("id", "session_id", "message", "websocket", "identity", "task")
+
+    def __init__(self, session_id: str, message: str, websocket, identity: Optional[str] = None,
+                 turn_id: Optional[str] = None):
+        self.id = turn_id or uuid.uuid4().hex[:12]
+        self.session_id = session_id
+        self.message = message
+        self.websocket = websocket
+        self.identity = identity  # Who rate limits count against
+        self.task: Optional[asyncio.Task] = None
+
+
+class TurnQueue:
+    """Runs a session's turns one at a time, in arrival order, off the receive loop
+
+    Socket handlers only ``submit`` and ``cancel``, so control frames are
+    read while a turn is generating. Cancelling the running turn cancels its
+    task - the LLM stream, its tool calls and its executor slot are released
+    through the usual cancellation path. Turns still waiting are simply
+    dropped from the queue.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        run_turn: Callable[[Turn], Awaitable[Any]],
+        on_cancelled: Optional[Callable[[Turn], Awaitable[Any]]] = None,
+        max_pending: Optional[int] = None,
+    ):
+        self.session_id = session_id
+        self.run_turn = run_turn
+        self.on_cancelled = on_cancelled
+        self.max_pending = max_pending or int(os.getenv("SESSION_MAX_PENDING_TURNS", "8"))
+        self.pending: Deque[Turn] = deque()
+        self.current: Optional[Turn] = None
+        self.completed = 0
+        self.cancelled = 0
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+
+    def submit(self, turn: Turn) -> bool:
+        """Queue a turn; False if the session already has ``max_pending`` waiting"""
+        if len(self.pending) >= self.max_pending:
+            return False
+        self.pending.append(turn)
+        self._wakeup.set()
+        return True
+
+    def position(self, turn: Turn) -> int:
+        """0 while running, otherwise 1-based place in the queue"""
+        if self.current is turn:
+            return 0
+        return list(self.pending).index(turn) + 1
+
+    def cancel(self, turn_id: Optional[str] = None) -> Optional[Turn]:
+        """Cancel the running turn (or the turn with ``turn_id``); returns it if found"""
+        current = self.current
+        if current is not None and turn_id in (None, current.id):
+            if current.task is not None and not current.task.done():
+                current.task.cancel()
+                return current
+            return None
+
+        for turn in self.pending:
+            if turn.id == turn_id:
+                self.pending.remove(turn)
+                self.cancelled += 1
+                self._notify_cancelled(turn)
+                return turn
+        return None
+
+    async def close(self):
+        """Stop the worker and abandon every turn (last socket of the session left)"""
+        self.pending.clear()
+        self.cancel()
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.current.id if self.current else None,
+            "pending": len(self.pending),
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+        }
+
+    async def _run(self):
+        while True:
+            while not self.pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            turn = self.pending.popleft()
+            self.current = turn
+            turn.task = asyncio.create_task(self.run_turn(turn))
+            try:
+                # wait() rather than await: cancelling the turn must not stop the worker
+                await asyncio.wait({turn.task})
+            except asyncio.CancelledError:
+                turn.task.cancel()
+                await asyncio.gather(turn.task, return_exceptions=True)
+                raise
+            finally:
+                self.current = None
+
+            if turn.task.cancelled():
+                self.cancelled += 1
+                self._notify_cancelled(turn)
+                continue
+
+            self.completed += 1
+            error = turn.task.exception()
+            if error is not None:
+                log.error("❌ Turn failed", session_id=self.session_id, turn_id=turn.id, error=str(error))
+
+    def _notify_cancelled(self, turn: Turn):
+        if self.on_cancelled is not None:
+            task = asyncio.create_task(self.on_cancelled(turn))
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
@@ -0,0 +1,12 @@
+"""WebSocket load and latency benchmark for /ws/session/{session_id}
+
+    python -m bench run --clients 2000 --turns 3 --output results.json
+    python -m bench compare baseline.json results.json
+    python -m bench overhead
+
+``run`` starts the app with the fake LLM provider (token rate and latency
+are configurable), holds the connections open, drives turns from every
+client and writes one JSON report. ``compare`` diffs two reports, e.g.
+from two commits, or a run against one with ``--env METRICS_ENABLED=0``.
+``overhead`` times the telemetry primitives on their own.
+"""
@@ -0,0 +1,294 @@
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import bench
+from bench.load import LoadPlan, connect_clients
+from bench.procstat import ProcessTree, raise_fd_limit
+from bench.report import compare, format_rows, summarize
+from bench.server import ROOT, BenchServer
+
+
+def _git(*args) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _meta() -> Dict[str, Any]:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _server_env(args) -> Dict[str, str]:
+    env = {
+        "FAKE_LLM_TOKENS_PER_SEC": str(args.token_rate),
+        "FAKE_LLM_LATENCY_MS": str(args.latency_ms),
+        "FAKE_LLM_TOKENS": str(args.tokens),
+    }
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+
+class CpuClock:
+    """Wall time plus the server's and this process's CPU time over a phase"""
+
+    def __init__(self, tree: Optional[ProcessTree]):
+        self.tree = tree
+        self.wall = time.perf_counter()
+        self.client_cpu = time.process_time()
+        self.server = tree.sample() if tree else None
+
+    def stop(self) -> Dict[str, Any]:
+        wall = time.perf_counter() - self.wall
+        result = {
+            "seconds": round(wall, 3),
+            "client_cpu_percent": round((time.process_time() - self.client_cpu) / wall * 100, 1) if wall else None,
+        }
+        end = self.tree.sample() if self.tree else None
+        if self.server and end:
+            result["server_cpu_percent"] = round((end["cpu_seconds"] - self.server["cpu_seconds"]) / wall * 100, 1)
+            result["server_rss_bytes"] = end["rss_bytes"]
+        return result
+
+
+async def run_benchmark(args, url: str, tree: Optional[ProcessTree], workers: int) -> Dict[str, Any]:
+    run_id = uuid.uuid4().hex[:8]
+    plan = LoadPlan(
+        url,
+        args.clients,
+        turns=args.turns,
+        think_time=args.think_ms / 1000,
+        connect_concurrency=args.connect_concurrency,
+        turn_timeout=args.turn_timeout,
+        protocol=args.protocol,
+        compression=not args.no_compression,
+    )
+
+    idle = tree.sample() if tree else None
+
+    connect_clock = CpuClock(tree)
+    tasks = await connect_clients(plan, run_id)
+    connect_phase = connect_clock.stop()
+    # Let the connect-time writes (session rows) settle before measuring held memory
+    await asyncio.sleep(args.settle_ms / 1000)
+    held = tree.sample() if tree else None
+
+    turn_clock = CpuClock(tree)
+    plan.start_turns.set()
+    results = await asyncio.gather(*tasks)
+    turn_phase = turn_clock.stop()
+
+    return _report(args, plan, results, workers, idle, held, connect_phase, turn_phase)
+
+
+def _report(args, plan, results, workers, idle, held, connect_phase, turn_phase) -> Dict[str, Any]:
+    established = sum(1 for r in results if r.connected)
+    completed = sum(r.turns for r in results)
+    frames = sum(r.frames for r in results)
+    received = sum(r.bytes for r in results)
+    errors: Dict[str, int] = {}
+    for r in results:
+        if r.error:
+            kind = r.error.split(":", 1)[0]
+            errors[kind] = errors.get(kind, 0) + 1
+
+    server = None
+    if idle and held:
+        server = {
+            "processes": held["processes"],
+            "rss_idle_mb": round(idle["rss_bytes"] / 2**20, 2),
+            "rss_connected_mb": round(held["rss_bytes"] / 2**20, 2),
+            "rss_per_connection_kb": round((held["rss_bytes"] - idle["rss_bytes"]) / max(established, 1) / 1024, 2),
+            "rss_after_turns_mb": round(turn_phase.get("server_rss_bytes", 0) / 2**20, 2),
+            "cpu_percent": turn_phase.get("server_cpu_percent"),
+            "connect_cpu_percent": connect_phase.get("server_cpu_percent"),
+        }
+
+    duration = turn_phase["seconds"]
+    return {
+        "meta": _meta(),
+        "config": {
+            "clients": plan.clients,
+            "turns_per_client": plan.turns,
+            "think_ms": args.think_ms,
+            "workers": workers,
+            "protocol": plan.protocol,
+            "compression": plan.compression,
+            "token_rate": args.token_rate,
+            "latency_ms": args.latency_ms,
+            "tokens": args.tokens,
+            "env": args.env,
+        },
+        "connections": {
+            "attempted": plan.clients,
+            "established": established,
+            "per_worker": round(established / workers, 1),
+            "connect_seconds": connect_phase["seconds"],
+        },
+        "throughput": {
+            "turns_per_second": round(completed / duration, 2) if duration else None,
+            "frames_per_second": round(frames / duration, 1) if duration else None,
+            "bytes_per_second": round(received / duration, 1) if duration else None,
+        },
+        "turns": {
+            "completed": completed,
+            "rejected": sum(r.rejected for r in results),
+            "timed_out": sum(r.timeouts for r in results),
+            "seconds": duration,
+        },
+        "latency_ms": {
+            "connect": summarize(r.connect_ms for r in results if r.connect_ms is not None),
+            "ttft": summarize(v for r in results for v in r.ttft_ms),
+            "turn": summarize(v for r in results for v in r.turn_ms),
+        },
+        "server": server,
+        "client": {"cpu_percent": turn_phase["client_cpu_percent"]},
+        "errors": errors,
+    }
+
+
+def cmd_run(args) -> int:
+    fd_limit = raise_fd_limit()
+    # Each client needs a socket here and one on the server (same host)
+    if args.clients * 2 + 100 > fd_limit:
+        print(f"⚠️ Open-file limit {fd_limit} is low for {args.clients} clients", file=sys.stderr)
+
+    async def main(url, tree, workers):
+        return await run_benchmark(args, url, tree, workers)
+
+    if args.url:
+        tree = ProcessTree(args.server_pid) if args.server_pid else None
+        report = asyncio.run(main(args.url, tree, args.workers))
+    else:
+        server = BenchServer(workers=args.workers, env=_server_env(args), log_path=args.server_log)
+        print(f"🚀 Starting server on {server.url} ({args.workers} worker(s))", file=sys.stderr)
+        with server:
+            report = asyncio.run(main(server.url, ProcessTree(server.process.pid), args.workers))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"📊 Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    _print_summary(report)
+    return 0 if report["connections"]["established"] else 1
+
+
+def _print_summary(report: Dict[str, Any]):
+    latency = report["latency_ms"]
+    lines = [
+        f"connections {report['connections']['established']}/{report['connections']['attempted']}"
+        f" ({report['connections']['per_worker']} per worker)",
+        f"turns {report['turns']['completed']} at {report['throughput']['turns_per_second']}/s"
+        f", {report['turns']['timed_out']} timed out, {report['turns']['rejected']} rejected",
+    ]
+    for name in ("ttft", "turn"):
+        if latency[name]:
+            stats = latency[name]
+            lines.append(f"{name} ms p50 {stats['p50']} p95 {stats['p95']} p99 {stats['p99']}")
+    if report["server"]:
+        server = report["server"]
+        lines.append(f"server cpu {server['cpu_percent']}%, {server['rss_per_connection_kb']} KiB RSS per connection")
+    if report["errors"]:
+        lines.append(f"errors {report['errors']}")
+    print("\n".join(lines), file=sys.stderr)
+
+
+def cmd_compare(args) -> int:
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    rows, regressions = compare(base, new, args.threshold)
+    print(f"base {base['meta'].get('commit', '?')[:12]}  new {new['meta'].get('commit', '?')[:12]}")
+    if base.get("config") != new.get("config"):
+        print("⚠️ The runs used different configurations - compare like with like")
+    print(format_rows(rows))
+    if regressions:
+        print(f"\n❌ {len(regressions)} metric(s) regressed by more than {args.threshold}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def cmd_overhead(args) -> int:
+    from bench.overhead import measure
+
+    report = {"meta": _meta(), "overhead_ns": measure(args.number)}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m bench", description=bench.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="start the app and drive WebSocket sessions against it")
+    run.add_argument("--clients", type=int, default=500, help="concurrent WebSocket sessions")
+    run.add_argument("--turns", type=int, default=3, help="messages sent by each client")
+    run.add_argument("--think-ms", type=float, default=500, help="pause between a client's turns")
+    run.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    run.add_argument("--token-rate", type=float, default=50, help="fake LLM tokens per second per turn")
+    run.add_argument("--latency-ms", type=float, default=300, help="fake LLM delay before the first token")
+    run.add_argument("--tokens", type=int, default=50, help="fake LLM tokens per answer")
+    run.add_argument("--protocol", choices=("json", "msgpack"), default="json")
+    run.add_argument("--no-compression", action="store_true", help="do not offer permessage-deflate")
+    run.add_argument("--connect-concurrency", type=int, default=200, help="handshakes in flight at once")
+    run.add_argument("--turn-timeout", type=float, default=60, help="seconds before a turn counts as timed out")
+    run.add_argument("--settle-ms", type=float, default=1000, help="pause after connecting, before sampling RSS")
+    run.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra server environment")
+    run.add_argument("--url", help="benchmark a running server (ws://host:port) instead of starting one")
+    run.add_argument("--server-pid", type=int, help="with --url: sample this process tree's CPU and RSS")
+    run.add_argument("--server-log", help="file for the server's output (default: discarded)")
+    run.add_argument("--output", "-o", help="write the JSON report here instead of stdout")
+    run.set_defaults(handler=cmd_run)
+
+    overhead = commands.add_parser("overhead", help="cost per call of the metrics and tracing primitives")
+    overhead.add_argument("--number", type=int, default=200_000, help="calls per timing run")
+    overhead.add_argument("--output", "-o", help="write the JSON report here instead of stdout")
+    overhead.set_defaults(handler=cmd_overhead)
+
+    diff = commands.add_parser("compare", help="diff two JSON reports")
+    diff.add_argument("base")
+    diff.add_argument("new")
+    diff.add_argument("--threshold", type=float, default=10.0, help="percent change that counts as a regression")
+    diff.set_defaults(handler=cmd_compare)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import json
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import websockets
+
+# msgpack is optional - only needed for --protocol msgpack
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class ClientStats:
+    """What one simulated user saw"""
+
+    __slots__ = (
+        "connected", "connect_ms", "error", "turns", "rejected", "timeouts",
+        "ttft_ms", "turn_ms", "frames", "bytes",
+    )
+
+    def __init__(self):
+        self.connected = False
+        self.connect_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.turns = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.ttft_ms: List[float] = []
+        self.turn_ms: List[float] = []
+        self.frames = 0
+        self.bytes = 0
+
+
+class LoadPlan:
+    """Connections are opened first and held; turns start together once every client is in"""
+
+    def __init__(
+        self,
+        url: str,
+        clients: int,
+        turns: int = 3,
+        think_time: float = 0.5,
+        connect_concurrency: int = 200,
+        connect_timeout: float = 30.0,
+        turn_timeout: float = 60.0,
+        protocol: str = "json",
+        compression: bool = True,
+        # No operators or math words: the fake provider would answer with a calculate tool round
+        message: str = "Benchmark message from client {client}, turn {turn}",
+    ):
+        self.url = url.rstrip("/")
+        self.clients = clients
+        self.turns = turns
+        self.think_time = think_time
+        self.connect_concurrency = connect_concurrency
+        self.connect_timeout = connect_timeout
+        self.turn_timeout = turn_timeout
+        self.protocol = protocol
+        self.compression = compression
+        self.message = message
+
+        self.all_connected = asyncio.Event()
+        self.start_turns = asyncio.Event()
+        self._pending_connects = clients
+        self._connect_gate = asyncio.Semaphore(connect_concurrency)
+
+    def connect_done(self):
+        self._pending_connects -= 1
+        if self._pending_connects <= 0:
+            self.all_connected.set()
+
+
+async def run_client(plan: LoadPlan, index: int, run_id: str) -> ClientStats:
+    stats = ClientStats()
+    session_id = f"bench-{run_id}-{index}"
+    url = f"{plan.url}/ws/session/{session_id}?user_id=bench-{index}"
+
+    try:
+        async with plan._connect_gate:
+            started = time.perf_counter()
+            websocket = await asyncio.wait_for(
+                websockets.connect(
+                    url,
+                    subprotocols=[plan.protocol],
+                    compression="deflate" if plan.compression else None,
+                    max_size=None,
+                    open_timeout=None,
+                    ping_interval=None,
+                ),
+                plan.connect_timeout,
+            )
+            # Connected = the app's session_info arrived (handshake, DB row, welcome)
+            while (await _receive(websocket, stats, plan.connect_timeout))["type"] != "session_info":
+                pass
+            stats.connect_ms = (time.perf_counter() - started) * 1000
+            stats.connected = True
+    except Exception as e:
+        stats.error = f"connect: {type(e).__name__}: {e}"[:200]
+        plan.connect_done()
+        return stats
+
+    plan.connect_done()
+    try:
+        await plan.start_turns.wait()
+        for turn in range(plan.turns):
+            if turn and plan.think_time:
+                await asyncio.sleep(plan.think_time)
+            await _run_turn(plan, websocket, stats, plan.message.format(client=index, turn=turn))
+    except Exception as e:
+        stats.error = f"turn: {type(e).__name__}: {e}"[:200]
+    finally:
+        await websocket.close()
+    return stats
+
+
+async def _run_turn(plan: LoadPlan, websocket, stats: ClientStats, message: str):
+    # Clients always send JSON text; the subprotocol only picks the server's frame encoding
+    await websocket.send(json.dumps({"type": "user_message", "message": message}))
+    started = time.perf_counter()
+    deadline = started + plan.turn_timeout
+    first = None
+
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            stats.timeouts += 1
+            return
+        try:
+            frame = await _receive(websocket, stats, remaining)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            return
+
+        kind = frame.get("type")
+        if kind == "ai_message" and first is None:
+            first = time.perf_counter()
+            stats.ttft_ms.append((first - started) * 1000)
+        elif kind == "ai_message_end":
+            stats.turns += 1
+            stats.turn_ms.append((time.perf_counter() - started) * 1000)
+            return
+        elif kind == "system" and frame.get("error"):
+            stats.rejected += 1
+            return
+
+
+async def _receive(websocket, stats: ClientStats, timeout: float) -> Dict[str, Any]:
+    data = await asyncio.wait_for(websocket.recv(), timeout)
+    stats.frames += 1
+    stats.bytes += len(data)
+    if isinstance(data, bytes):
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+
+async def connect_clients(plan: LoadPlan, run_id: str) -> List[asyncio.Task]:
+    """Start every client; returns once each is connected or has failed"""
+    tasks = [asyncio.create_task(run_client(plan, index, run_id)) for index in range(plan.clients)]
+    if plan.clients:
+        await plan.all_connected.wait()
+    return tasks
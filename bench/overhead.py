@@ -0,0 +1,79 @@
+import os
+import timeit
+from typing import Any, Dict
+
+from app.telemetry import log, metrics, tracing
+
+
+def _per_call_ns(statement, number: int) -> float:
+    # Best of 5 runs, so a scheduler hiccup doesn't count as overhead
+    return round(min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e9, 1)
+
+
+def measure(number: int = 200_000) -> Dict[str, Any]:
+    """Cost per call of each instrumentation primitive on the hot path, in nanoseconds"""
+    registry = metrics.Registry()
+    counter = registry.counter("bench_total", "bench", ["direction"]).labels("out")
+    histogram = registry.histogram("bench_seconds", "bench", ["tool"])
+    child = histogram.labels("calculate")
+
+    results = {
+        "baseline_noop_call": _per_call_ns(lambda: None, number),
+        "counter_inc": _per_call_ns(counter.inc, number),
+        "counter_inc_amount": _per_call_ns(lambda: counter.inc(512), number),
+        "histogram_observe": _per_call_ns(lambda: child.observe(0.42), number),
+        "histogram_labels_observe": _per_call_ns(lambda: histogram.labels("calculate").observe(0.42), number),
+    }
+
+    tracing.shutdown_tracing()
+
+    def disabled_span():
+        with tracing.span("turn", session_id="s"):
+            pass
+
+    results["span_disabled"] = _per_call_ns(disabled_span, number)
+
+    exporter = tracing.memory_exporter()
+    if exporter is not None:
+        def enabled_span():
+            with tracing.span("turn", session_id="s"):
+                pass
+
+        results["span_in_memory"] = _per_call_ns(enabled_span, number // 20)
+        exporter.clear()
+        tracing.shutdown_tracing()
+
+    results.update(_logging(number))
+
+    # One /metrics scrape of the app registry
+    scrape = _per_call_ns(metrics.REGISTRY.render, 200)
+    results["scrape_render_us"] = round(scrape / 1000, 1)
+    return results
+
+
+def _logging(number: int) -> Dict[str, float]:
+    """Log calls as the hot path makes them; the writer thread goes to /dev/null
+
+    The queue is unbounded here so every timed call pays for a real enqueue
+    (a dropped record is cheaper and would flatter the number).
+    """
+    sink = open(os.devnull, "w")
+    logger = log.StructuredLogger("app.bench")
+    results = {}
+    try:
+        log.setup_logging(stream=sink, level="INFO", queue_size=0)
+        results["log_filtered_debug"] = _per_call_ns(
+            lambda: logger.debug("🤖 LLM processing", session_id="s", message="hello"), number
+        )
+        results["log_info_queued"] = _per_call_ns(
+            lambda: logger.info("📨 User message", session_id="s", turn_id="t", message="hello"), number // 10
+        )
+        results["print_devnull"] = _per_call_ns(
+            lambda: print("📨 User message: 'hello'", file=sink), number // 10
+        )
+        results["log_dropped"] = log.logging_stats()["dropped"]
+    finally:
+        log.stop_logging()
+        log.setup_logging()
+        sink.close()
+    return results
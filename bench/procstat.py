@@ -0,0 +1,101 @@
+import os
+import resource
+from typing import Dict, List, Optional
+
+# psutil is optional - /proc covers Linux without it
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = resource.getpagesize()
+
+
+class ProcessTree:
+    """CPU seconds and RSS of a process and its children (uvicorn workers)"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+
+    def pids(self) -> List[int]:
+        if psutil is not None:
+            try:
+                root = psutil.Process(self.pid)
+                return [self.pid] + [child.pid for child in root.children(recursive=True)]
+            except psutil.Error:
+                return []
+        return _proc_tree(self.pid)
+
+    def sample(self) -> Optional[Dict[str, float]]:
+        """{"cpu_seconds", "rss_bytes", "processes"} summed over the tree, None if it is gone"""
+        cpu = rss = 0.0
+        pids = self.pids()
+        for pid in pids:
+            usage = _usage(pid)
+            if usage is not None:
+                cpu += usage[0]
+                rss += usage[1]
+        if not pids:
+            return None
+        return {"cpu_seconds": cpu, "rss_bytes": rss, "processes": len(pids)}
+
+
+def raise_fd_limit() -> int:
+    """Lift the soft open-files limit to the hard limit (children inherit it)"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or hard > soft:
+        target = hard if hard != resource.RLIM_INFINITY else max(soft, 1 << 20)
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            return target
+        except (ValueError, OSError):
+            pass
+    return soft
+
+
+def _usage(pid: int):
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            times = process.cpu_times()
+            return times.user + times.system, process.memory_info().rss
+        except psutil.Error:
+            return None
+
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            resident = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    # utime and stime are fields 14 and 15; fields[0] here is field 3 (state)
+    return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS, resident * _PAGE_SIZE
+
+
+def _proc_tree(root: int) -> List[int]:
+    children: Dict[int, List[int]] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return [root]
+
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                parent = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+
+    if not os.path.exists(f"/proc/{root}"):
+        return []
+    tree, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, ()))
+    return tree
@@ -0,0 +1,81 @@
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Which way is better, by metric prefix; other metrics are shown without a verdict
+LOWER_IS_BETTER = ("latency_ms.", "server.cpu_percent", "server.rss_per_connection_kb", "errors.")
+HIGHER_IS_BETTER = ("throughput.", "connections.established", "connections.per_worker")
+
+
+def summarize(values: Iterable[float]) -> Optional[Dict[str, float]]:
+    """count/mean/min/p50/p95/p99/max of a latency sample, in the sample's unit"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "min": round(ordered[0], 3),
+        "p50": round(percentile(ordered, 50), 3),
+        "p95": round(percentile(ordered, 95), 3),
+        "p99": round(percentile(ordered, 99), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def flatten(report: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in report.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float = 10.0) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Rows of (metric, base, new, change %) and the metrics that regressed by more than ``threshold`` %"""
+    base_flat = flatten({k: v for k, v in base.items() if k not in ("meta", "config")})
+    new_flat = flatten({k: v for k, v in new.items() if k not in ("meta", "config")})
+
+    rows, regressions = [], []
+    for metric in sorted(base_flat.keys() & new_flat.keys()):
+        before, after = base_flat[metric], new_flat[metric]
+        change = None if before == 0 else (after - before) / abs(before) * 100
+        verdict = _verdict(metric, change, threshold)
+        if verdict == "regressed":
+            regressions.append(metric)
+        rows.append({"metric": metric, "base": before, "new": after, "change_pct": change, "verdict": verdict})
+    return rows, regressions
+
+
+def format_rows(rows: List[Dict[str, Any]]) -> str:
+    width = max([len(row["metric"]) for row in rows] + [6])
+    lines = [f"{'metric':<{width}}  {'base':>12}  {'new':>12}  {'change':>8}"]
+    for row in rows:
+        change = "" if row["change_pct"] is None else f"{row['change_pct']:+.1f}%"
+        marker = {"regressed": "  ❌", "improved": "  ✅"}.get(row["verdict"], "")
+        lines.append(f"{row['metric']:<{width}}  {_number(row['base']):>12}  {_number(row['new']):>12}  {change:>8}{marker}")
+    return "\n".join(lines)
+
+
+def _verdict(metric: str, change: Optional[float], threshold: float) -> str:
+    if change is None or abs(change) <= threshold:
+        return ""
+    if metric.endswith((".count", ".min")):
+        return ""
+    if metric.startswith(LOWER_IS_BETTER):
+        return "regressed" if change > 0 else "improved"
+    if metric.startswith(HIGHER_IS_BETTER):
+        return "regressed" if change < 0 else "improved"
+    return ""
+
+
+def _number(value: float) -> str:
+    return f"{value:.3f}".rstrip("0").rstrip(".") if isinstance(value, float) else str(value)
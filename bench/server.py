@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+import socket
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# The app as a benchmark target: fake LLM, local SQLite, no admission limits
+SERVER_ENV = {
+    "LLM_PROVIDERS": "fake",
+    "GOOGLE_API_KEY": "",
+    "OPENAI_API_KEY": "",
+    "SUPABASE_URL": "",
+    "SUPABASE_KEY": "",
+    "LLM_WARMUP": "off",
+    "RATE_SESSION_PER_MIN": "0",
+    "RATE_USER_PER_MIN": "0",
+    "RATE_GLOBAL_PER_MIN": "0",
+    # The in-flight cap protects provider quota; the fake provider has none
+    "LLM_MAX_IN_FLIGHT": "100000",
+    "PYTHONUNBUFFERED": "1",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BenchServer:
+    """``uvicorn app.main:app`` in a subprocess, with the benchmark environment"""
+
+    def __init__(
+        self,
+        port: Optional[int] = None,
+        workers: int = 1,
+        env: Optional[Dict[str, str]] = None,
+        log_path: Optional[str] = None,
+        backlog: int = 8192,
+    ):
+        self.port = port or free_port()
+        self.workers = workers
+        self.env = env or {}
+        self.log_path = log_path or os.devnull
+        self.backlog = backlog
+        self.process: Optional[subprocess.Popen] = None
+        self._log = None
+        self._db_dir = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}"
+
+    @property
+    def http_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 30.0):
+        # Database and post-session job file live and die with the run
+        self._db_dir = tempfile.TemporaryDirectory(prefix="bench-db-")
+        env = {
+            **os.environ,
+            **SERVER_ENV,
+            "SQLITE_PATH": os.path.join(self._db_dir.name, "bench.db"),
+            "POST_SESSION_JOBS_PATH": os.path.join(self._db_dir.name, "post_session_jobs.json"),
+            **self.env,
+        }
+
+        command = [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1",
+            "--port", str(self.port),
+            "--workers", str(self.workers),
+            "--backlog", str(self.backlog),
+            "--log-level", "warning",
+            "--no-access-log",
+        ]
+        self._log = open(self.log_path, "ab")
+        self.process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=self._log, stderr=subprocess.STDOUT)
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {self.process.returncode} (log: {self.log_path})")
+            try:
+                if httpx.get(f"{self.http_url}/health/ready", timeout=1.0).status_code == 200:
+                    # Every worker must be up before the clients arrive
+                    time.sleep(0.5 if self.workers > 1 else 0)
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        self.stop()
+        raise RuntimeError(f"Server not ready after {timeout:.0f}s (log: {self.log_path})")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if self._db_dir is not None:
+            self._db_dir.cleanup()
+            self._db_dir = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
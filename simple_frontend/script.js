@@ -2,12 +2,14 @@ class RealtimeAIChat {
     constructor() {
         this.socket = null;
         this.sessionId = null;
-        this.userId = null;
+        // Stable per browser, so per-user rate limits follow the user across sessions
+        this.userId = localStorage.getItem('userId');
         this.isConnected = false;
         this.messageCount = 0;
         this.toolCallCount = 0;
         this.currentAiResponse = '';
         this.isAiTyping = false;
+        this.toolStreams = {};  // stream_id -> JSON slices of a chunked tool result
         
         this.init();
     }
@@ -41,9 +43,13 @@ class RealtimeAIChat {
         try {
             const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
             const host = window.location.hostname === 'localhost' ? 'localhost:8000' : window.location.host;
-            const wsUrl = `${protocol}//${host}/ws/session/${this.sessionId}`;
+            const userQuery = this.userId ? `?user_id=${encodeURIComponent(this.userId)}` : '';
+            const wsUrl = `${protocol}//${host}/ws/session/${this.sessionId}${userQuery}`;
             
-            this.socket = new WebSocket(wsUrl);
+            // Offer binary MessagePack frames when the decoder is loaded (?format=msgpack); JSON otherwise
+            const protocols = window.MessagePack ? ['msgpack', 'json'] : ['json'];
+            this.socket = new WebSocket(wsUrl, protocols);
+            this.socket.binaryType = 'arraybuffer';
             
             this.updateStatus('connecting');
             this.addMessage('Connecting to server...', 'system');
@@ -90,9 +96,17 @@ class RealtimeAIChat {
         }
     }
     
+    decodeFrame(data) {
+        // Binary frames are MessagePack (negotiated 'msgpack' subprotocol)
+        if (data instanceof ArrayBuffer) {
+            return window.MessagePack.decode(new Uint8Array(data));
+        }
+        return JSON.parse(data);
+    }
+    
     handleMessage(data) {
         try {
-            const message = JSON.parse(data);
+            const message = this.decodeFrame(data);
             
             switch (message.type) {
                 case 'system':
@@ -101,22 +115,28 @@ class RealtimeAIChat {
                     
                 case 'session_info':
                     this.userId = message.user_id;
+                    localStorage.setItem('userId', this.userId);
                     document.getElementById('userId').textContent = this.userId;
                     this.addMessage(`Session ID: ${message.session_id}`, 'system');
                     break;
                     
                 case 'ai_stream':
+                case 'ai_message':
                     if (!this.isAiTyping) {
                         this.isAiTyping = true;
                         this.currentAiResponse = '';
                         this.addTypingIndicator();
                     }
-                    this.currentAiResponse += message.token;
+                    this.currentAiResponse += message.token ?? message.content;
                     this.updateTypingIndicator(this.currentAiResponse);
                     break;
                     
                 case 'ai_stream_end':
+                case 'ai_message_end':
                     this.removeTypingIndicator();
+                    if (message.cancelled && this.currentAiResponse) {
+                        this.currentAiResponse += ' [stopped]';
+                    }
                     if (this.currentAiResponse) {
                         this.addMessage(this.currentAiResponse, 'ai');
                         this.messageCount++;
@@ -132,6 +152,19 @@ class RealtimeAIChat {
                     this.addToolResult(message.tool_name, message.result);
                     break;
                     
+                case 'tool_result_chunk':
+                    (this.toolStreams[message.stream_id] ||= [])[message.index] = message.data;
+                    break;
+                    
+                case 'tool_result_end': {
+                    const slices = this.toolStreams[message.stream_id] || [];
+                    delete this.toolStreams[message.stream_id];
+                    this.toolCallCount++;
+                    this.updateToolCallCount();
+                    this.addToolResult(message.tool_name, JSON.parse(slices.join('')));
+                    break;
+                }
+                    
                 case 'error':
                     this.addMessage(`Error: ${message.message}`, 'system');
                     break;
@@ -187,6 +220,15 @@ class RealtimeAIChat {
         this.sendMessage();
     }
     
+    stopGeneration() {
+        // Aborts the answer being generated; later messages still get theirs
+        if (this.socket && this.isConnected) {
+            this.socket.send(JSON.stringify({
+                type: 'cancel'
+            }));
+        }
+    }
+    
     endSession() {
         if (this.socket && this.isConnected) {
             this.socket.send(JSON.stringify({
@@ -375,6 +417,7 @@ class RealtimeAIChat {
         const connectBtn = document.getElementById('connectBtn');
         const disconnectBtn = document.getElementById('disconnectBtn');
         const sendBtn = document.getElementById('sendBtn');
+        const stopBtn = document.getElementById('stopBtn');
         const messageInput = document.getElementById('messageInput');
         const toolBtn = document.getElementById('toolBtn');
         const endSessionBtn = document.getElementById('endSessionBtn');
@@ -384,6 +427,7 @@ class RealtimeAIChat {
             connectBtn.disabled = true;
             disconnectBtn.disabled = false;
             sendBtn.disabled = false;
+            stopBtn.disabled = false;
             messageInput.disabled = false;
             toolBtn.disabled = false;
             endSessionBtn.disabled = false;
@@ -392,6 +436,7 @@ class RealtimeAIChat {
             connectBtn.disabled = false;
             disconnectBtn.disabled = true;
             sendBtn.disabled = true;
+            stopBtn.disabled = true;
             messageInput.disabled = true;
             toolBtn.disabled = true;
             endSessionBtn.disabled = true;
@@ -443,6 +488,7 @@ document.addEventListener('DOMContentLoaded', () => {
     window.handleKeyPress = (e) => chatApp.handleKeyPress(e);
     window.testToolCall = () => chatApp.testToolCall();
     window.endSession = () => chatApp.endSession();
+    window.stopGeneration = () => chatApp.stopGeneration();
     window.newSession = () => chatApp.newSession();
     window.viewSessionData = () => chatApp.viewSessionData();
     window.setPrompt = (prompt) => chatApp.setPrompt(prompt);
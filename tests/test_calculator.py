@@ -0,0 +1,90 @@
+import math
+
+import pytest
+
+from app.llm.calculator import CalculationError, compile_expression, evaluate, evaluate_many, format_number
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("2 + 2 * 3", 8),
+    ("(2 + 2) * 3", 12),
+    ("2 ^ 10", 1024),
+    ("7 // 2 + 7 % 2", 4),
+    ("-3 + +1", -2),
+    ("sqrt(16) + max(1, 5, 3)", 9.0),
+    ("6 × 7 ÷ 2", 21.0),
+    ("  1 +\n 1 ", 2),
+])
+def test_evaluates_arithmetic(expression, expected):
+    assert evaluate(expression) == expected
+
+
+def test_constants():
+    assert evaluate("2 * pi") == pytest.approx(math.tau)
+
+
+def test_variables():
+    assert evaluate("2 * (x + 1)", {"x": 3}) == 8
+    assert compile_expression("a * b + a").variables == ("a", "b")
+
+
+def test_evaluate_many_broadcasts_scalars():
+    assert evaluate_many("x ** 2 + c", {"x": [1, 2, 3], "c": 1}) == [2, 5, 10]
+    assert evaluate_many("1 + 1") == [2]
+
+
+def test_evaluate_many_needs_equal_lengths():
+    with pytest.raises(CalculationError, match="same length"):
+        evaluate_many("x + y", {"x": [1, 2], "y": [1]})
+
+
+@pytest.mark.parametrize("expression", [
+    "__import__('os').system('true')",
+    "(1).__class__",
+    "open('/etc/passwd')",
+    "[1, 2]",
+    "x if 1 else 2",
+    "lambda: 1",
+    "'text' * 3",
+    "True + 1",
+    "sqrt",
+    "",
+    "1 +",
+])
+def test_rejects_unsafe_or_malformed_input(expression):
+    with pytest.raises(CalculationError):
+        evaluate(expression)
+
+
+@pytest.mark.parametrize("expression, message", [
+    ("1 / 0", "Division by zero"),
+    ("10 ** 10000", "Exponent"),
+    ("9 ** 999 * 9 ** 999 * 9 ** 999", "too large"),
+    ("(-8) ** 0.5", "Negative base"),
+    ("x + 1", "Missing value for: x"),
+    ("1" + " + 1" * 200, "longer than"),
+])
+def test_limits_and_errors(expression, message):
+    with pytest.raises(CalculationError, match=message):
+        evaluate(expression)
+
+
+def test_variables_must_be_numbers():
+    with pytest.raises(CalculationError, match="x must be a number"):
+        evaluate("x + 1", {"x": "1"})
+    with pytest.raises(CalculationError, match="x must be a number"):
+        evaluate("x + 1", {"x": True})
+
+
+def test_compiled_expressions_are_cached():
+    assert compile_expression("3 *  4") is compile_expression("3 * 4")
+
+
+@pytest.mark.parametrize("value, text", [
+    (8, "8"),
+    (9.0, "9"),
+    (0.1 + 0.2, "0.3"),
+    (1e20, "1e+20"),
+])
+def test_format_number(value, text):
+    assert format_number(value) == text
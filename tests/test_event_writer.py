@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+from app.database.event_writer import EventWriter
+
+
+class RecordingDB:
+    """Just enough of the database client for ``table(...).insert(rows).execute()``"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.batches = []
+
+    def table(self, name):
+        return self
+
+    def insert(self, rows):
+        self._rows = rows
+        return self
+
+    def execute(self):
+        if self.fail:
+            raise RuntimeError("database is down")
+        self.batches.append(list(self._rows))
+
+
+def test_flush_is_a_barrier_that_does_not_wait_for_the_deadline():
+    async def scenario():
+        db = RecordingDB()
+        writer = EventWriter(db, batch_size=100, flush_interval=30)
+        writer.start()
+        for n in range(3):
+            await writer.record("s1", "user_message", f"message {n}")
+
+        started = time.perf_counter()
+        await writer.flush()
+        elapsed = time.perf_counter() - started
+        await writer.close()
+        return db, writer, elapsed
+
+    db, writer, elapsed = asyncio.run(scenario())
+    assert elapsed < 5
+    assert [row["content"] for row in db.batches[0]] == ["message 0", "message 1", "message 2"]
+    assert writer.stats()["written"] == 3
+
+
+def test_full_batches_go_out_without_waiting():
+    async def scenario():
+        db = RecordingDB()
+        writer = EventWriter(db, batch_size=2, flush_interval=30)
+        writer.start()
+        for n in range(5):
+            await writer.record("s1", "ai_response", str(n))
+        await writer.close()
+        return db
+
+    db = asyncio.run(scenario())
+    assert [len(batch) for batch in db.batches] == [2, 2, 1]
+
+
+def test_failed_batch_is_counted_and_still_releases_the_barrier():
+    async def scenario():
+        writer = EventWriter(RecordingDB(fail=True), batch_size=10, flush_interval=30)
+        writer.start()
+        await writer.record("s1", "user_message", "lost")
+        await asyncio.wait_for(writer.flush(), 5)
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert writer.failed == 1
+    assert writer.written == 0
+
+
+def test_flush_without_a_running_writer_returns():
+    async def scenario():
+        await asyncio.wait_for(EventWriter(RecordingDB()).flush(), 1)
+
+    asyncio.run(scenario())
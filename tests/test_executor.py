@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from app.llm.executor import LLMExecutor
+
+
+def test_rejects_empty_pool():
+    with pytest.raises(ValueError):
+        LLMExecutor(max_in_flight=0)
+
+
+def test_waiters_are_told_their_position_and_run_in_order():
+    async def scenario():
+        executor = LLMExecutor(max_in_flight=1)
+        positions = []
+        order = []
+
+        async def generation(name):
+            async def on_queued(position):
+                positions.append((name, position))
+
+            async with executor.slot(on_queued):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(generation(name) for name in "abc"))
+        return executor, positions, order
+
+    executor, positions, order = asyncio.run(scenario())
+    assert order == ["a", "b", "c"]
+    assert positions == [("b", 1), ("c", 2)]
+    assert executor.in_flight == 0
+    assert executor.stats()["peak_queue_depth"] == 2
+    assert executor.total_started == 3
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        executor = LLMExecutor(max_in_flight=1)
+        await executor.acquire()
+        waiting = asyncio.create_task(executor.acquire())
+        await asyncio.sleep(0)
+        assert executor.queue_depth == 1
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert executor.queue_depth == 0
+
+        executor.release()
+        return executor
+
+    executor = asyncio.run(scenario())
+    assert executor.in_flight == 0
+
+
+def test_slot_handed_over_while_cancelling_is_passed_on():
+    async def scenario():
+        executor = LLMExecutor(max_in_flight=1)
+        await executor.acquire()
+        first = asyncio.create_task(executor.acquire())
+        second = asyncio.create_task(executor.acquire())
+        await asyncio.sleep(0)
+
+        # The slot goes to ``first`` and it is cancelled before it runs
+        executor.release()
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        await second
+        return executor
+
+    executor = asyncio.run(scenario())
+    assert executor.in_flight == 1
+    assert executor.queue_depth == 0
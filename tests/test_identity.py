@@ -0,0 +1,33 @@
+from app.websocket.identity import client_identity, sign_user, verified_user
+
+
+class Client:
+    host = "203.0.113.7"
+
+
+class Socket:
+    def __init__(self, **query_params):
+        self.query_params = query_params
+        self.client = Client()
+
+
+def test_signed_token_proves_the_user():
+    token = sign_user("alice", "secret")
+    assert verified_user(token, "secret") == "alice"
+    assert client_identity(Socket(token=token, user_id="bob"), "secret") == "user:alice"
+
+
+def test_forged_or_malformed_tokens_are_ignored():
+    forged = "alice." + "0" * 64
+    assert verified_user(forged, "secret") is None
+    assert verified_user(sign_user("alice", "other"), "secret") is None
+    assert verified_user("alice", "secret") is None
+    assert verified_user(".abc", "secret") is None
+
+
+def test_without_a_secret_nothing_verifies():
+    assert verified_user(sign_user("alice", ""), "") is None
+
+
+def test_claimed_user_id_is_never_the_identity():
+    assert client_identity(Socket(user_id="alice"), "secret") == "ip:203.0.113.7"
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from app.websocket.rate_limit import LocalLimiterBackend, RateLimiter, RedisLimiterBackend
+
+
+def limiter(backend=None, **overrides):
+    """Limiter with only the limits a test names (everything else off)"""
+    settings = dict(session_rate=0, user_rate=0, global_rate=0, max_wait=0)
+    settings.update(overrides)
+    return RateLimiter(backend, **settings)
+
+
+def admit_many(limiter, count, session_id="s1", identity="ip:10.0.0.1"):
+    async def scenario():
+        return [await limiter.admit(session_id, identity) for _ in range(count)]
+
+    return asyncio.run(scenario())
+
+
+def test_burst_is_admitted_then_rejected_with_scope_and_retry_after():
+    rate_limiter = limiter(session_rate=1, session_burst=2)
+    decisions = admit_many(rate_limiter, 3)
+
+    assert [decision.allowed for decision in decisions] == [True, True, False]
+    assert decisions[-1].scope == "session"
+    assert 0 < decisions[-1].retry_after <= 1
+    assert rate_limiter.stats()["rejected"]["session"] == 1
+
+
+def test_short_waits_are_delayed_not_rejected():
+    async def scenario():
+        rate_limiter = limiter(session_rate=50, session_burst=1, max_wait=1)
+        delays = []
+
+        async def on_delay(seconds):
+            delays.append(seconds)
+
+        first = await rate_limiter.admit("s1", "ip:10.0.0.1", on_delay=on_delay)
+        second = await rate_limiter.admit("s1", "ip:10.0.0.1", on_delay=on_delay)
+        return rate_limiter, first, second, delays
+
+    rate_limiter, first, second, delays = asyncio.run(scenario())
+    assert first.allowed and not first.waited
+    assert second.allowed and second.waited > 0
+    assert len(delays) == 1
+    assert rate_limiter.delayed == 1
+
+
+def test_user_limit_spans_sessions():
+    rate_limiter = limiter(user_rate=1, user_burst=2)
+
+    async def scenario():
+        return [await rate_limiter.admit(session_id, "user:alice") for session_id in ("a", "b", "c")]
+
+    decisions = asyncio.run(scenario())
+    assert [decision.allowed for decision in decisions] == [True, True, False]
+    assert decisions[-1].scope == "user"
+
+
+def test_session_buckets_are_scoped_by_identity():
+    rate_limiter = limiter(session_rate=1, session_burst=1)
+
+    # Someone else naming the same session does not spend our budget
+    assert admit_many(rate_limiter, 1, identity="ip:10.0.0.66")[0].allowed
+    assert admit_many(rate_limiter, 1, identity="ip:10.0.0.1")[0].allowed
+    assert not admit_many(rate_limiter, 1, identity="ip:10.0.0.1")[0].allowed
+
+
+def test_global_budget_is_on_by_default(monkeypatch):
+    monkeypatch.delenv("RATE_GLOBAL_PER_MIN", raising=False)
+    assert RateLimiter().global_rate > 0
+
+
+def test_rejected_message_takes_no_tokens():
+    rate_limiter = limiter(session_rate=1, session_burst=1, user_rate=1, user_burst=5)
+    admit_many(rate_limiter, 3)
+
+    # Only the admitted message came out of the user bucket
+    bucket = rate_limiter.backend._buckets["user:ip:10.0.0.1"]
+    assert bucket.tokens == pytest.approx(4, abs=0.1)
+
+
+def test_local_backend_evicts_least_recently_used_buckets():
+    backend = LocalLimiterBackend(max_keys=2)
+
+    async def scenario():
+        for key in ("a", "b", "a", "c"):
+            await backend.take([(key, 1, 1)])
+
+    asyncio.run(scenario())
+    assert list(backend._buckets) == ["a", "c"]
+
+
+def test_redis_backend_takes_from_every_bucket_atomically():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        backend = RedisLimiterBackend(fakeredis.aioredis.FakeRedis())
+        limits = [("session:x", 1.0, 1), ("user:y", 1.0, 5)]
+        first = await backend.take(limits)
+        second = await backend.take(limits)
+        user_tokens = await backend.client.hget("ratelimit:user:y", "tokens")
+        return first, second, float(user_tokens)
+
+    first, second, user_tokens = asyncio.run(scenario())
+    assert first == (0.0, None)
+    assert second[0] > 0 and second[1] == "session:x"
+    assert user_tokens == pytest.approx(4, abs=0.1)
@@ -0,0 +1,142 @@
+import asyncio
+
+from app.websocket.backplane import InProcessBackplane, InProcessHub
+from app.websocket.manager import ConnectionManager
+from app.websocket.replay import ReplayBuffer
+
+
+def chunk(content):
+    return {"type": "ai_message", "content": content}
+
+
+def test_frames_are_numbered_under_the_buffer_epoch():
+    replay = ReplayBuffer(epoch="e1")
+    first = replay.stamp({"type": "user_message"})
+    second = replay.stamp(chunk("Hi"))
+
+    assert (first["seq"], first["epoch"]) == (1, "e1")
+    assert second["seq"] == 2
+    assert replay.since(0, "e1") == [first, second]
+    assert replay.since(2, "e1") == []
+
+
+def test_resume_from_another_epoch_or_the_future_is_refused():
+    replay = ReplayBuffer(epoch="e1")
+    replay.stamp({"type": "system"})
+
+    assert replay.since(0, "e2") is None
+    assert replay.since(0, None) is None
+    assert replay.since(5, "e1") is None
+
+
+def test_chunks_of_one_answer_share_an_entry_and_replay_only_the_rest():
+    replay = ReplayBuffer(epoch="e1")
+    for content in ("Hel", "lo ", "there"):
+        replay.stamp(chunk(content))
+    replay.stamp({"type": "ai_message_end"})
+
+    assert len(replay) == 2
+    rest = replay.since(1, "e1")
+    assert rest[0]["content"] == "lo there"
+    assert rest[0]["seq"] == 3
+    assert rest[1]["type"] == "ai_message_end"
+
+
+def test_frame_cap_drops_the_oldest_and_refuses_resumes_before_them():
+    replay = ReplayBuffer(max_frames=2, epoch="e1")
+    for n in range(4):
+        replay.stamp({"type": "system", "n": n})
+
+    assert len(replay) == 2
+    assert replay.since(1, "e1") is None
+    assert [frame["n"] for frame in replay.since(2, "e1")] == [2, 3]
+
+
+def test_byte_cap_bounds_what_is_kept():
+    replay = ReplayBuffer(max_frames=100, max_bytes=1000, epoch="e1")
+    for _ in range(10):
+        replay.stamp({"type": "tool_result", "result": "x" * 300})
+
+    assert replay.bytes <= 1000
+    assert len(replay) == 2
+    assert replay.since(replay.seq - 2, "e1") is not None
+    assert replay.since(replay.seq - 3, "e1") is None
+
+
+def test_oversized_answer_is_dropped_and_its_later_chunks_start_over():
+    replay = ReplayBuffer(max_bytes=10, epoch="e1")
+    for content in ("aaaa", "bbbb", "cccc"):
+        replay.stamp(chunk(content))
+
+    assert replay.bytes == 0
+    assert replay.since(2, "e1") is None
+
+    replay.stamp(chunk("dddd"))
+    assert [frame["content"] for frame in replay.since(3, "e1")] == ["dddd"]
+
+
+def test_gap_refuses_resumes_from_before_it():
+    replay = ReplayBuffer(epoch="e1")
+    replay.stamp({"type": "system"})
+    replay.gap()
+
+    assert replay.since(1, "e1") is None
+    replay.stamp({"type": "system"})
+    assert replay.since(2, "e1") == []
+
+
+class Socket:
+    def __init__(self):
+        self.sent = []
+        self.query_params = {}
+        self.scope = {}
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+
+def test_per_socket_frames_are_not_numbered():
+    async def scenario():
+        manager = ConnectionManager(coalesce_interval=0)
+        await manager.start()
+        socket = Socket()
+        connection = await manager.connect(socket, "s1")
+        await manager.send_message(socket, {"type": "system", "message": "welcome"})
+        sent = connection.queue.get_nowait()
+        point = manager.resume_point("s1")
+        manager.disconnect(socket, "s1")
+        await manager.close()
+        return sent, point
+
+    sent, point = asyncio.run(scenario())
+    assert "seq" not in sent and "epoch" not in sent
+    assert point["resume_after"] == 0
+
+
+def test_resume_is_only_served_by_the_worker_that_numbered_the_frames():
+    async def scenario():
+        hub = InProcessHub()
+        first = ConnectionManager(backplane=InProcessBackplane(hub), coalesce_interval=0)
+        second = ConnectionManager(backplane=InProcessBackplane(hub), coalesce_interval=0)
+        await first.start()
+        await second.start()
+        await first.connect(Socket(), "s1")
+        await second.connect(Socket(), "s1")
+
+        await first.broadcast_to_session("s1", {"type": "system", "message": "one"})
+        epoch = first.replay["s1"].epoch
+        served_here = first.replay["s1"].since(0, epoch)
+        served_elsewhere = second.replay["s1"].since(0, epoch)
+
+        # Frames from the other worker reached the session: ours can't be complete
+        await second.broadcast_to_session("s1", {"type": "system", "message": "two"})
+        after_gap = first.replay["s1"].since(1, epoch)
+        return served_here, served_elsewhere, after_gap
+
+    served_here, served_elsewhere, after_gap = asyncio.run(scenario())
+    assert [frame["message"] for frame in served_here] == ["one"]
+    assert served_elsewhere is None
+    assert after_gap is None
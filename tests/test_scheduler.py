@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+from app.tasks.scheduler import PostSessionScheduler
+
+
+async def _until(condition, timeout: float = 5):
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.005)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+def test_a_session_is_scheduled_once():
+    async def scenario():
+        calls = []
+        release = asyncio.Event()
+
+        async def handler(session_id):
+            calls.append(session_id)
+            await release.wait()
+
+        scheduler = PostSessionScheduler(handler, concurrency=1, state_path="")
+        await scheduler.start()
+        assert scheduler.submit("s1")
+        await _until(lambda: calls)
+        assert not scheduler.submit("s1")  # Still running
+
+        release.set()
+        await _until(lambda: scheduler.completed == 1)
+        assert scheduler.submit("s1")  # Finished jobs can be submitted again
+        await _until(lambda: scheduler.completed == 2)
+        await scheduler.close()
+        return scheduler, calls
+
+    scheduler, calls = asyncio.run(scenario())
+    assert calls == ["s1", "s1"]
+    assert scheduler.deduplicated == 1
+
+
+def test_lower_priority_numbers_run_first():
+    async def scenario():
+        order = []
+
+        async def handler(session_id):
+            order.append(session_id)
+
+        scheduler = PostSessionScheduler(handler, concurrency=1, state_path="")
+        scheduler.submit("later", priority=5)
+        scheduler.submit("first", priority=0)
+        await scheduler.start()
+        await _until(lambda: scheduler.completed == 2)
+        await scheduler.close()
+        return order
+
+    assert asyncio.run(scenario()) == ["first", "later"]
+
+
+def test_failures_are_retried_until_they_succeed():
+    async def scenario():
+        attempts = []
+
+        async def handler(session_id):
+            attempts.append(session_id)
+            if len(attempts) < 3:
+                return {"success": False, "error": "summary failed"}
+            return {"success": True}
+
+        scheduler = PostSessionScheduler(handler, concurrency=1, max_attempts=3, base_delay=0.01, state_path="")
+        await scheduler.start()
+        scheduler.submit("s1")
+        await _until(lambda: scheduler.completed == 1)
+        await scheduler.close()
+        return scheduler, attempts
+
+    scheduler, attempts = asyncio.run(scenario())
+    assert len(attempts) == 3
+    assert scheduler.failed == 0
+    assert scheduler.jobs == {}
+
+
+def test_gives_up_after_max_attempts():
+    async def scenario():
+        async def handler(session_id):
+            raise RuntimeError("database is down")
+
+        scheduler = PostSessionScheduler(handler, concurrency=2, max_attempts=2, base_delay=0.01, state_path="")
+        await scheduler.start()
+        scheduler.submit("s1")
+        await _until(lambda: scheduler.failed == 1)
+        await scheduler.close()
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert scheduler.completed == 0
+    assert "s1" not in scheduler.jobs
+
+
+def test_unfinished_jobs_survive_a_restart(tmp_path):
+    state_path = str(tmp_path / "jobs.json")
+
+    async def stuck(session_id):
+        await asyncio.Event().wait()
+
+    async def first_run():
+        scheduler = PostSessionScheduler(stuck, concurrency=1, state_path=state_path)
+        await scheduler.start()
+        scheduler.submit("running")
+        scheduler.submit("queued", priority=1)
+        await _until(lambda: scheduler.stats()["running"] == 1)
+        await scheduler.close()
+
+    asyncio.run(first_run())
+    with open(state_path) as f:
+        saved = {job["session_id"]: job for job in json.load(f)["jobs"]}
+    assert set(saved) == {"running", "queued"}
+    assert saved["running"]["attempts"] == 0  # Interrupted, not failed
+
+    async def second_run():
+        done = []
+
+        async def handler(session_id):
+            done.append(session_id)
+
+        scheduler = PostSessionScheduler(handler, concurrency=1, state_path=state_path)
+        await scheduler.start()
+        await _until(lambda: scheduler.completed == 2)
+        await scheduler.close()
+        return done
+
+    assert asyncio.run(second_run()) == ["running", "queued"]
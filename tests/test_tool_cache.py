@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from app.llm.tool_cache import ToolResultCache
+
+
+class Upstream:
+    """Counts calls; each one returns the next version number"""
+
+    def __init__(self, delay: float = 0.0, result=None):
+        self.calls = 0
+        self.delay = delay
+        self.result = result
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.result if self.result is not None else {"success": True, "version": self.calls}
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    async def scenario():
+        cache = ToolResultCache(ttls={"fetch_data": 60})
+        upstream = Upstream(delay=0.02)
+        results = await asyncio.gather(*(
+            cache.get_or_call("fetch_data", {"source": "users"}, upstream) for _ in range(10)
+        ))
+        return cache, upstream, results
+
+    cache, upstream, results = asyncio.run(scenario())
+    assert upstream.calls == 1
+    assert all(result["version"] == 1 for result in results)
+    assert cache.stats()["coalesced"] == 9
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_hits_use_normalized_arguments():
+    async def scenario():
+        cache = ToolResultCache(ttls={"fetch_data": 60})
+        upstream = Upstream()
+        await cache.get_or_call("fetch_data", {"source": "users", "limit": 5}, upstream)
+        await cache.get_or_call("fetch_data", {"limit": 5, "source": " users "}, upstream)
+        return cache, upstream
+
+    cache, upstream = asyncio.run(scenario())
+    assert upstream.calls == 1
+    assert cache.hits == 1
+
+
+def test_stale_result_is_served_while_one_refresh_runs():
+    async def scenario():
+        cache = ToolResultCache(ttls={"fetch_data": 0.01}, stale_seconds=60)
+        upstream = Upstream(delay=0.02)
+        first = await cache.get_or_call("fetch_data", {}, upstream)
+        await asyncio.sleep(0.02)
+
+        stale = await asyncio.gather(*(cache.get_or_call("fetch_data", {}, upstream) for _ in range(3)))
+        await asyncio.sleep(0.05)
+        refreshed = cache._entries[cache.key("fetch_data", {})].value
+        return cache, upstream, first, stale, refreshed
+
+    cache, upstream, first, stale, refreshed = asyncio.run(scenario())
+    assert first["version"] == 1
+    assert [result["version"] for result in stale] == [1, 1, 1]
+    assert refreshed["version"] == 2
+    assert upstream.calls == 2
+    assert cache.stale_hits == 3
+
+
+def test_failures_are_not_cached():
+    async def scenario():
+        cache = ToolResultCache(ttls={"fetch_data": 60})
+        failing = Upstream(result={"success": False, "error": "upstream down"})
+        await cache.get_or_call("fetch_data", {}, failing)
+        await cache.get_or_call("fetch_data", {}, failing)
+
+        async def broken():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_call("fetch_data", {"source": "x"}, broken)
+        return cache, failing
+
+    cache, failing = asyncio.run(scenario())
+    assert failing.calls == 2
+    assert len(cache) == 0
+
+
+def test_tools_without_a_ttl_are_not_cached():
+    async def scenario():
+        cache = ToolResultCache(ttls={"fetch_data": 60})
+        upstream = Upstream()
+        for _ in range(2):
+            await cache.get_or_call("calculate", {"expression": "1 + 1"}, upstream)
+        return cache, upstream
+
+    cache, upstream = asyncio.run(scenario())
+    assert upstream.calls == 2
+    assert len(cache) == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def scenario():
+        cache = ToolResultCache(ttls={"fetch_data": 60})
+        upstream = Upstream(delay=0.03)
+        impatient = asyncio.create_task(cache.get_or_call("fetch_data", {}, upstream))
+        patient = asyncio.create_task(cache.get_or_call("fetch_data", {}, upstream))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        return upstream, await patient
+
+    upstream, result = asyncio.run(scenario())
+    assert result["version"] == 1
+    assert upstream.calls == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    async def scenario():
+        cache = ToolResultCache(ttls={"fetch_data": 60}, max_entries=2)
+        upstream = Upstream()
+        for source in ("a", "b", "a", "c"):
+            await cache.get_or_call("fetch_data", {"source": source}, upstream)
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.key("fetch_data", {"source": "a"}) in cache._entries
+    assert cache.key("fetch_data", {"source": "b"}) not in cache._entries
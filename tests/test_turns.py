@@ -0,0 +1,120 @@
+import asyncio
+
+from app.websocket.turns import Turn, TurnQueue
+
+
+def turn(turn_id):
+    return Turn("s1", f"message {turn_id}", websocket=None, turn_id=turn_id)
+
+
+class Session:
+    """A TurnQueue whose turns block until released"""
+
+    def __init__(self, **options):
+        self.started = []
+        self.finished = []
+        self.cancelled = []
+        self.release = asyncio.Event()
+        self.queue = TurnQueue("s1", self.run_turn, on_cancelled=self.on_cancelled, **options)
+
+    async def run_turn(self, turn):
+        self.started.append(turn.id)
+        await self.release.wait()
+        self.finished.append(turn.id)
+
+    async def on_cancelled(self, turn):
+        self.cancelled.append(turn.id)
+
+
+async def _until(condition, timeout: float = 5):
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.001)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+def test_turns_run_one_at_a_time_in_order():
+    async def scenario():
+        session = Session()
+        for turn_id in "abc":
+            session.queue.submit(turn(turn_id))
+        await _until(lambda: session.started == ["a"])
+        assert session.queue.position(session.queue.current) == 0
+        assert session.queue.position(session.queue.pending[1]) == 2
+
+        session.release.set()
+        await _until(lambda: session.queue.completed == 3)
+        await session.queue.close()
+        return session
+
+    session = asyncio.run(scenario())
+    assert session.finished == ["a", "b", "c"]
+
+
+def test_cancelling_the_running_turn_moves_on_to_the_next():
+    async def scenario():
+        session = Session()
+        session.queue.submit(turn("a"))
+        session.queue.submit(turn("b"))
+        await _until(lambda: session.started == ["a"])
+
+        assert session.queue.cancel().id == "a"
+        await _until(lambda: session.started == ["a", "b"])
+        session.release.set()
+        await _until(lambda: session.queue.completed == 1)
+        await session.queue.close()
+        return session
+
+    session = asyncio.run(scenario())
+    assert session.finished == ["b"]
+    assert session.cancelled == ["a"]
+    assert session.queue.cancelled == 1
+
+
+def test_cancelling_a_pending_turn_drops_it():
+    async def scenario():
+        session = Session()
+        for turn_id in "abc":
+            session.queue.submit(turn(turn_id))
+        await _until(lambda: session.started == ["a"])
+
+        assert session.queue.cancel("b").id == "b"
+        assert session.queue.cancel("missing") is None
+        session.release.set()
+        await _until(lambda: session.queue.completed == 2)
+        await session.queue.close()
+        return session
+
+    session = asyncio.run(scenario())
+    assert session.finished == ["a", "c"]
+    assert session.cancelled == ["b"]
+
+
+def test_queue_is_bounded():
+    async def scenario():
+        session = Session(max_pending=1)
+        session.queue.submit(turn("a"))
+        await _until(lambda: session.started == ["a"])
+        accepted = [session.queue.submit(turn(turn_id)) for turn_id in "bc"]
+        await session.queue.close()
+        return accepted
+
+    assert asyncio.run(scenario()) == [True, False]
+
+
+def test_close_cancels_the_running_turn():
+    async def scenario():
+        session = Session()
+        running = turn("a")
+        session.queue.submit(running)
+        session.queue.submit(turn("b"))
+        await _until(lambda: session.started == ["a"])
+        await session.queue.close()
+        await asyncio.sleep(0)
+        return session, running
+
+    session, running = asyncio.run(scenario())
+    assert running.task.cancelled()
+    assert session.started == ["a"]
+    assert session.finished == []